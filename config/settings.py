@@ -14,10 +14,36 @@ WORK_EXPERIENCE_TABLE = 'tblC7e5XeQT22Lc9q'
 SALARY_PREFERENCES_TABLE = 'tbltZZEsH06HwUcVH'
 SHORTLISTED_LEADS_TABLE = 'tblmNFvsGEVYyRgHY'
 
+TABLES = {
+    'Applicants': APPLICANTS_TABLE,
+    'Personal Details': PERSONAL_DETAILS_TABLE,
+    'Work Experience': WORK_EXPERIENCE_TABLE,
+    'Salary Preferences': SALARY_PREFERENCES_TABLE,
+    'Shortlisted Leads': SHORTLISTED_LEADS_TABLE,
+}
+
 
 # LLM Configuration
-LLM_PROVIDER = config('LLM_PROVIDER', default='openai')  # openai, anthropic, gemini
+# One of openai, anthropic, gemini, stub
+LLM_PROVIDER = config('LLM_PROVIDER', default='openai')
+# Comma-separated "provider" or "provider:model" specs, routed by live latency
+LLM_PROVIDERS = config('LLM_PROVIDERS', default=LLM_PROVIDER, cast=Csv())
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+ANTHROPIC_API_KEY = config('ANTHROPIC_API_KEY', default='')
+GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+# Calls kept per provider
+LLM_STATS_WINDOW = config('LLM_STATS_WINDOW', default=100, cast=int)
+LLM_HEDGE = config('LLM_HEDGE', default=False, cast=bool)
+LLM_HEDGE_PERCENTILE = config('LLM_HEDGE_PERCENTILE', default=95, cast=float)
+LLM_HEDGE_MIN_SAMPLES = config('LLM_HEDGE_MIN_SAMPLES', default=5, cast=int)
+# Hedge delay in seconds, used until there are enough samples
+LLM_HEDGE_DELAY = config('LLM_HEDGE_DELAY', default=20, cast=float)
+# Per run, across all workers; 0 = unlimited
+LLM_MAX_CALLS = config('LLM_MAX_CALLS', default=0, cast=int)
+# Medians kept for --plan estimates
+LLM_LATENCY_FILE = config('LLM_LATENCY_FILE', default='.llm_latency.json')
+# Seconds per call until measured
+LLM_LATENCY_ESTIMATE = config('LLM_LATENCY_ESTIMATE', default=8, cast=float)
 
 
 # Shortlisting Criteria
@@ -26,10 +52,97 @@ ELIGIBLE_LOCATIONS = config('ELIGIBLE_LOCATIONS', default='US,USA,United States,
 MAX_HOURLY_RATE = config('MAX_HOURLY_RATE', default=100, cast=int)  # USD
 MIN_AVAILABILITY = config('MIN_AVAILABILITY', default=20, cast=int)  # hours/week
 MIN_EXPERIENCE = config('MIN_EXPERIENCE', default=4, cast=int)  # years
+# USD per unit of each currency, as CODE:rate pairs; rates in other currencies
+# are not converted
+USD_EXCHANGE_RATES = config(
+    'USD_EXCHANGE_RATES', default='USD:1,EUR:1.08,GBP:1.27,CAD:0.73,INR:0.012',
+    cast=lambda value: {code.strip().upper(): float(rate) for code, rate in
+                        (pair.split(':') for pair in value.split(',') if pair.strip())})
+
+# Evaluation cascade: rules first, optional cheap screening model, then the main LLM
+CASCADE_ENABLED = config('CASCADE_ENABLED', default=False, cast=bool)
+# Borderline band around each rule threshold, as a fraction of it
+CASCADE_BORDERLINE_MARGIN = config('CASCADE_BORDERLINE_MARGIN', default=0.25,
+                                   cast=float)
+# Provider spec, e.g. openai:gpt-4o-mini; empty disables
+CASCADE_SCREEN_MODEL = config('CASCADE_SCREEN_MODEL', default='')
+CASCADE_SCREEN_MIN_SCORE = config('CASCADE_SCREEN_MIN_SCORE', default=40, cast=float)
+
+# Duplicate detection
+DEDUP_ENABLED = config('DEDUP_ENABLED', default=False, cast=bool)
+# Estimated Jaccard similarity
+DEDUP_THRESHOLD = config('DEDUP_THRESHOLD', default=0.8, cast=float)
+DEDUP_NUM_PERM = config('DEDUP_NUM_PERM', default=64, cast=int)
+# Rows per band = NUM_PERM / BANDS
+DEDUP_BANDS = config('DEDUP_BANDS', default=8, cast=int)
+
+# Evaluation scheduling
+# Order, e.g. shortlisted,rule_score,recency; empty keeps Airtable order
+EVALUATION_PRIORITY = config('EVALUATION_PRIORITY', default='', cast=Csv())
+# Wall-clock seconds per run; 0 = none
+EVALUATION_DEADLINE = config('EVALUATION_DEADLINE', default=0, cast=float)
+# Estimated tokens per run, across all workers; 0 = unlimited
+LLM_TOKEN_BUDGET = config('LLM_TOKEN_BUDGET', default=0, cast=int)
 
 # API Settings
 MAX_RETRIES = config('MAX_RETRIES', default=3, cast=int)
 RETRY_BACKOFF = config('RETRY_BACKOFF', default=2, cast=int)  # seconds
+ID_CACHE_TTL = config('ID_CACHE_TTL', default=600, cast=int)  # seconds
+# Validate pipeline fields before a run
+SCHEMA_CHECK = config('SCHEMA_CHECK', default=True, cast=bool)
+SCHEMA_CACHE_FILE = config('SCHEMA_CACHE_FILE', default='.schema_cache.json')
+SCHEMA_CACHE_TTL = config('SCHEMA_CACHE_TTL', default=3600, cast=int)  # seconds
+# Read records keyed by field ID, immune to renames
+FIELD_IDS = config('FIELD_IDS', default=False, cast=bool)
+# Requests/second per base
+AIRTABLE_RATE_LIMIT = config('AIRTABLE_RATE_LIMIT', default=5, cast=float)
+# Seconds per request
+AIRTABLE_LATENCY_ESTIMATE = config('AIRTABLE_LATENCY_ESTIMATE', default=0.3, cast=float)
+PARTITIONED_SCAN = config('PARTITIONED_SCAN', default=False, cast=bool)
+SCAN_WORKERS = config('SCAN_WORKERS', default=4, cast=int)
+# Pages per partition
+SCAN_TARGET_PAGES = config('SCAN_TARGET_PAGES', default=3, cast=int)
+SHARD_WORKERS = config('SHARD_WORKERS', default=os.cpu_count() or 1, cast=int)
+# Concurrent batch writes in bulk runs
+WRITE_WORKERS = config('WRITE_WORKERS', default=4, cast=int)
+
+# Write-ahead outbox: stage writes queue in SQLite and are sent in the
+# background (see utils/outbox.py)
+OUTBOX_ENABLED = config('OUTBOX_ENABLED', default=False, cast=bool)
+# A relative path is taken from the project root, so every working directory
+# shares one outbox
+OUTBOX_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           config('OUTBOX_FILE', default='.airtable_outbox.sqlite'))
+# Seconds between background flushes
+OUTBOX_FLUSH_INTERVAL = config('OUTBOX_FLUSH_INTERVAL', default=1.0, cast=float)
+# Attempts per write, then kept until retried by hand
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+# Seconds before an unsent claim is abandoned
+OUTBOX_CLAIM_TIMEOUT = config('OUTBOX_CLAIM_TIMEOUT', default=300, cast=int)
+
+# Compressed JSON storage: json (plain text), deflate or zstd (needs zstandard),
+# base64 behind a version header
+JSON_CODEC = config('JSON_CODEC', default='json')
+JSON_CODEC_LEVEL = config('JSON_CODEC_LEVEL', default=6, cast=int)
+# Shared dictionary file, see scripts/train_json_dictionary.py
+JSON_CODEC_DICTIONARY = config('JSON_CODEC_DICTIONARY', default='')
+# Every *.dict here is used for decoding
+JSON_CODEC_DICTIONARY_DIR = config('JSON_CODEC_DICTIONARY_DIR', default='')
+
+# Webhook Settings
+WEBHOOK_ID = config('WEBHOOK_ID', default='')
+# Base64, from webhook creation
+WEBHOOK_MAC_SECRET = config('WEBHOOK_MAC_SECRET', default='')
+WEBHOOK_CURSOR_FILE = config('WEBHOOK_CURSOR_FILE', default='.webhook_cursor')
+WEBHOOK_IGNORE_API_CHANGES = config('WEBHOOK_IGNORE_API_CHANGES', default=True,
+                                    cast=bool)
+# Child record -> applicant links, so deleted child records can be mapped
+WEBHOOK_LINKS_FILE = config('WEBHOOK_LINKS_FILE', default='.webhook_links.json')
 
 # Debug settings
-DEBUG = config('DEBUG', default=False, cast=bool)
\ No newline at end of file
+DEBUG = config('DEBUG', default=False, cast=bool)
+# Spans, cprofile or sample; empty = off (see utils/profiling.py)
+PROFILE = config('PROFILE', default='')
+PROFILE_DIR = config('PROFILE_DIR', default='profiles')
+# Seconds between stack samples
+PROFILE_SAMPLE_INTERVAL = config('PROFILE_SAMPLE_INTERVAL', default=0.005, cast=float)
\ No newline at end of file
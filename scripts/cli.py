@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Pipeline CLI
+Single entry point for every stage: python -m scripts <command> [ids...]
+
+Only argparse is imported up front; each command imports its own stage
+(and with it requests, the LLM SDKs, NumPy, ...) when it runs, so cheap
+commands start fast and a whole batch of IDs shares one process.
+"""
+
+import sys
+import argparse
+from typing import Callable, List, Optional
+
+EVALUATE_OPTIONS = ('cascade', 'dedup', 'priority', 'deadline', 'token_budget')
+
+
+def read_ids(ids: List[str], ids_file: Optional[str]) -> List[str]:
+    """Collect applicant IDs from arguments, a file, or stdin ('-')"""
+    collected = [i for i in ids if i != '-']
+    if '-' in ids:
+        collected.extend(line.strip() for line in sys.stdin)
+    if ids_file:
+        with open(ids_file, 'r') as f:
+            collected.extend(line.strip() for line in f)
+    return [i for i in collected if i and not i.startswith('#')]
+
+
+def priority(value: str) -> List[str]:
+    """--priority type: parse_priority, imported only when the option is given"""
+    from utils.scheduler import parse_priority
+    return parse_priority(value)
+
+
+def for_each_id(ids: List[str], action: Callable[[str], None]) -> int:
+    """Run action per ID, reporting failures; returns the number of failures"""
+    failures = 0
+    for applicant_id in ids:
+        try:
+            action(applicant_id)
+        except Exception as e:
+            failures += 1
+            print(f"Error processing applicant {applicant_id}: {e}")
+    if len(ids) > 1:
+        print(f"\nProcessed {len(ids) - failures}/{len(ids)} applicants")
+    return failures
+
+
+def warm_ids(client, ids: List[str]):
+    """
+    Resolve every Applicant ID with one projected scan before a batch, so
+    each applicant is then read by record ID instead of a formula query.
+    A single ID is cheaper to look up on its own.
+    """
+    if len(ids) > 1:
+        client.warm_id_cache()
+
+
+def cmd_compress(args) -> int:
+    from scripts.compress_json import compress_applicant_data
+    from utils.airtable_client import AirtableClient
+
+    client = AirtableClient()
+    warm_ids(client, args.applicant_ids)
+
+    def compress(applicant_id: str):
+        compress_applicant_data(applicant_id, client)
+        print(f"Successfully compressed data for applicant {applicant_id}")
+
+    return for_each_id(args.applicant_ids, compress)
+
+
+def cmd_decompress(args) -> int:
+    from scripts.decompress_json import decompress_json, load_stored_json
+    from utils.airtable_client import AirtableClient
+
+    client = AirtableClient()
+    warm_ids(client, args.applicant_ids)
+    return for_each_id(
+        args.applicant_ids,
+        lambda applicant_id: decompress_json(
+            applicant_id, load_stored_json(client, applicant_id), client),
+    )
+
+
+def cmd_shortlist(args) -> int:
+    from scripts.shortlist_candidates import shortlist_applicant, shortlist_candidates
+    from utils.airtable_client import AirtableClient
+
+    client = AirtableClient()
+    if not args.applicant_ids:
+        shortlist_candidates(client)
+        return 0
+
+    def shortlist(applicant_id: str):
+        applicant = client.get_applicant_record(applicant_id)
+        if not applicant:
+            raise ValueError(f"Applicant ID {applicant_id} not found")
+        shortlist_applicant(client, applicant)
+
+    return for_each_id(args.applicant_ids, shortlist)
+
+
+def cmd_evaluate(args) -> int:
+    from scripts.llm_evaluation import evaluate_applicants, evaluate_single_applicant
+    from utils.airtable_client import AirtableClient
+    from utils.llm_client import LLMClient
+    from utils.scheduler import EvaluationScheduler
+
+    client = AirtableClient()
+    llm_client = LLMClient()
+    if not args.applicant_ids:
+        options = {key: value for key, value in vars(args).items()
+                   if key in EVALUATE_OPTIONS}
+        evaluate_applicants(client=client, llm_client=llm_client, **options)
+        return 0
+
+    # The IDs share one deadline and token budget
+    budgets = {key: value for key, value in vars(args).items()
+               if key in ('deadline', 'token_budget')}
+    scheduler = EvaluationScheduler(**budgets)
+    warm_ids(client, args.applicant_ids)
+    return for_each_id(
+        args.applicant_ids,
+        lambda applicant_id: evaluate_single_applicant(applicant_id, client,
+                                                       llm_client, scheduler),
+    )
+
+
+def cmd_sync(args) -> int:
+    from scripts.compress_json import compress_applicant_data
+    from scripts.llm_evaluation import evaluate_single_applicant
+    from scripts.shortlist_candidates import shortlist_applicant
+    from utils.airtable_client import AirtableClient
+    from utils.llm_client import LLMClient
+
+    client = AirtableClient()
+    llm_client = LLMClient() if not args.no_evaluate else None
+    warm_ids(client, args.applicant_ids)
+
+    def sync(applicant_id: str):
+        compress_applicant_data(applicant_id, client)
+        applicant = client.get_applicant_record(applicant_id)
+        if not applicant:
+            raise ValueError(f"Applicant ID {applicant_id} not found")
+        shortlist_applicant(client, applicant)
+        if llm_client is not None:
+            evaluate_single_applicant(applicant_id, client, llm_client)
+
+    return for_each_id(args.applicant_ids, sync)
+
+
+def cmd_outbox(args) -> int:
+    """Send writes left queued by earlier runs and list those that keep failing"""
+    from utils.airtable_client import AirtableClient
+
+    outbox = AirtableClient().outbox
+    if args.retry:
+        print(f"Retrying {outbox.retry_failed()} failed writes")
+    queued = outbox.pending()
+    outbox.drain()
+    print(f"Sent {queued - outbox.pending()} of {queued} queued writes")
+    failed = outbox.failed()
+    for entry in failed:
+        print(f"  • {entry['key'] or entry['record_id']}: {entry['kind']} in "
+              f"{entry['table']} failed: {entry['error']}")
+    return 1 if outbox.pending() or failed else 0
+
+
+def plan_command(args) -> int:
+    """--plan: estimate the command's requests, LLM tokens and time without writing"""
+    from scripts.decompress_json import load_stored_json
+    from utils import planner
+    from utils.airtable_client import AirtableClient
+
+    client = AirtableClient()
+    ids = args.applicant_ids
+
+    def decompress_plan(applicant_id: str):
+        with planner.RequestCounter(client) as counter:
+            plan = planner.plan_decompress(client, applicant_id,
+                                           load_stored_json(client, applicant_id))
+        # The stored JSON is read first, as the decompress command does
+        reads = counter.reads + 2
+        return dict(plan, reads=reads,
+                    seconds=planner.estimate_seconds(reads, plan['writes']))
+
+    if args.command == 'compress':
+        plan = planner.plan_compress(client, ids)
+    elif args.command == 'decompress':
+        plan = planner.combine_plans('decompress', [decompress_plan(i) for i in ids])
+    elif args.command == 'shortlist':
+        plan = planner.combine_plans(
+            'shortlist', [planner.plan_shortlist_single(client, i) for i in ids]
+        ) if ids else planner.plan_shortlist(client)
+    elif args.command == 'evaluate':
+        options = {key: value for key, value in vars(args).items()
+                   if key in EVALUATE_OPTIONS}
+        plan = planner.combine_plans(
+            'evaluate', [planner.plan_evaluate_single(client, i) for i in ids]
+        ) if ids else planner.plan_evaluate(client, **options)
+    else:
+        plans = [planner.plan_compress(client, ids)]
+        plans.extend(planner.plan_shortlist_single(client, i) for i in ids)
+        if not args.no_evaluate:
+            plans.extend(planner.plan_evaluate_single(client, i) for i in ids)
+        plan = planner.combine_plans('sync', plans)
+        plan['applicants'] = len(ids)
+        plan['notes'].append(
+            "shortlist and evaluate are estimated from the currently stored JSON")
+
+    planner.print_plan(plan)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m scripts',
+                                     description='Airtable contractor pipeline')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, handler, help_text: str,
+                    ids_required: bool) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text)
+        ids_help = "Applicant IDs; '-' reads more from stdin"
+        if not ids_required:
+            ids_help += ' (default: all applicants)'
+        command.add_argument('applicant_ids', nargs='*', help=ids_help)
+        command.add_argument('--ids-file', help='File with one Applicant ID per line')
+        command.add_argument(
+            '--plan', action='store_true',
+            help='Estimate requests, LLM tokens and time without writing')
+        command.set_defaults(handler=handler, ids_required=ids_required)
+        return command
+
+    add_command('compress', cmd_compress,
+                'Compress child tables into Compressed JSON', True)
+    add_command('decompress', cmd_decompress,
+                'Restore child tables from Compressed JSON', True)
+    add_command('shortlist', cmd_shortlist, 'Apply the shortlist criteria', False)
+    evaluate = add_command('evaluate', cmd_evaluate,
+                           'Evaluate applicants with the LLM', False)
+    # Unset options fall back to the settings defaults of evaluate_applicants
+    evaluate.add_argument('--cascade', action='store_true', default=argparse.SUPPRESS,
+                          help='Pre-filter with the shortlist rules')
+    evaluate.add_argument('--dedup', action='store_true', default=argparse.SUPPRESS,
+                          help='Reuse evaluations across duplicates')
+    evaluate.add_argument('--priority', type=priority, default=argparse.SUPPRESS,
+                          help='Evaluation order, e.g. shortlisted,rule_score,recency')
+    evaluate.add_argument('--deadline', type=float, default=argparse.SUPPRESS,
+                          help='Seconds after which no new evaluation starts')
+    evaluate.add_argument('--token-budget', type=int, default=argparse.SUPPRESS,
+                          help='Estimated LLM tokens for this run')
+    sync = add_command('sync', cmd_sync,
+                       'Compress, shortlist and evaluate applicants', True)
+    sync.add_argument('--no-evaluate', action='store_true',
+                      help='Skip the LLM evaluation')
+    outbox = commands.add_parser('outbox',
+                                 help='Send writes left queued by earlier runs')
+    outbox.add_argument('--retry', action='store_true',
+                        help='Also retry writes that used up their attempts')
+    outbox.set_defaults(handler=cmd_outbox, ids_required=False, applicant_ids=[],
+                        ids_file=None, plan=False)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.applicant_ids = read_ids(args.applicant_ids, args.ids_file)
+    if args.ids_required and not args.applicant_ids:
+        parser.error(f"{args.command} needs at least one Applicant ID")
+
+    from utils.profiling import profile_stage
+
+    try:
+        with profile_stage(args.command):
+            failures = plan_command(args) if args.plan else args.handler(args)
+    except Exception as e:
+        print(f"Fatal Error: {e}")
+        sys.exit(1)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
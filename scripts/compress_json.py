@@ -7,18 +7,27 @@ Gathers data from linked tables and compresses into a single JSON object
 import sys
 import json
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 # Add the parent directory to the path to import modules
 sys.path.append('../')
 
 from utils.airtable_client import AirtableClient
+from utils.derived import DERIVED_VERSION, add_derived
+from utils.json_codec import decode_json, encode_json
+from utils.outbox import flushes_outbox
+from utils.profiling import profile_stage
+from utils.schema import validate_schema
 from config import settings
 
 
-def compress_applicant_data(applicant_id: str) -> Dict[str, Any]:
+@profile_stage('compress')
+@flushes_outbox
+def compress_applicant_data(applicant_id: str,
+                            client: Optional[AirtableClient] = None) -> Dict[str, Any]:
     """Compress all applicant data into a single JSON object"""
-    client = AirtableClient()
+    client = client or AirtableClient()
+    validate_schema(client)
 
     # Get all data for the applicant
     applicant_data = client.get_applicant_data(applicant_id)
@@ -46,25 +55,74 @@ def compress_applicant_data(applicant_id: str) -> Dict[str, Any]:
             {
                 "company": exp.get("Company"),
                 "title": exp.get("Title"),
-                "start": exp.get("Start Date"),   # Match Airtable field name
-                "end": exp.get("End Date"),
+                "start": exp.get("Start"),
+                "end": exp.get("End"),
                 "technologies": exp.get("Technologies", []),
             }
         )
 
+    # Precompute what shortlisting and the LLM prompt would otherwise re-derive
+    add_derived([compressed_json])
+
     # Update the applicant record with compressed JSON
     client.update_applicant_json(applicant_id, compressed_json)
 
     return compressed_json
 
 
+@profile_stage('backfill_derived')
+@flushes_outbox
+def backfill_derived(client: Optional[AirtableClient] = None) -> int:
+    """
+    Add or refresh the derived section of every stored compressed JSON in
+    one vectorized pass, without re-reading the child tables
+    """
+    client = client or AirtableClient()
+    validate_schema(client)
+    applicants = client.get_all_applicants(fields=['Applicant ID', 'Compressed JSON'])
+
+    stale = {}
+    for applicant in applicants:
+        try:
+            compressed_json = decode_json(applicant['fields'].get('Compressed JSON')
+                                          or '')
+        except ValueError:
+            continue
+        if (compressed_json.get('derived') or {}).get('version') != DERIVED_VERSION:
+            stale[applicant['id']] = compressed_json
+
+    add_derived(list(stale.values()))
+    for record_id, compressed_json in stale.items():
+        client.queue_update(settings.APPLICANTS_TABLE, record_id,
+                            {'Compressed JSON': encode_json(compressed_json)},
+                            key=str(client.get_applicant_id(record_id)))
+    return len(stale)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Compress applicant data into JSON")
-    parser.add_argument("applicant_id", help="Applicant ID to compress data for")
+    parser.add_argument("applicant_id", nargs="?",
+                        help="Applicant ID to compress data for")
+    parser.add_argument(
+        "--backfill-derived", action="store_true",
+        help="Add the derived section to all stored compressed JSON instead")
+    parser.add_argument("--plan", action="store_true",
+                        help="Estimate requests and time without writing")
 
     args = parser.parse_args()
+    if not args.applicant_id and not args.backfill_derived:
+        parser.error("an applicant_id or --backfill-derived is required")
 
     try:
+        if args.plan:
+            from utils.planner import plan_backfill_derived, plan_compress, print_plan
+            client = AirtableClient()
+            print_plan(plan_backfill_derived(client) if args.backfill_derived else
+                       plan_compress(client, [args.applicant_id]))
+            return
+        if args.backfill_derived:
+            print(f"Updated derived features for {backfill_derived()} applicants")
+            return
         compressed_json = compress_applicant_data(args.applicant_id)
         print(f"Successfully compressed data for applicant {args.applicant_id}")
         print(json.dumps(compressed_json, indent=2))
@@ -4,48 +4,77 @@ JSON Decompression Script
 Reads compressed JSON and updates child tables to match JSON state
 """
 
+import os
 import sys
 import json
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
 # Add the parent directory to the path to import modules
 sys.path.append('../')
 
 from utils.airtable_client import AirtableClient
+from utils.batch_writer import BatchWriter
+from utils.json_codec import decode_json
+from utils.profiling import profile_stage
+from utils.schema import validate_schema
 from config import settings
 
 
-def decompress_json(applicant_auto_id: str, compressed_json: Dict[str, Any]):
+def personal_fields(compressed_json: Dict[str, Any],
+                    applicant_rec_id: str) -> Dict[str, Any]:
+    personal_details = compressed_json["personal"]
+    return {
+        "Full Name": personal_details["full_name"],
+        "Email": personal_details["email"],
+        "Location": personal_details["location"],
+        "LinkedIn": personal_details.get("linkedin", ""),
+        "Applicant ID": [applicant_rec_id],
+    }
+
+
+def experience_fields(exp: Dict[str, Any], applicant_rec_id: str) -> Dict[str, Any]:
+    return {
+        "Company": exp["company"],
+        "Title": exp["title"],
+        "Start": exp["start"],
+        "End": exp.get("end", ""),
+        "Technologies": exp.get("technologies", []),
+        "Applicant ID": [applicant_rec_id],
+    }
+
+
+def salary_fields(compressed_json: Dict[str, Any],
+                  applicant_rec_id: str) -> Dict[str, Any]:
+    salary_prefs = compressed_json["salary"]
+    return {
+        "Preferred Rate": salary_prefs["preferred_rate"],
+        "Minimum Rate": salary_prefs["minimum_rate"],
+        "Currency": salary_prefs["currency"],
+        "Availability": salary_prefs["availability"],
+        "Applicant ID": [applicant_rec_id],
+    }
+
+
+@profile_stage('decompress')
+def decompress_json(applicant_auto_id: str, compressed_json: Dict[str, Any],
+                    client: Optional[AirtableClient] = None):
     """Decompress JSON and update child tables"""
-    client = AirtableClient()
+    client = client or AirtableClient()
+    validate_schema(client)
 
     # Find the actual Airtable record ID for this applicant
-    applicant_record = client.find_record_by_field(
-        settings.APPLICANTS_TABLE,
-        "Applicant ID",
-        applicant_auto_id
-    )
-    if not applicant_record:
+    applicant_rec_id = client.get_applicant_record_id(applicant_auto_id)
+    if not applicant_rec_id:
         raise ValueError(f"Applicant with Applicant ID={applicant_auto_id} not found")
 
-    applicant_rec_id = applicant_record["id"]
-
     # --- PERSONAL DETAILS ---
-    personal_details = compressed_json["personal"]
-
     personal_records = client.get_records(
         settings.PERSONAL_DETAILS_TABLE,
         filter_formula=f"{{Applicant ID}} = '{applicant_rec_id}'"
     )
 
-    personal_payload = {
-        "Full Name": personal_details["full_name"],
-        "Email": personal_details["email"],
-        "Location": personal_details["location"],
-        "LinkedIn": personal_details.get("linkedin", ""),
-        "Applicant ID": [applicant_rec_id],
-    }
+    personal_payload = personal_fields(compressed_json, applicant_rec_id)
 
     if personal_records:
         client.update_record(
@@ -65,31 +94,16 @@ def decompress_json(applicant_auto_id: str, compressed_json: Dict[str, Any]):
         client.delete_record(settings.WORK_EXPERIENCE_TABLE, record["id"])
 
     for exp in compressed_json["experience"]:
-        exp_payload = {
-            "Company": exp["company"],
-            "Title": exp["title"],
-            "Start": exp["start"],
-            "End": exp.get("end", ""),
-            "Technologies": exp.get("technologies", []),
-            "Applicant ID": [applicant_rec_id],
-        }
-        client.create_record(settings.WORK_EXPERIENCE_TABLE, exp_payload)
+        client.create_record(settings.WORK_EXPERIENCE_TABLE,
+                             experience_fields(exp, applicant_rec_id))
 
     # --- SALARY PREFERENCES ---
-    salary_prefs = compressed_json["salary"]
-
     salary_records = client.get_records(
         settings.SALARY_PREFERENCES_TABLE,
         filter_formula=f"{{Applicant ID}} = '{applicant_rec_id}'"
     )
 
-    salary_payload = {
-        "Preferred Rate": salary_prefs["preferred_rate"],
-        "Minimum Rate": salary_prefs["minimum_rate"],
-        "Currency": salary_prefs["currency"],
-        "Availability": salary_prefs["availability"],
-        "Applicant ID": [applicant_rec_id],
-    }
+    salary_payload = salary_fields(compressed_json, applicant_rec_id)
 
     if salary_records:
         client.update_record(
@@ -103,31 +117,214 @@ def decompress_json(applicant_auto_id: str, compressed_json: Dict[str, Any]):
     print(f"✅ Successfully decompressed JSON for applicant {applicant_auto_id} → recId {applicant_rec_id}")
 
 
+def load_json_file(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_stored_json(client: AirtableClient, applicant_id: str) -> Dict[str, Any]:
+    """Read the Compressed JSON currently stored on an applicant"""
+    applicant_record = client.get_applicant_record(applicant_id)
+    if not applicant_record:
+        raise ValueError(f"Applicant ID {applicant_id} not found")
+
+    compressed_json_str = applicant_record["fields"].get("Compressed JSON", "{}")
+    return decode_json(compressed_json_str)
+
+
+# Payloads queued before their writes are sent
+BULK_CHUNK = 500
+
+
+def iter_payloads(
+        source: str) -> Iterator[Tuple[str, Union[Dict[str, Any], Exception]]]:
+    """
+    Stream (applicant ID, compressed JSON) pairs from a JSONL file of
+    {"applicant_id": ..., "compressed_json": {...}} lines, or from a directory
+    of such files and/or <applicant_id>.json files. Unreadable entries are
+    yielded with the exception in place of the JSON.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source))]
+    else:
+        paths = [source]
+    for path in paths:
+        if path.endswith(".json"):
+            applicant_id = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with open(path, "r") as f:
+                    yield applicant_id, json.load(f)
+            except ValueError as e:
+                yield applicant_id, e
+            continue
+        if os.path.isdir(source) and not path.endswith(".jsonl"):
+            continue
+        with open(path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                    yield str(item["applicant_id"]), item["compressed_json"]
+                except (ValueError, KeyError, TypeError) as e:
+                    error = ValueError(f"Invalid payload line: {e}")
+                    yield f"{path}:{line_number}", error
+
+
+def linked_children(client: AirtableClient, table_name: str) -> Dict[str, List[str]]:
+    """Applicants record ID -> its child record IDs, from one projected scan"""
+    children: Dict[str, List[str]] = {}
+    for record in client.get_records(table_name, fields=["Applicant ID"]):
+        for applicant_rec_id in record["fields"].get("Applicant ID", []):
+            children.setdefault(applicant_rec_id, []).append(record["id"])
+    return children
+
+
+def queue_restore(writer: BatchWriter, applicant_id: str, applicant_rec_id: str,
+                  compressed_json: Dict[str, Any],
+                  children: Dict[str, Dict[str, List[str]]]):
+    """Queue the same changes decompress_json makes, against prefetched child records"""
+    # Build every payload first, so a malformed JSON queues nothing
+    personal = personal_fields(compressed_json, applicant_rec_id)
+    experience = [experience_fields(exp, applicant_rec_id)
+                  for exp in compressed_json["experience"]]
+    salary = salary_fields(compressed_json, applicant_rec_id)
+
+    for table_name, fields in ((settings.PERSONAL_DETAILS_TABLE, personal),
+                               (settings.SALARY_PREFERENCES_TABLE, salary)):
+        existing = children[table_name].get(applicant_rec_id)
+        if existing:
+            writer.update(table_name, existing[0], fields, applicant_id)
+        else:
+            writer.create(table_name, fields, applicant_id)
+
+    for record_id in children[settings.WORK_EXPERIENCE_TABLE].get(applicant_rec_id, []):
+        writer.delete(settings.WORK_EXPERIENCE_TABLE, record_id, applicant_id)
+    for fields in experience:
+        writer.create(settings.WORK_EXPERIENCE_TABLE, fields, applicant_id)
+
+
+@profile_stage('decompress_bulk')
+def decompress_bulk(source: str, client: Optional[AirtableClient] = None,
+                    workers: int = settings.WRITE_WORKERS,
+                    plan: bool = False) -> Dict[str, Any]:
+    """
+    Restore child tables for every payload under source. Applicant IDs and
+    existing child records are each read with one scan up front; writes go
+    out as concurrent batches. Returns counts, write requests and error
+    messages by applicant. With plan, batches are counted instead of sent.
+    """
+    client = client or AirtableClient()
+    validate_schema(client)
+
+    print("Resolving applicant IDs and prefetching child records...")
+    record_ids = {
+        str(record["fields"]["Applicant ID"]): record["id"]
+        for record in client.get_all_applicants(fields=["Applicant ID"])
+        if "Applicant ID" in record["fields"]
+    }
+    children = {
+        table_name: linked_children(client, table_name)
+        for table_name in (settings.PERSONAL_DETAILS_TABLE,
+                           settings.WORK_EXPERIENCE_TABLE,
+                           settings.SALARY_PREFERENCES_TABLE)
+    }
+
+    writer = BatchWriter(client, workers)
+    errors: Dict[str, List[str]] = {}
+    seen = set()
+    requests = 0
+
+    def fail(key: str, message: str):
+        errors.setdefault(key, []).append(message)
+
+    def flush():
+        nonlocal requests
+        requests += len(writer.batches())
+        if plan:
+            writer.clear()
+            return
+        for applicant_id, messages in writer.flush().items():
+            errors.setdefault(applicant_id, []).extend(messages)
+
+    for applicant_id, compressed_json in iter_payloads(source):
+        if isinstance(compressed_json, Exception):
+            fail(applicant_id, str(compressed_json))
+            continue
+        if applicant_id in seen:
+            # Keyed apart from the applicant, whose first payload may have been
+            # restored fine
+            fail(f"{applicant_id} (repeated)",
+                 "Duplicate payload, only the first one was applied")
+            continue
+        seen.add(applicant_id)
+
+        applicant_rec_id = record_ids.get(applicant_id)
+        if not applicant_rec_id:
+            fail(applicant_id, f"Applicant with Applicant ID={applicant_id} not found")
+            continue
+        try:
+            queue_restore(writer, applicant_id, applicant_rec_id, compressed_json,
+                          children)
+        except (KeyError, TypeError, AttributeError) as e:
+            fail(applicant_id, f"Invalid compressed JSON: missing {e}")
+            continue
+
+        if len(writer) >= BULK_CHUNK:
+            flush()
+    flush()
+
+    failed = len(seen.intersection(errors))
+    return {"applicants": len(seen), "restored": len(seen) - failed, "failed": failed,
+            "requests": requests, "errors": errors}
+
+
 def main():
     parser = argparse.ArgumentParser(description="Decompress JSON and update child tables")
-    parser.add_argument("applicant_id", help="Applicant ID (autoNumber, from Applicants table)")
+    parser.add_argument("applicant_id", nargs="?",
+                        help="Applicant ID (autoNumber, from Applicants table)")
     parser.add_argument("--json-file", help="Path to JSON file (if not using Airtable stored JSON)")
+    parser.add_argument("--bulk", metavar="PATH",
+                        help="Restore every payload in a JSONL file or directory "
+                             "instead of one applicant")
+    parser.add_argument("--workers", type=int, default=settings.WRITE_WORKERS,
+                        help="Concurrent batch writes")
+    parser.add_argument("--plan", action="store_true",
+                        help="Estimate requests and time without writing")
 
     args = parser.parse_args()
+    if not args.applicant_id and not args.bulk:
+        parser.error("an applicant_id or --bulk is required")
 
     try:
+        client = AirtableClient()
+        if args.plan:
+            from utils.planner import plan_decompress, plan_decompress_bulk, print_plan
+            if args.bulk:
+                print_plan(plan_decompress_bulk(client, args.bulk, args.workers))
+            else:
+                if args.json_file:
+                    compressed_json = load_json_file(args.json_file)
+                else:
+                    compressed_json = load_stored_json(client, args.applicant_id)
+                print_plan(plan_decompress(client, args.applicant_id, compressed_json))
+            return
+        if args.bulk:
+            result = decompress_bulk(args.bulk, client, args.workers)
+            for applicant_id, messages in sorted(result["errors"].items()):
+                for message in messages:
+                    print(f"❌ {applicant_id}: {message}")
+            print(f"Restored {result['restored']}/{result['applicants']} applicants")
+            if result["errors"]:
+                sys.exit(1)
+            return
+
         if args.json_file:
-            with open(args.json_file, "r") as f:
-                compressed_json = json.load(f)
+            compressed_json = load_json_file(args.json_file)
         else:
-            client = AirtableClient()
-            applicant_record = client.find_record_by_field(
-                settings.APPLICANTS_TABLE,
-                "Applicant ID",
-                args.applicant_id
-            )
-            if not applicant_record:
-                raise ValueError(f"Applicant ID {args.applicant_id} not found")
-
-            compressed_json_str = applicant_record["fields"].get("Compressed JSON", "{}")
-            compressed_json = json.loads(compressed_json_str)
-
-        decompress_json(args.applicant_id, compressed_json)
+            compressed_json = load_stored_json(client, args.applicant_id)
+
+        decompress_json(args.applicant_id, compressed_json, client)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -49,5 +49,42 @@ def find_base_id():
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
 
+def show_schema():
+    """Refresh the schema cache for AIRTABLE_BASE_ID and check the pipeline's fields"""
+    from utils.airtable_client import AirtableClient
+    from utils.schema import PIPELINE_FIELDS, BaseSchema
+
+    client = AirtableClient()
+    if not client.base_id:
+        print("Please set AIRTABLE_BASE_ID in your .env file first")
+        return
+
+    try:
+        schema = BaseSchema.load(client, refresh=True)
+    except requests.exceptions.RequestException as e:
+        print(f"Error: {e}")
+        return
+
+    for table_id, table in schema.tables.items():
+        used = " (used by the pipeline)" if table_id in PIPELINE_FIELDS else ""
+        print(f"{table['name']} ({table_id}){used}")
+        for field in table.get('fields', []):
+            print(f"  {field['name']:<24} {field['id']}  {field['type']}")
+
+    missing = schema.missing_fields()
+    if missing:
+        print("\nMissing fields: " + ", ".join(missing))
+    else:
+        print("\nAll pipeline fields present")
+
+
 if __name__ == '__main__':
-    find_base_id()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='List Airtable bases, or the schema of the configured base')
+    parser.add_argument('--schema', action='store_true',
+                        help='Show tables and fields of AIRTABLE_BASE_ID')
+    if parser.parse_args().schema:
+        show_schema()
+    else:
+        find_base_id()
\ No newline at end of file
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Duplicate Detection Script
+Groups applicants whose compressed JSON is identical or nearly identical
+"""
+
+import sys
+import argparse
+
+# Add the parent directory to the path to import modules
+sys.path.append('../')
+
+from utils.airtable_client import AirtableClient
+from utils.dedup import DuplicateIndex
+
+
+def find_duplicates():
+    """Print duplicate applicant groups"""
+    client = AirtableClient()
+
+    print("Fetching applicants from Airtable...")
+    applicants = client.get_all_applicants(
+        fields=['Applicant ID', 'Compressed JSON', 'LLM Score'])
+    print(f"Retrieved {len(applicants)} applicants from Airtable")
+
+    duplicates = DuplicateIndex(applicants)
+    applicant_ids = {a['id']: a['fields'].get('Applicant ID') for a in applicants}
+
+    members_by_group = {}
+    for record_id, group in duplicates.group_of.items():
+        # Records without an Applicant ID are listed by record ID, after the others
+        applicant_id = applicant_ids[record_id]
+        members_by_group.setdefault(group, []).append(
+            (applicant_id is None, applicant_id or 0, record_id))
+
+    for group, members in sorted(members_by_group.items()):
+        evaluated = " (evaluated)" if group in duplicates.results else ""
+        labels = [record_id if missing else str(applicant_id)
+                  for missing, applicant_id, record_id in sorted(members)]
+        print(f"Group {group + 1}{evaluated}: {', '.join(labels)}")
+
+    print(f"\nFinished. Duplicate groups: {duplicates.groups}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find duplicate applications')
+    parser.parse_args()
+
+    try:
+        find_duplicates()
+    except Exception as e:
+        print(f"Fatal Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,109 +6,124 @@ Uses LLM to evaluate, enrich, and sanity-check each application
 
 import sys
 import argparse
-import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 
 # Add the parent directory to the path to import modules
 sys.path.append('../')
 
 from utils.airtable_client import AirtableClient
-from utils.llm_client import LLMClient
+from utils.llm_client import (EVALUATION_FAILED, LLMClient, LLMQuotaExceeded,
+                              start_call_quota)
+from utils.cascade import EvaluationCascade, is_evaluated, is_screened_out, skip_marker
+from utils.json_codec import decode_json
+from utils.outbox import flushes_outbox
+from utils.profiling import profile_stage
+from utils.scheduler import DEADLINE_REACHED, EvaluationScheduler, parse_priority
+from utils.schema import STAGE_FIELDS, validate_schema
 from config import settings
 
 
-def evaluate_applicants():
-    """Evaluate all applicants using LLM"""
-    client = AirtableClient()
-    llm_client = LLMClient()
-    
-    print("Fetching applicants from Airtable...")
-    applicants = client.get_records(settings.APPLICANTS_TABLE)
-    print(f"Retrieved {len(applicants)} applicants from Airtable")
+def record_skip(client: AirtableClient, applicant: Dict[str, Any], reason: str):
+    """
+    Store why the cascade kept an applicant away from the LLM. No score is
+    written (a stale one is cleared), and the marker names the Compressed
+    JSON screened, so the applicant is screened again once it changes.
+    """
+    marker = skip_marker(applicant['fields'].get('Compressed JSON') or '')
+    client.queue_update(
+        settings.APPLICANTS_TABLE,
+        applicant['id'],
+        {
+            'LLM Summary': f"{marker}: {reason}",
+            'LLM Score': None,
+            'LLM Follow-Ups': '',
+        },
+        key=str(applicant['fields'].get('Applicant ID'))
+    )
 
-    evaluated_count = 0
-    
-    for applicant in applicants:
-        applicant_id = applicant['fields'].get('Applicant ID')
-        print(f"\nProcessing applicant: {applicant_id}")
-
-        if not applicant_id:
-            print("Skipping record: No Applicant ID found")
-            continue
-        
-        # Skip if already evaluated and JSON hasn't changed
-        compressed_json = applicant['fields'].get('Compressed JSON')
-        if (applicant['fields'].get('LLM Score') and 
-            applicant['fields'].get('Compressed JSON') == compressed_json):
-            print(f"⏭ Skipping applicant {applicant_id}: Already evaluated")
-            continue
-        
-        # Get applicant data
-        try:
+
+def load_compressed(client: AirtableClient,
+                    applicant: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decode an applicant's Compressed JSON, fetching it if the record lacks it"""
+    applicant_id = applicant['fields'].get('Applicant ID')
+    try:
+        compressed_json_str = applicant['fields'].get('Compressed JSON')
+        if compressed_json_str is None:
             print(f"Fetching detailed applicant data for {applicant_id}...")
             applicant_data = client.get_applicant_data(applicant_id)
             compressed_json_str = applicant_data['applicant'].get('Compressed JSON', '{}')
-            compressed_data = json.loads(compressed_json_str.replace("'", '"'))
-            print(f"Applicant data loaded for {applicant_id}")
-        except Exception as e:
-            print(f"Error getting data for applicant {applicant_id}: {e}")
-            continue
-        
-        # Evaluate with LLM
-        try:
-            print(f"Sending applicant {applicant_id} data to LLM for evaluation...")
-            evaluation = llm_client.evaluate_applicant(compressed_data)
-
-            # Build Airtable-safe payload
-            update_payload = {
-                'LLM Summary': str(evaluation.get('summary', '')),
-                'LLM Score': float(evaluation.get('score', 0)),
-                'LLM Follow-Ups': "\n".join(map(str, evaluation.get('follow_ups', [])))
-            }
-
-            # Debug log
-            print(f"Updating Airtable record for {applicant_id} with: {update_payload}")
-            
-            # Update applicant record
-            client.update_record(
-                settings.APPLICANTS_TABLE,
-                applicant['id'],
-                update_payload
-            )
-            
-            evaluated_count += 1
-            print(f"Applicant {applicant_id} evaluated successfully - Score: {evaluation['score']}")
-            
-        except Exception as e:
-            print(f"Error evaluating applicant {applicant_id}: {e}")
-            continue
-    
-    print(f"\nFinished evaluating applicants. Total evaluated: {evaluated_count}")
+        compressed_data = decode_json(compressed_json_str.replace("'", '"'))
+        print(f"Applicant data loaded for {applicant_id}")
+        return compressed_data
+    except Exception as e:
+        print(f"Error getting data for applicant {applicant_id}: {e}")
+        return None
 
 
-def evaluate_single_applicant(applicant_id: str):
-    """Evaluate a single applicant using LLM"""
-    client = AirtableClient()
-    llm_client = LLMClient()
-    
-    print(f"\nEvaluating single applicant: {applicant_id}")
+def reuse_duplicate(client: AirtableClient, duplicates,
+                    applicant: Dict[str, Any]) -> bool:
+    """Queue the evaluation of a duplicate application, if there is one to reuse"""
+    applicant_id = applicant['fields'].get('Applicant ID')
+    reusable = duplicates.reusable(applicant['id'])
+    if not reusable:
+        return False
+    try:
+        client.queue_update(settings.APPLICANTS_TABLE, applicant['id'],
+                            reusable['payload'], key=str(applicant_id))
+        print(f"Applicant {applicant_id} reuses evaluation of duplicate "
+              f"{reusable['source']}")
+        return True
+    except Exception as e:
+        print(f"Error reusing evaluation for applicant {applicant_id}: {e}")
+        return False
 
-    # Get applicant data
+
+def screen_out(evaluation_cascade: EvaluationCascade, client: AirtableClient,
+               applicant: Dict[str, Any], compressed_data: Dict[str, Any]) -> bool:
+    """Run the cascade and record a skip; raises LLMQuotaExceeded from screening"""
+    applicant_id = applicant['fields'].get('Applicant ID')
+    reason = evaluation_cascade.skip_reason(applicant_id, compressed_data)
+    if not reason:
+        return False
+    print(f"⏭ Skipping applicant {applicant_id}: {reason}")
     try:
-        print("Fetching applicant data...")
-        applicant_data = client.get_applicant_data(applicant_id)
-        compressed_json_str = applicant_data['applicant'].get('Compressed JSON', '{}')
-        compressed_data = json.loads(compressed_json_str.replace("'", '"'))
-        print(f"Loaded data for {applicant_id}")
+        record_skip(client, applicant, reason)
     except Exception as e:
-        print(f"Error getting data for applicant {applicant_id}: {e}")
-        return
-    
-    # Evaluate with LLM
+        print(f"Error recording skip for applicant {applicant_id}: {e}")
+    return True
+
+
+def evaluate_and_store(client: AirtableClient, llm_client: LLMClient,
+                       scheduler: EvaluationScheduler, record_id: str,
+                       applicant_id: str, compressed_data: Dict[str, Any]
+                       ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Evaluate one applicant within the scheduler's deadline and token budget
+    and queue the result. Returns the queued payload, or None and why the
+    applicant was deferred or not evaluated. The reserved tokens are given
+    back if the call fails or the call budget (LLMQuotaExceeded) is spent.
+    """
+    # Only start the call if it fits the deadline and the token budget
+    tokens = llm_client.estimate_tokens(compressed_data)
+    reason = scheduler.defer_reason(applicant_id, tokens,
+                                    llm_client.router.expected_latency())
+    if reason:
+        print(f"⏸ Deferring applicant {applicant_id}: {reason}")
+        return None, reason
+
     try:
-        print("Sending data to LLM for evaluation...")
+        print(f"Sending applicant {applicant_id} data to LLM for evaluation...")
         evaluation = llm_client.evaluate_applicant(compressed_data)
+    except LLMQuotaExceeded:
+        scheduler.release(tokens)
+        raise
+    if evaluation.get('summary') == EVALUATION_FAILED:
+        # Not stored, so the applicant is evaluated again by the next run
+        scheduler.release(tokens)
+        print(f"Error evaluating applicant {applicant_id}: no usable LLM reply")
+        return None, EVALUATION_FAILED
 
+    try:
         # Build Airtable-safe payload
         update_payload = {
             'LLM Summary': str(evaluation.get('summary', '')),
@@ -116,45 +131,254 @@ def evaluate_single_applicant(applicant_id: str):
             'LLM Follow-Ups': "\n".join(map(str, evaluation.get('follow_ups', [])))
         }
 
-        print("Searching for Airtable record...")
-        applicant_records = client.get_records(
+        # Debug log
+        print(f"Updating Airtable record for {applicant_id} with: {update_payload}")
+        client.queue_update(
             settings.APPLICANTS_TABLE,
-            filter_formula=f"{{Applicant ID}} = '{applicant_id}'"
+            record_id,
+            update_payload,
+            key=str(applicant_id)
         )
-        
-        if applicant_records:
-            print(f"Updating Airtable record for {applicant_id}: {update_payload}")
-            client.update_record(
-                settings.APPLICANTS_TABLE,
-                applicant_records[0]['id'],
-                update_payload
-            )
-            
-            print(f"Applicant {applicant_id} evaluated successfully")
-            print(f"Summary: {evaluation['summary']}")
-            print(f"Issues: {evaluation['issues']}")
-            print("Follow-ups:")
-            for follow_up in evaluation['follow_ups']:
-                print(f"  • {follow_up}")
-                
-        else:
-            print(f"Applicant {applicant_id} not found in Airtable")
-            
     except Exception as e:
         print(f"Error evaluating applicant {applicant_id}: {e}")
+        return None, str(e)
+
+    print(f"Applicant {applicant_id} evaluated successfully - "
+          f"Score: {update_payload['LLM Score']}")
+    return update_payload, None
+
+
+def evaluate_one(client: AirtableClient, llm_client: LLMClient,
+                 scheduler: EvaluationScheduler,
+                 evaluation_cascade: Optional[EvaluationCascade], duplicates,
+                 applicant: Dict[str, Any]) -> Optional[str]:
+    """
+    Skip, reuse or evaluate one scanned applicant. Returns 'evaluated',
+    'reused', the reason it was not evaluated, or None when it was skipped.
+    """
+    applicant_id = applicant['fields'].get('Applicant ID')
+    print(f"\nProcessing applicant: {applicant_id}")
+    if not applicant_id:
+        print("Skipping record: No Applicant ID found")
+        return None
+
+    # Skip if already evaluated, or screened out with unchanged data
+    if is_evaluated(applicant['fields']):
+        print(f"⏭ Skipping applicant {applicant_id}: Already evaluated")
+        return None
+    if is_screened_out(applicant['fields']):
+        print(f"⏭ Skipping applicant {applicant_id}: Already screened out")
+        return None
+
+    # Reuse the evaluation of a duplicate application
+    if duplicates is not None and reuse_duplicate(client, duplicates, applicant):
+        return 'reused'
+
+    compressed_data = load_compressed(client, applicant)
+    if compressed_data is None:
+        return None
+
+    # Cheap rules (and optional screening model) before the main LLM
+    if evaluation_cascade is not None and screen_out(evaluation_cascade, client,
+                                                     applicant, compressed_data):
+        return None
+
+    payload, reason = evaluate_and_store(client, llm_client, scheduler, applicant['id'],
+                                         applicant_id, compressed_data)
+    if payload is None:
+        return reason
+    if duplicates is not None:
+        duplicates.store(applicant['id'], payload, applicant_id)
+    return 'evaluated'
+
+
+def print_summary(counts: Dict[str, int],
+                  evaluation_cascade: Optional[EvaluationCascade],
+                  scheduler: EvaluationScheduler):
+    """Print what a batch run evaluated, reused, skipped and deferred"""
+    print(f"\nFinished evaluating applicants. Total evaluated: {counts['evaluated']}")
+    if counts['reused']:
+        print(f"Reused from duplicates: {counts['reused']}")
+    if evaluation_cascade is not None:
+        print(f"Skipped by cascade: {len(evaluation_cascade.skipped)}")
+        for skipped_id, reason in evaluation_cascade.skipped:
+            print(f"  • {skipped_id}: {reason}")
+    if scheduler.tokens_used:
+        print(f"Estimated tokens used: {scheduler.tokens_used}")
+    if scheduler.deferred:
+        print(f"Deferred: {len(scheduler.deferred)}")
+        for deferred_id, reason in scheduler.deferred:
+            print(f"  • {deferred_id}: {reason}")
+
+
+@profile_stage('evaluate')
+@flushes_outbox
+def evaluate_applicants(cascade: bool = settings.CASCADE_ENABLED,
+                        dedup: bool = settings.DEDUP_ENABLED,
+                        client: Optional[AirtableClient] = None,
+                        llm_client: Optional[LLMClient] = None,
+                        applicants: Optional[List[Dict[str, Any]]] = None,
+                        priority: Sequence[str] = settings.EVALUATION_PRIORITY,
+                        deadline: float = settings.EVALUATION_DEADLINE,
+                        token_budget: int = settings.LLM_TOKEN_BUDGET
+                        ) -> Dict[str, int]:
+    """Evaluate all applicants (or the given Applicants records), best priority first"""
+    client = client or AirtableClient()
+    validate_schema(client)
+    llm_client = llm_client or LLMClient()
+    # Budgets are per run: a fresh LLM_MAX_CALLS quota here, the token budget in
+    # the scheduler
+    start_call_quota()
+    evaluation_cascade = EvaluationCascade() if cascade else None
+    scheduler = EvaluationScheduler(priority, deadline, token_budget)
+    
+    if applicants is None:
+        print("Fetching applicants from Airtable...")
+        applicants = client.get_all_applicants(fields=list(STAGE_FIELDS['evaluate']))
+        print(f"Retrieved {len(applicants)} applicants from Airtable")
+
+    duplicates = None
+    if dedup:
+        # The dedup module is only loaded when duplicate detection is asked for
+        from utils.dedup import DuplicateIndex
+        duplicates = DuplicateIndex(applicants)
+        print(f"Found {duplicates.groups} duplicate groups covering "
+              f"{len(duplicates.group_of)} applicants")
+
+    applicants = scheduler.order(applicants, client)
+    counts = {'evaluated': 0, 'reused': 0}
+    
+    for index, applicant in enumerate(applicants):
+        if scheduler.expired:
+            print(f"Stopping: {DEADLINE_REACHED}")
+            scheduler.defer_all(applicants[index:], DEADLINE_REACHED)
+            break
+        try:
+            outcome = evaluate_one(client, llm_client, scheduler, evaluation_cascade,
+                                   duplicates, applicant)
+        except LLMQuotaExceeded as e:
+            print(f"Stopping: {e}")
+            scheduler.defer_all(applicants[index:], str(e))
+            break
+        if outcome == DEADLINE_REACHED:
+            # This applicant is already deferred, the rest follow it
+            print(f"Stopping: {outcome}")
+            scheduler.defer_all(applicants[index + 1:], outcome)
+            break
+        if outcome in counts:
+            counts[outcome] += 1
+    
+    llm_client.save_latency()
+    print_summary(counts, evaluation_cascade, scheduler)
+
+    return {
+        'applicants': len(applicants),
+        'evaluated': counts['evaluated'],
+        'reused': counts['reused'],
+        'skipped': len(evaluation_cascade.skipped) if evaluation_cascade else 0,
+        'deferred': len(scheduler.deferred),
+    }
+
+
+@profile_stage('evaluate')
+@flushes_outbox
+def evaluate_single_applicant(applicant_id: str,
+                              client: Optional[AirtableClient] = None,
+                              llm_client: Optional[LLMClient] = None,
+                              scheduler: Optional[EvaluationScheduler] = None):
+    """
+    Evaluate a single applicant using LLM. Pass one scheduler to several
+    calls to share its deadline and token budget between them.
+    """
+    client = client or AirtableClient()
+    validate_schema(client)
+    llm_client = llm_client or LLMClient()
+    scheduler = scheduler or EvaluationScheduler()
+    
+    print(f"\nEvaluating single applicant: {applicant_id}")
+
+    # Get applicant data
+    try:
+        print("Fetching applicant data...")
+        applicant_data = client.get_applicant_data(applicant_id)
+        compressed_json_str = applicant_data['applicant'].get('Compressed JSON', '{}')
+        compressed_data = decode_json(compressed_json_str.replace("'", '"'))
+        print(f"Loaded data for {applicant_id}")
+
+        print("Searching for Airtable record...")
+        record_id = client.get_applicant_record_id(applicant_id)
+    except Exception as e:
+        print(f"Error getting data for applicant {applicant_id}: {e}")
+        return
+    if not record_id:
+        print(f"Applicant {applicant_id} not found in Airtable")
+        return
+
+    # Evaluate with LLM
+    try:
+        update_payload, _ = evaluate_and_store(client, llm_client, scheduler, record_id,
+                                               applicant_id, compressed_data)
+    except LLMQuotaExceeded as e:
+        print(f"Stopping: {e}")
+        return
+    llm_client.save_latency()
+
+    if update_payload is not None:
+        print(f"Summary: {update_payload['LLM Summary']}")
+        print("Follow-ups:")
+        for follow_up in update_payload['LLM Follow-Ups'].splitlines():
+            print(f"  • {follow_up}")
 
 
 def main():
     parser = argparse.ArgumentParser(description='Evaluate applicants using LLM')
     parser.add_argument('--applicant-id', help='Evaluate a specific applicant')
+    parser.add_argument(
+        '--cascade', action='store_true', default=settings.CASCADE_ENABLED,
+        help='Pre-filter applicants with the shortlist rules before the LLM')
+    parser.add_argument('--dedup', action='store_true', default=settings.DEDUP_ENABLED,
+                        help='Reuse one evaluation across duplicate applications')
+    parser.add_argument(
+        '--priority', type=parse_priority, default=settings.EVALUATION_PRIORITY,
+        help='Comma-separated evaluation order, e.g. shortlisted,rule_score,recency')
+    parser.add_argument(
+        '--deadline', type=float, default=settings.EVALUATION_DEADLINE,
+        help='Stop starting evaluations after this many seconds (0 = no deadline)')
+    parser.add_argument(
+        '--token-budget', type=int, default=settings.LLM_TOKEN_BUDGET,
+        help='Estimated LLM tokens allowed for this run (0 = unlimited)')
+    parser.add_argument('--snapshot',
+                        help='Replay against a snapshot directory instead of Airtable')
+    parser.add_argument('--output',
+                        help='With --snapshot, file that captures the writes')
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate requests, LLM tokens and time without writing')
     
     args = parser.parse_args()
     
     try:
-        if args.applicant_id:
-            evaluate_single_applicant(args.applicant_id)
+        client = None
+        if args.snapshot:
+            from utils.snapshot import SnapshotClient
+            client = SnapshotClient(args.snapshot, args.output)
+
+        if args.plan:
+            from utils.planner import plan_evaluate, plan_evaluate_single, print_plan
+            client = client or AirtableClient()
+            if args.applicant_id:
+                print_plan(plan_evaluate_single(client, args.applicant_id))
+            else:
+                print_plan(plan_evaluate(client, args.cascade, args.dedup,
+                                         args.priority, args.deadline,
+                                         args.token_budget))
+        elif args.applicant_id:
+            scheduler = EvaluationScheduler(deadline=args.deadline,
+                                            token_budget=args.token_budget)
+            evaluate_single_applicant(args.applicant_id, client, scheduler=scheduler)
         else:
-            evaluate_applicants()
+            evaluate_applicants(cascade=args.cascade, dedup=args.dedup, client=client,
+                                priority=args.priority, deadline=args.deadline,
+                                token_budget=args.token_budget)
     except Exception as e:
         print(f"Fatal Error: {e}")
         sys.exit(1)
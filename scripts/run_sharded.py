@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Sharded Pipeline Script
+Runs shortlisting or evaluation across a process pool that shares one
+Airtable rate limit and one LLM call budget
+"""
+
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List
+
+# Add the parent directory to the path to import modules
+sys.path.append('../')
+
+from utils.airtable_client import AirtableClient, set_rate_limiter
+from utils.profiling import profile_stage, reset_profiler
+from utils.rate_limiter import SharedQuota, SharedRateLimiter
+from utils.scheduler import parse_priority
+from utils.schema import STAGE_FIELDS, validate_schema
+from config import settings
+
+STAGES = ('shortlist', 'evaluate')
+
+
+def _init_worker(limiter: SharedRateLimiter, quota: SharedQuota,
+                 token_quota: SharedQuota):
+    from utils import llm_client, scheduler
+    # A forked worker profiles (and writes) its own stages, not the parent's copy
+    reset_profiler()
+    set_rate_limiter(limiter)
+    llm_client.set_call_quota(quota)
+    scheduler.set_token_quota(token_quota)
+
+
+def _run_shard(stage: str, applicants: List[Dict[str, Any]],
+               options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one stage over one shard inside a worker process"""
+    started = time.monotonic()
+    if stage == 'shortlist':
+        from scripts.shortlist_candidates import shortlist_candidates
+        metrics = shortlist_candidates(applicants=applicants)
+    else:
+        from scripts.llm_evaluation import evaluate_applicants
+        metrics = evaluate_applicants(applicants=applicants, **options)
+    return {**metrics, 'seconds': time.monotonic() - started}
+
+
+def make_shards(applicants: List[Dict[str, Any]], workers: int,
+                dedup: bool) -> List[List[Dict[str, Any]]]:
+    """
+    Split applicants into one shard per worker. With dedup, each duplicate
+    group is kept in a single shard so its evaluation can still be shared.
+    """
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(workers)]
+    group_of: Dict[str, int] = {}
+    if dedup:
+        from utils.dedup import DuplicateIndex
+        group_of = DuplicateIndex(applicants).group_of
+
+    for index, applicant in enumerate(applicants):
+        key = group_of.get(applicant['id'])
+        shard = key % workers if key is not None else index % workers
+        shards[shard].append(applicant)
+    return [shard for shard in shards if shard]
+
+
+@profile_stage('sharded')
+def run_sharded(stage: str, workers: int = settings.SHARD_WORKERS,
+                **options) -> Dict[str, Any]:
+    """Fetch applicants once, process shards in parallel and merge their metrics"""
+    limiter = SharedRateLimiter(settings.AIRTABLE_RATE_LIMIT)
+    quota = SharedQuota(settings.LLM_MAX_CALLS)
+    token_quota = SharedQuota(options.get('token_budget', settings.LLM_TOKEN_BUDGET))
+
+    started = time.monotonic()
+    set_rate_limiter(limiter)
+    print("Fetching applicants from Airtable...")
+    client = AirtableClient()
+    validate_schema(client)
+    applicants = client.get_all_applicants(fields=list(STAGE_FIELDS[stage]))
+    if options.get('priority'):
+        # Shards are dealt round-robin, so each one keeps the global order
+        from utils.scheduler import EvaluationScheduler
+        applicants = EvaluationScheduler(options['priority']).order(applicants, client)
+    shards = make_shards(applicants, workers, options.get('dedup', False))
+    print(f"Retrieved {len(applicants)} applicants, "
+          f"running {stage} on {len(shards)} shards")
+
+    totals: Counter = Counter()
+    with ProcessPoolExecutor(max_workers=len(shards) or 1, initializer=_init_worker,
+                             initargs=(limiter, quota, token_quota)) as pool:
+        futures = [pool.submit(_run_shard, stage, shard, options) for shard in shards]
+        for number, future in enumerate(futures, 1):
+            try:
+                metrics = future.result()
+            except Exception as e:
+                print(f"Shard {number} failed: {e}")
+                totals['failed_shards'] += 1
+                continue
+            print(f"Shard {number}: {metrics}")
+            totals.update({k: v for k, v in metrics.items() if k != 'seconds'})
+            totals['shard_seconds'] += metrics['seconds']
+
+    totals['llm_calls'] = quota.used
+    if token_quota.limit:
+        totals['llm_tokens'] = token_quota.used
+    totals['wall_seconds'] = time.monotonic() - started
+    return dict(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a pipeline stage across a process pool')
+    parser.add_argument('stage', choices=STAGES, help='Stage to run')
+    parser.add_argument('--workers', type=int, default=settings.SHARD_WORKERS,
+                        help='Worker processes')
+    parser.add_argument(
+        '--cascade', action='store_true', default=settings.CASCADE_ENABLED,
+        help='Pre-filter applicants with the shortlist rules before the LLM')
+    parser.add_argument('--dedup', action='store_true', default=settings.DEDUP_ENABLED,
+                        help='Reuse one evaluation across duplicate applications')
+    parser.add_argument(
+        '--priority', type=parse_priority, default=settings.EVALUATION_PRIORITY,
+        help='Comma-separated evaluation order, e.g. shortlisted,rule_score,recency')
+    parser.add_argument(
+        '--deadline', type=float, default=settings.EVALUATION_DEADLINE,
+        help='Stop starting evaluations after this many seconds (0 = no deadline)')
+    parser.add_argument(
+        '--token-budget', type=int, default=settings.LLM_TOKEN_BUDGET,
+        help='Estimated LLM tokens allowed across all workers (0 = unlimited)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate requests, LLM tokens and time without writing')
+
+    args = parser.parse_args()
+
+    try:
+        options = {
+            'cascade': args.cascade, 'dedup': args.dedup, 'priority': args.priority,
+            'deadline': args.deadline, 'token_budget': args.token_budget,
+        } if args.stage == 'evaluate' else {}
+        if args.plan:
+            from utils.planner import plan_sharded, print_plan
+            print_plan(plan_sharded(args.stage, AirtableClient(), args.workers,
+                                    **options))
+            return
+        totals = run_sharded(args.stage, args.workers, **options)
+        print("\nFinished sharded run:")
+        for key, value in sorted(totals.items()):
+            shown = f"{value:.1f}" if isinstance(value, float) else value
+            print(f"  {key}: {shown}")
+    except Exception as e:
+        print(f"Fatal Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,95 +1,168 @@
+import argparse
 import json
 import logging
+from typing import Dict, List, Optional
+
 from utils.airtable_client import AirtableClient
+from utils.criteria import evaluate_criteria, failed_criteria
+from utils.json_codec import decode_json
+from utils.outbox import flushes_outbox
+from utils.profiling import profile_stage
+from utils.schema import STAGE_FIELDS, validate_schema
 from config import settings
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s [%(levelname)s] %(message)s")
 
 
-def shortlist_candidates():
-    client = AirtableClient()
+def shortlisted_leads(client: AirtableClient) -> Dict[str, List[str]]:
+    """Shortlisted Leads record IDs by the Applicants record they link to"""
+    leads: Dict[str, List[str]] = {}
+    for lead in client.get_records(settings.SHORTLISTED_LEADS_TABLE,
+                                   fields=["Applicant ID"]):
+        for applicant_rec_id in lead["fields"].get("Applicant ID", []):
+            leads.setdefault(applicant_rec_id, []).append(lead["id"])
+    return leads
+
+
+def remove_leads(client: AirtableClient, lead_ids: List[str], key: str = ''):
+    """Delete Shortlisted Leads records, queued behind the lead writes in the outbox"""
+    client.queue_delete(settings.SHORTLISTED_LEADS_TABLE, lead_ids, key=key)
+
+
+@flushes_outbox
+def shortlist_applicant(client: AirtableClient, applicant: dict,
+                        leads: Optional[Dict[str, List[str]]] = None) -> bool:
+    """
+    Apply the shortlist criteria to one Applicants record; True if shortlisted.
+    Idempotent: an existing lead is updated rather than duplicated, and removed
+    once the applicant no longer qualifies. Pass leads (see shortlisted_leads)
+    to avoid a lookup per applicant.
+    """
+    fields = applicant.get("fields", {})
+    applicant_id = fields.get("Applicant ID")
+    compressed_json_raw = fields.get("Compressed JSON")
+
+    logging.info(f"Processing applicant: {applicant_id}")
+    logging.debug("=== DEBUG: Applicant raw data ===\n%s",
+                  json.dumps(applicant, indent=2))
+
+    if not compressed_json_raw:
+        logging.warning(f"Skipping applicant {applicant_id} (no compressed JSON)")
+        return False
+
+    try:
+        compressed_json = decode_json(compressed_json_raw)
+    except ValueError:
+        logging.error(f"Invalid JSON for applicant {applicant_id}")
+        return False
+
+    if leads is None:
+        leads = shortlisted_leads(client)
+    existing = leads.get(applicant.get("id"), [])
+
+    # Evaluation
+    evaluation = evaluate_criteria(compressed_json)
+    years_experience = evaluation["total_experience"]
+    preferred_rate = evaluation["preferred_rate"]
+    availability = evaluation["availability"]
+
+    logging.debug("=== DEBUG: Applicant %s evaluation ===\n%s",
+                  applicant_id, json.dumps(evaluation, indent=2))
+
+    # Shortlist decision
+    if not failed_criteria(evaluation):
+        tier = " (tier 1)" if evaluation["tier_1"] else ""
+        score_reason = (
+            f"{years_experience:g} yrs exp{tier}; "
+            f"Rate {preferred_rate} USD OK; "
+            f"Availability {availability}h/wk; "
+            f"Location eligible"
+        )
+
+        record_data = {
+            "Applicant ID": [applicant.get("id")],  # Airtable expects recId list
+            "Compressed JSON": compressed_json_raw,
+            "Score Reason": score_reason,
+        }
+
+        logging.debug("=== DEBUG: Applicant %s shortlist record ===\n%s",
+                      applicant_id, json.dumps(record_data, indent=2))
+
+        try:
+            if existing:
+                client.queue_update(settings.SHORTLISTED_LEADS_TABLE, existing[0],
+                                    record_data, key=str(applicant_id))
+                # Duplicates left by earlier, non-idempotent runs
+                remove_leads(client, existing[1:], key=str(applicant_id))
+            else:
+                client.queue_create(settings.SHORTLISTED_LEADS_TABLE, record_data,
+                                    key=str(applicant_id))
+            logging.info(f"Shortlisted applicant {applicant_id}")
+            return True
+        except Exception as e:
+            logging.error(f"Error writing shortlist record for {applicant_id}: {e}")
+
+    else:
+        logging.info(f"Applicant {applicant_id} not shortlisted (fails criteria)")
+        if existing:
+            try:
+                remove_leads(client, existing, key=str(applicant_id))
+                logging.info(f"Removed applicant {applicant_id} from the shortlist")
+            except Exception as e:
+                logging.error(
+                    f"Error removing shortlist record for {applicant_id}: {e}")
+
+    return False
+
+
+@profile_stage("shortlist")
+@flushes_outbox
+def shortlist_candidates(client: Optional[AirtableClient] = None,
+                         applicants: Optional[List[dict]] = None) -> Dict[str, int]:
+    client = client or AirtableClient()
+    validate_schema(client)
 
-    logging.info("Fetching applicants...")
-    applicants = client.get_records(settings.APPLICANTS_TABLE)
-    logging.debug("=== DEBUG: Fetched applicants ===\n%s", json.dumps(applicants, indent=2))
+    if applicants is None:
+        logging.info("Fetching applicants...")
+        applicants = client.get_all_applicants(fields=list(STAGE_FIELDS["shortlist"]))
+        logging.debug("=== DEBUG: Fetched applicants ===\n%s",
+                      json.dumps(applicants, indent=2))
 
     shortlisted_count = 0
+    leads = shortlisted_leads(client)
 
     for applicant in applicants:
-        fields = applicant.get("fields", {})
-        applicant_id = fields.get("Applicant ID")
-        compressed_json_raw = fields.get("Compressed JSON")
+        if shortlist_applicant(client, applicant, leads):
+            shortlisted_count += 1
 
-        logging.info(f"Processing applicant: {applicant_id}")
-        logging.debug("=== DEBUG: Applicant raw data ===\n%s", json.dumps(applicant, indent=2))
+    logging.info(f"Finished shortlisting. Total shortlisted: {shortlisted_count}")
+    return {'applicants': len(applicants), 'shortlisted': shortlisted_count}
 
-        if not compressed_json_raw:
-            logging.warning(f"Skipping applicant {applicant_id} (no compressed JSON)")
-            continue
 
-        try:
-            compressed_json = json.loads(compressed_json_raw)
-        except json.JSONDecodeError:
-            logging.error(f"Invalid JSON for applicant {applicant_id}")
-            continue
-
-        # Extract data from compressed JSON
-        experience = compressed_json.get("experience", [])
-        years_experience = len(experience)  # crude proxy count
-
-        salary_info = compressed_json.get("salary", {})
-        preferred_rate = salary_info.get("preferred_rate", 0)
-        availability = salary_info.get("availability", 0)
-        currency = salary_info.get("currency", ["USD"])[0]
-
-        location = compressed_json.get("personal", {}).get("location", "")
-
-        # Evaluation
-        evaluation = {
-            "total_experience": years_experience,
-            "meets_compensation": preferred_rate <= settings.MAX_HOURLY_RATE,
-            "eligible_location": any(loc.lower() in location.lower() for loc in settings.ELIGIBLE_LOCATIONS),
-            "meets_availability": availability >= settings.MIN_AVAILABILITY,
-        }
+def main():
+    parser = argparse.ArgumentParser(
+        description="Shortlist applicants against the configured criteria")
+    parser.add_argument("--snapshot",
+                        help="Replay against a snapshot directory instead of Airtable")
+    parser.add_argument("--output",
+                        help="With --snapshot, file that captures the writes")
+    parser.add_argument("--plan", action="store_true",
+                        help="Estimate requests and time without writing")
 
-        logging.debug("=== DEBUG: Applicant %s evaluation ===\n%s",
-                      applicant_id, json.dumps(evaluation, indent=2))
-
-        # Shortlist decision
-        if (
-            evaluation["total_experience"] >= settings.MIN_EXPERIENCE
-            and evaluation["meets_compensation"]
-            and evaluation["eligible_location"]
-            and evaluation["meets_availability"]
-        ):
-            score_reason = (
-                f"{years_experience} yrs exp; "
-                f"Rate {preferred_rate}{currency} OK; "
-                f"Availability {availability}h/wk; "
-                f"Location eligible"
-            )
-
-            record_data = {
-                "Applicant ID": [applicant.get("id")],  # Airtable expects recId list
-                "Compressed JSON": compressed_json_raw,
-                "Score Reason": score_reason,
-            }
-
-            logging.debug("=== DEBUG: Applicant %s shortlist record ===\n%s",
-                          applicant_id, json.dumps(record_data, indent=2))
+    args = parser.parse_args()
 
-            try:
-                client.create_record(settings.SHORTLISTED_LEADS_TABLE, record_data)
-                logging.info(f"Shortlisted applicant {applicant_id}")
-                shortlisted_count += 1
-            except Exception as e:
-                logging.error(f"Error creating shortlist record for {applicant_id}: {e}")
+    client = None
+    if args.snapshot:
+        from utils.snapshot import SnapshotClient
+        client = SnapshotClient(args.snapshot, args.output)
 
-        else:
-            logging.info(f"Applicant {applicant_id} not shortlisted (fails criteria)")
+    if args.plan:
+        from utils.planner import plan_shortlist, print_plan
+        print_plan(plan_shortlist(client or AirtableClient()))
+        return
 
-    logging.info(f"Finished shortlisting. Total shortlisted: {shortlisted_count}")
+    shortlist_candidates(client)
 
 
 if __name__ == "__main__":
-    shortlist_candidates()
+    main()
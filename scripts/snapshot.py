@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Snapshot Script
+Dumps all pipeline tables to local files for offline replay
+"""
+
+import sys
+import argparse
+
+# Add the parent directory to the path to import modules
+sys.path.append('../')
+
+from utils.airtable_client import AirtableClient
+from utils.snapshot import FORMATS, export_snapshot, load_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export or inspect an Airtable snapshot')
+    parser.add_argument('mode', choices=['export', 'info'],
+                        help='Export the base or summarize a snapshot')
+    parser.add_argument('directory', help='Snapshot directory')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl',
+                        help='File format for export')
+
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'export':
+            manifest = export_snapshot(AirtableClient(), args.directory, args.format)
+            for table_id, table in manifest['tables'].items():
+                print(f"{table['name']} ({table_id}): {table['records']} records")
+            print(f"\nSnapshot written to {args.directory}")
+        else:
+            for table_id, records in load_snapshot(args.directory).items():
+                print(f"{table_id}: {len(records)} records")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+JSON Dictionary Script
+Trains a shared compression dictionary on the stored compressed JSON and
+reports the size each codec would give
+"""
+
+import sys
+import argparse
+
+# Add the parent directory to the path to import modules
+sys.path.append('../')
+
+from utils.airtable_client import AirtableClient
+from utils.json_codec import CODECS, decode_json, encode_json, train_dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Train a shared dictionary for the Compressed JSON field')
+    parser.add_argument('output',
+                        help='Dictionary file to write, for JSON_CODEC_DICTIONARY')
+    parser.add_argument('--codec', choices=[c for c in CODECS if c != 'json'],
+                        default='deflate', help='Codec the dictionary is for')
+    parser.add_argument('--size', type=int, default=16 * 1024,
+                        help='Dictionary size in bytes')
+
+    args = parser.parse_args()
+
+    try:
+        applicants = AirtableClient().get_all_applicants(fields=['Compressed JSON'])
+        samples = []
+        for applicant in applicants:
+            try:
+                stored = applicant['fields'].get('Compressed JSON') or ''
+                samples.append(decode_json(stored))
+            except ValueError:
+                continue
+        if not samples:
+            raise ValueError("No compressed JSON to train on")
+
+        dictionary = train_dictionary(samples, args.codec, args.size)
+        with open(args.output, 'wb') as f:
+            f.write(dictionary)
+        print(f"Trained a {len(dictionary)} byte {args.codec} dictionary "
+              f"on {len(samples)} records")
+
+        plain = sum(len(encode_json(sample, 'json')) for sample in samples)
+        alone = sum(len(encode_json(sample, args.codec, b'')) for sample in samples)
+        shared = sum(len(encode_json(sample, args.codec, dictionary))
+                     for sample in samples)
+        print(f"Average field size: {plain / len(samples):.0f} chars as JSON, "
+              f"{alone / len(samples):.0f} with {args.codec}, "
+              f"{shared / len(samples):.0f} with the dictionary")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
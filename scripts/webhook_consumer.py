@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Webhook Consumer Script
+Re-runs pipeline stages only for applicants touched by Airtable changes
+"""
+
+import sys
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Any, List, Optional, Sequence
+
+# Add the parent directory to the path to import modules
+sys.path.append('../')
+
+from utils.airtable_client import AirtableClient
+from utils.webhooks import (
+    CHILD_TABLES,
+    WEBHOOK_SPECIFICATION,
+    AirtablePayloadSource,
+    ChildLinks,
+    LocalPayloadSource,
+    changed_records,
+    is_api_change,
+    linked_record_ids,
+    verify_signature,
+)
+from config import settings
+
+STAGES = ('compress', 'shortlist', 'evaluate')
+
+
+class WebhookProcessor:
+    """Maps change payloads to applicants and runs the selected stages for them"""
+
+    def __init__(self, client: Optional[AirtableClient] = None,
+                 stages: Sequence[str] = STAGES,
+                 ignore_api_changes: bool = settings.WEBHOOK_IGNORE_API_CHANGES,
+                 dry_run: bool = False, links: Optional[ChildLinks] = None):
+        self.client = client or AirtableClient()
+        self.stages = [stage for stage in STAGES if stage in stages]
+        self.ignore_api_changes = ignore_api_changes
+        self.dry_run = dry_run
+        self.links = links if links is not None else ChildLinks()
+
+    def applicants_of(self, table_id: str, record_id: str,
+                      change: Dict[str, Any]) -> List[str]:
+        """Applicants record IDs a child record change touches; updates the links"""
+        if change.get('destroyed'):
+            return self.links.forget(record_id)
+
+        linked = linked_record_ids(change)
+        current = linked_record_ids(change, include_previous=False)
+        if not current:
+            # The link did not change, so the payload may not carry it
+            current = self.links.get(record_id)
+        if not current:
+            record = self.client.get_record(table_id, record_id)
+            current = record.get('fields', {}).get('Applicant ID', [])
+        self.links.remember(record_id, current)
+        return sorted(set(linked) | set(current))
+
+    def affected_applicants(self, payloads: List[Dict[str, Any]]) -> List[str]:
+        """Return Applicants record IDs whose child records changed"""
+        applicant_rec_ids = set()
+        if not len(self.links):
+            self.links.seed(self.client)
+
+        for payload in payloads:
+            if self.ignore_api_changes and is_api_change(payload):
+                continue
+
+            for table_id, records in changed_records(payload).items():
+                # Edits to the Applicants table itself come from the pipeline
+                if table_id not in CHILD_TABLES:
+                    continue
+
+                for record_id, change in records.items():
+                    linked = self.applicants_of(table_id, record_id, change)
+                    if not linked:
+                        print(f"⚠ Cannot map {table_id}/{record_id} to an applicant, "
+                              "skipping")
+                    applicant_rec_ids.update(linked)
+
+        self.links.save()
+        return sorted(applicant_rec_ids)
+
+    def run_stages(self, applicant_rec_id: str,
+                   leads: Optional[Dict[str, List[str]]] = None):
+        """Run the configured stages for one applicant; leads as shortlisted_leads"""
+        # Imported here so the receiver starts without loading the LLM client
+        from scripts.compress_json import compress_applicant_data
+        from scripts.shortlist_candidates import shortlist_applicant
+        from scripts.llm_evaluation import evaluate_single_applicant
+
+        applicant_id = self.client.get_applicant_id(applicant_rec_id)
+        if not applicant_id:
+            print(f"Skipping record {applicant_rec_id}: No Applicant ID found")
+            return
+
+        if 'compress' in self.stages:
+            compress_applicant_data(applicant_id, self.client)
+        if 'shortlist' in self.stages:
+            # Read after compressing so the shortlist sees the fresh JSON
+            applicant = self.client.get_record(settings.APPLICANTS_TABLE,
+                                               applicant_rec_id)
+            shortlist_applicant(self.client, applicant, leads)
+        if 'evaluate' in self.stages:
+            evaluate_single_applicant(applicant_id, self.client)
+
+    def process(self, payloads: List[Dict[str, Any]]) -> int:
+        """Process a batch of payloads; returns the number of applicants handled"""
+        applicant_rec_ids = self.affected_applicants(payloads)
+        print(f"{len(payloads)} payloads touched {len(applicant_rec_ids)} applicants")
+
+        if self.dry_run:
+            for applicant_rec_id in applicant_rec_ids:
+                print(f"Would run {', '.join(self.stages)} for {applicant_rec_id}")
+            return 0
+
+        # One scan of Shortlisted Leads serves the whole batch
+        leads = None
+        if 'shortlist' in self.stages and applicant_rec_ids:
+            from scripts.shortlist_candidates import shortlisted_leads
+            leads = shortlisted_leads(self.client)
+
+        processed = 0
+        for applicant_rec_id in applicant_rec_ids:
+            try:
+                self.run_stages(applicant_rec_id, leads)
+                processed += 1
+            except Exception as e:
+                print(f"Error processing applicant {applicant_rec_id}: {e}")
+
+        return processed
+
+    def drain(self, source) -> int:
+        """Fetch, process and commit everything pending in a payload source"""
+        processed = self.process(source.fetch())
+        source.commit()
+        return processed
+
+
+def make_handler(processor: WebhookProcessor, source):
+    """Build a request handler bound to a processor and payload source"""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not verify_signature(body, self.headers.get('X-Airtable-Content-MAC')):
+                self.send_response(401)
+                self.end_headers()
+                return
+
+            # Acknowledge first; Airtable only needs to know the ping arrived
+            self.send_response(200)
+            self.end_headers()
+
+            notification = json.loads(body or b'{}')
+            if 'payloads' in notification:
+                # Local stand-in: payloads posted directly instead of a ping
+                processor.process(notification['payloads'])
+            elif source is not None:
+                processor.drain(source)
+
+    return WebhookHandler
+
+
+def serve(processor: WebhookProcessor, source, port: int):
+    """Run the notification receiver until interrupted"""
+    server = HTTPServer(('', port), make_handler(processor, source))
+    print(f"Listening for Airtable webhook notifications on port {port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping webhook receiver")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Process Airtable webhook change payloads')
+    parser.add_argument(
+        'mode', choices=['serve', 'replay', 'create'],
+        help='Run a receiver, replay pending payloads, or create the webhook')
+    parser.add_argument('--notification-url', help='Receiver URL for create mode')
+    parser.add_argument('--payload-file',
+                        help='Read payloads from a JSON/JSONL file instead of Airtable')
+    parser.add_argument('--webhook-id', default=settings.WEBHOOK_ID,
+                        help='Airtable webhook ID')
+    parser.add_argument('--port', type=int, default=8080, help='Port for serve mode')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help='Comma-separated stages to run')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only list affected applicants')
+
+    args = parser.parse_args()
+
+    try:
+        processor = WebhookProcessor(stages=args.stages.split(','),
+                                     dry_run=args.dry_run)
+        if args.payload_file:
+            source = LocalPayloadSource(args.payload_file)
+        elif args.webhook_id:
+            source = AirtablePayloadSource(processor.client, args.webhook_id)
+        else:
+            source = None
+
+        if args.mode == 'create':
+            webhook = processor.client.create_webhook(args.notification_url,
+                                                      WEBHOOK_SPECIFICATION)
+            print(f"Created webhook {webhook['id']}; set WEBHOOK_ID={webhook['id']} "
+                  f"and WEBHOOK_MAC_SECRET={webhook['macSecretBase64']} in .env")
+        elif args.mode == 'serve':
+            serve(processor, source, args.port)
+        else:
+            if source is None:
+                raise ValueError("replay needs --payload-file or a webhook ID")
+            processed = processor.drain(source)
+            print(f"\nFinished processing webhook payloads. "
+                  f"Total applicants: {processed}")
+    except Exception as e:
+        print(f"Fatal Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import threading
+
+from utils.airtable_client import AIRTABLE_BATCH_SIZE
+from utils.batch_writer import BatchWriter
+
+WORK = "tblWork"
+SALARY = "tblSalary"
+
+
+class FakeClient:
+    """Records the batch requests sent; deletes of the given record IDs fail"""
+
+    def __init__(self, failing_deletes=()):
+        self.failing_deletes = set(failing_deletes)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _record(self, kind, table_name, items):
+        with self._lock:
+            self.requests.append((kind, table_name, list(items)))
+
+    def create_records(self, table_name, records):
+        self._record("create", table_name, records)
+
+    def update_records(self, table_name, updates):
+        self._record("update", table_name, updates)
+
+    def delete_records(self, table_name, record_ids):
+        if self.failing_deletes & set(record_ids):
+            raise RuntimeError("422 Unprocessable Entity")
+        self._record("delete", table_name, record_ids)
+
+
+def test_failed_delete_blocks_the_keys_creates():
+    client = FakeClient(failing_deletes={"recOld1"})
+    writer = BatchWriter(client, workers=2)
+    writer.delete(WORK, "recOld1", key="1")
+    writer.delete(WORK, "recOld2", key="1")
+    writer.create(WORK, {"Company": "Acme"}, key="1")
+    writer.update(SALARY, "recSal1", {"Preferred Rate": 80}, key="1")
+    writer.delete(WORK, "recOld3", key="2")
+    writer.create(WORK, {"Company": "Initech"}, key="2")
+
+    errors = writer.flush()
+
+    # The batch with recOld1 failed as a whole, so key 2's delete failed too
+    assert set(errors) == {"1", "2"}
+    assert any("skipped" in message for message in errors["1"])
+    created = [fields for kind, _, items in client.requests if kind == "create"
+               for fields in items]
+    assert created == []
+    # Updates are not blocked by a failed delete
+    assert ("update", SALARY, [("recSal1", {"Preferred Rate": 80})]) in client.requests
+    assert len(writer) == 0
+
+
+def test_creates_of_other_keys_still_go_out():
+    client = FakeClient(failing_deletes={"recOld1"})
+    writer = BatchWriter(client)
+    for index in range(AIRTABLE_BATCH_SIZE):
+        writer.delete(WORK, f"recFiller{index}", key="2")
+    writer.delete(WORK, "recOld1", key="1")
+    writer.create(WORK, {"Company": "Acme"}, key="1")
+    writer.create(WORK, {"Company": "Initech"}, key="2")
+
+    errors = writer.flush()
+
+    assert set(errors) == {"1"}
+    assert ("create", WORK, [{"Company": "Initech"}]) in client.requests
+    # Deletes were sent before any create
+    kinds = [kind for kind, _, _ in client.requests]
+    assert kinds == ["delete", "create"]
@@ -0,0 +1,20 @@
+from utils.cascade import SKIP_PREFIX, is_evaluated, is_screened_out, skip_marker
+
+
+def test_skip_summary_is_not_an_evaluation():
+    skipped = {"LLM Summary": f"{skip_marker('{}')}: Fails rules", "LLM Score": 0.0}
+    assert not is_evaluated(skipped)
+    assert not is_evaluated({"LLM Summary": "Good fit"})
+    assert is_evaluated({"LLM Summary": "Weak fit", "LLM Score": 0.0})
+
+
+def test_screened_out_until_the_compressed_json_changes():
+    compressed = '{"a": 1}'
+    fields = {
+        "Compressed JSON": compressed,
+        "LLM Summary": f"{skip_marker(compressed)}: Fails rules",
+    }
+    assert fields["LLM Summary"].startswith(SKIP_PREFIX)
+    assert is_screened_out(fields)
+    assert not is_screened_out({**fields, "Compressed JSON": '{"a": 2}'})
+    assert not is_screened_out({"Compressed JSON": '{"a": 1}'})
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from scripts import cli, compress_json
+from utils.airtable_client import AirtableClient
+
+
+@pytest.fixture
+def compressed(monkeypatch):
+    """Applicant IDs compress_applicant_data was called with; ID 'bad' fails"""
+    calls = []
+
+    def compress(applicant_id, client):
+        calls.append(applicant_id)
+        if applicant_id == "bad":
+            raise ValueError("Applicant ID bad not found")
+
+    monkeypatch.setattr(compress_json, "compress_applicant_data", compress)
+    monkeypatch.setattr(AirtableClient, "warm_id_cache", lambda self: None)
+    return calls
+
+
+def exit_status(argv):
+    with pytest.raises(SystemExit) as exited:
+        cli.main(argv)
+    return exited.value.code
+
+
+def test_read_ids_from_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("3\n\n# skipped\n 4 \n"))
+    assert cli.read_ids(["1", "-", "2"], None) == ["1", "2", "3", "4"]
+
+
+def test_read_ids_from_file(tmp_path, monkeypatch):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("5\n# comment\n6\n")
+    monkeypatch.setattr("sys.stdin", io.StringIO("7\n"))
+    assert cli.read_ids(["1"], str(ids_file)) == ["1", "5", "6"]
+    assert cli.read_ids(["-"], str(ids_file)) == ["7", "5", "6"]
+
+
+def test_all_ids_processed_exits_zero(compressed, tmp_path, monkeypatch):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("2\n3\n")
+    monkeypatch.setattr("sys.stdin", io.StringIO("4\n"))
+
+    assert exit_status(["compress", "1", "-", "--ids-file", str(ids_file)]) == 0
+    assert compressed == ["1", "4", "2", "3"]
+
+
+def test_a_failed_id_exits_non_zero(compressed, capsys):
+    assert exit_status(["compress", "1", "bad", "2"]) == 1
+    # The failure is reported and the remaining IDs are still processed
+    assert compressed == ["1", "bad", "2"]
+    output = capsys.readouterr().out
+    assert "Error processing applicant bad" in output
+    assert "Processed 2/3 applicants" in output
+
+
+def test_missing_ids_are_a_usage_error(compressed, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n# nothing\n"))
+    assert exit_status(["compress", "-"]) == 2
+    assert compressed == []
@@ -0,0 +1,104 @@
+import pytest
+
+from utils.dedup import (DuplicateIndex, MinHasher, canonical_hash, group_duplicates,
+                         shingles)
+from utils.json_codec import encode_json
+
+
+def applicant(name, email, company="Acme", title="Engineer", location="Canada"):
+    return {
+        "personal": {"full_name": name, "email": email, "location": location},
+        "experience": [{"company": company, "title": title}],
+    }
+
+
+def record(record_id, applicant_id, compressed_json, **fields):
+    fields = {"Applicant ID": applicant_id,
+              "Compressed JSON": encode_json(compressed_json), **fields}
+    return {"id": record_id, "fields": fields}
+
+
+def test_canonical_hash_ignores_case_whitespace_key_order_and_derived():
+    first = {"personal": {"full_name": "Ada  Lovelace", "email": "ADA@example.com"}}
+    second = {
+        "personal": {"email": "ada@example.com", "full_name": "ada lovelace"},
+        "derived": {"version": 1}
+    }
+    assert canonical_hash(first) == canonical_hash(second)
+    assert canonical_hash(first) != canonical_hash(
+        {"personal": {"full_name": "Ada Byron"}})
+
+
+def test_shingles():
+    features = shingles(
+        applicant("Ada", "a@b.io", company="Big Co", title="Staff Engineer"))
+    assert {"full_name:ada", "email:a b", "company:big", "company:co", "title:staff",
+            "title:engineer"} <= features
+    assert shingles({}) == set()
+
+
+def test_minhasher_requires_whole_bands():
+    hasher = MinHasher(num_perm=16, bands=4)
+    signature = hasher.signature({"a", "b"})
+    assert len(signature) == 16
+    assert len(hasher.band_keys(signature)) == 4
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=10, bands=4)
+
+
+def test_group_duplicates_finds_exact_and_near_duplicates():
+    applicants = {
+        "a": applicant("Ada Lovelace", "ada@example.com"),
+        "b": applicant("ADA LOVELACE", "ada@example.com"),
+        "c": applicant("Ada Lovelace", "ada@example.con"),
+        "d": applicant("Grace Hopper", "grace@example.com", company="Navy",
+                       title="Admiral"),
+        "e": {},
+        "f": {},
+    }
+
+    groups = sorted(
+        sorted(group) for group in group_duplicates(applicants, threshold=0.5))
+
+    assert groups == [["a", "b", "c"], ["e", "f"]]
+
+
+def test_duplicate_index_reuses_existing_evaluation():
+    ada = applicant("Ada Lovelace", "ada@example.com")
+    applicants = [
+        record("rec1", 1, ada,
+               **{"LLM Score": 80.0, "LLM Summary": "Strong", "LLM Follow-Ups": ""}),
+        record("rec2", 2, ada),
+        record("rec3", 3, applicant("Grace Hopper", "grace@example.com",
+                                    company="Navy")),
+        {"id": "rec4", "fields": {"Applicant ID": 4, "Compressed JSON": "not json"}},
+    ]
+
+    index = DuplicateIndex(applicants)
+
+    assert index.groups == 1
+    assert index.reusable("rec2")["source"] == 1
+    assert index.reusable("rec2")["payload"]["LLM Score"] == 80.0
+    assert index.reusable("rec3") is None
+    assert index.reusable("rec4") is None
+
+
+def test_duplicate_index_stores_first_evaluation_per_group():
+    ada = applicant("Ada Lovelace", "ada@example.com")
+    index = DuplicateIndex([record("rec1", 1, ada), record("rec2", 2, ada)])
+    assert index.reusable("rec2") is None
+
+    index.store("rec1", {"LLM Score": 70.0}, 1)
+    index.store("rec2", {"LLM Score": 10.0}, 2)
+
+    assert index.reusable("rec2") == {"payload": {"LLM Score": 70.0}, "source": 1}
+
+
+def test_duplicate_index_does_not_reuse_cascade_skips():
+    ada = applicant("Ada Lovelace", "ada@example.com")
+    skipped = {"LLM Summary": "Not sent to LLM [0123456789ab]: Fails rules",
+               "LLM Score": 0.0}
+    index = DuplicateIndex([record("rec1", 1, ada, **skipped), record("rec2", 2, ada)])
+
+    assert index.groups == 1
+    assert index.reusable("rec2") is None
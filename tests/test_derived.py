@@ -0,0 +1,96 @@
+from datetime import date
+
+import numpy as np
+
+from utils.derived import (
+    DERIVED_VERSION,
+    add_derived,
+    canonical_location,
+    derive_features,
+    get_derived,
+    normalize_location,
+    total_years,
+)
+
+
+def test_canonical_location_folds_aliases_and_case():
+    assert canonical_location("usa") == "United States"
+    assert canonical_location(" UK ") == "United Kingdom"
+    assert canonical_location("canada") == "Canada"
+    assert canonical_location("CANADA") == "Canada"
+    assert canonical_location("Atlantis") == "Atlantis"
+
+
+def test_normalize_location_finds_country_in_free_text():
+    assert normalize_location("Toronto, canada") == "Canada"
+    assert normalize_location("Austin, TX, USA") == "United States"
+    assert normalize_location("  Lisbon  ") == "Lisbon"
+    assert normalize_location("   ") is None
+    assert normalize_location(None) is None
+
+
+def test_normalize_location_matches_whole_words_only():
+    assert normalize_location("Sydney, Australia") == "Sydney, Australia"
+
+
+def test_total_years_merges_overlapping_jobs_per_owner():
+    owners = np.array([0, 0, 1])
+    starts = np.array(["2020-01-01", "2020-07-01", "2020-01-01"], dtype="datetime64[D]")
+    ends = np.array(["2021-01-01", "2021-07-01", "2020-07-01"], dtype="datetime64[D]")
+
+    years = total_years(owners, starts, ends, 3)
+
+    assert round(years[0], 2) == round(547 / 365.25, 2)
+    assert round(years[1], 2) == round(182 / 365.25, 2)
+    assert years[2] == 0
+
+
+def test_total_years_without_jobs():
+    empty = np.array([], dtype="datetime64[D]")
+    assert list(total_years(np.array([], dtype=np.int64), empty, empty, 2)) == [0, 0]
+
+
+def test_derive_features():
+    compressed_jsons = [
+        {
+            "personal": {"location": "London, UK"},
+            "experience": [
+                {"company": "Google", "start": "2019-01-01", "end": "2021-01-01"},
+                {"company": "Acme", "start": "2020-06-01"},
+                {"company": "Undated"},
+            ],
+            "salary": {"preferred_rate": 100, "currency": "GBP"},
+        },
+        {"personal": {}, "experience": [], "salary": {}},
+    ]
+
+    first, second = derive_features(compressed_jsons, today=date(2022, 1, 1))
+
+    assert first["version"] == DERIVED_VERSION
+    assert first["total_years"] == round(1096 / 365.25, 2)
+    assert first["tier_1"] is True
+    assert first["location"] == "United Kingdom"
+    assert first["rate_usd"] == 127.0
+    assert second == {"version": DERIVED_VERSION, "total_years": 0.0, "tier_1": False,
+                      "location": None, "rate_usd": None}
+
+
+def test_derive_features_ignores_unparsable_dates():
+    experience = [{"start": "soon", "end": "2020-01-01"}]
+    derived = derive_features([{"experience": experience}])[0]
+    assert derived["total_years"] == 0.0
+
+
+def test_add_derived_only_fills_stale_sections():
+    current = {"derived": {"version": DERIVED_VERSION, "total_years": 99}}
+    stale = {"derived": {"version": DERIVED_VERSION - 1}, "experience": []}
+
+    assert add_derived([current, stale]) == 1
+    assert current["derived"]["total_years"] == 99
+    assert stale["derived"]["version"] == DERIVED_VERSION
+
+
+def test_get_derived_computes_missing_section_without_storing_it():
+    compressed_json = {"personal": {"location": "Canada"}}
+    assert get_derived(compressed_json)["location"] == "Canada"
+    assert "derived" not in compressed_json
@@ -0,0 +1,88 @@
+import pytest
+
+from config import settings
+from utils import airtable_client
+from utils.airtable_client import AirtableClient
+
+APPLICANTS = settings.APPLICANTS_TABLE
+
+
+class ApplicantsClient(AirtableClient):
+    """Applicants table of record IDs rec1..recN, answered from memory"""
+
+    def __init__(self, count):
+        super().__init__()
+        self.field_ids = False
+        self.records = [{"id": f"rec{n}", "fields": {"Applicant ID": n}}
+                        for n in range(1, count + 1)]
+        self.requests = 0
+
+    def _make_request(self, method, endpoint, data=None, params=None, base_url=None):
+        self.requests += 1
+        formula = (params or {}).get('filterByFormula', '')
+        records = [r for r in self.records
+                   if not formula or f"'{r['fields']['Applicant ID']}'" in formula]
+        return {'records': records}
+
+
+class Clock:
+    """Monotonic clock that moves on by step seconds every time it is read"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.step = 0.0
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(airtable_client.time, "monotonic", clock)
+    monkeypatch.setattr(settings, "ID_CACHE_TTL", 60)
+    monkeypatch.setattr(settings, "PARTITIONED_SCAN", False)
+    return clock
+
+
+def test_warm_cache_answers_lookups_without_requests(clock):
+    client = ApplicantsClient(5)
+    client.warm_id_cache()
+
+    assert client.get_applicant_record_id("3") == "rec3"
+    assert client.get_applicant_id("rec5") == "5"
+    assert client.requests == 1
+
+
+def test_fill_that_outlasts_the_ttl_keeps_every_entry(clock):
+    client = ApplicantsClient(50)
+    # Slow enough that the TTL would run out partway through the records
+    clock.step = 2.0
+    client.warm_id_cache()
+    clock.step = 0.0
+
+    assert len(client._record_ids) == 50
+    assert client.get_applicant_record_id("1") == "rec1"
+    assert client.requests == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    client = ApplicantsClient(5)
+    client.warm_id_cache()
+    clock.now += 61
+
+    assert client.get_applicant_record_id("2") == "rec2"
+    assert client.requests == 2
+    # The expired fill was dropped wholesale
+    assert client._record_ids == {"2": "rec2"}
+
+
+def test_deleted_applicants_are_forgotten(clock):
+    client = ApplicantsClient(3)
+    client.warm_id_cache()
+    client.records.pop(0)
+    client.delete_records(APPLICANTS, ["rec1"])
+
+    assert client.get_applicant_record_id("1") is None
+    assert client.get_applicant_id("rec2") == "2"
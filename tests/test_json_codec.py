@@ -0,0 +1,83 @@
+import base64
+import zlib
+
+import pytest
+
+from config import settings
+from utils import json_codec
+from utils.json_codec import (decode_json, dictionary_id, encode_json, is_encoded,
+                              train_dictionary)
+
+VALUE = {
+    "personal": {"full_name": "Ada Lovelace", "location": "London, UK"},
+    "experience": [{"company": "Acme"}]
+}
+
+
+def test_plain_json_round_trip():
+    text = encode_json(VALUE, codec="json")
+    assert not is_encoded(text)
+    assert decode_json(text) == VALUE
+
+
+def test_deflate_round_trip():
+    text = encode_json(VALUE, codec="deflate", dictionary=b"")
+    assert text.startswith("cj1:deflate:-:")
+    assert decode_json(text) == VALUE
+
+
+def test_deflate_with_dictionary():
+    dictionary = train_dictionary([VALUE, VALUE], "deflate")
+    text = encode_json(VALUE, codec="deflate", dictionary=dictionary)
+
+    assert text.split(":")[2] == dictionary_id(dictionary)
+    assert decode_json(text, dictionary=dictionary) == VALUE
+    with pytest.raises(ValueError, match="needs dictionary"):
+        decode_json(text, dictionary=b"other")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        encode_json(VALUE, codec="brotli")
+    with pytest.raises(ValueError):
+        decode_json("cj1:brotli:-:AAAA")
+
+
+@pytest.mark.parametrize("text", [
+    "cj1:deflate",
+    "cj1:deflate:-:" + base64.b64encode(b"not deflate").decode("ascii"),
+    "cj1:deflate:-:" + base64.b64encode(zlib.compress(b"{not json")).decode("ascii"),
+    "{not json",
+])
+def test_corrupt_values_raise_value_error(text):
+    with pytest.raises(ValueError):
+        decode_json(text)
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    text = encode_json(VALUE, codec="zstd", dictionary=b"")
+    assert decode_json(text) == VALUE
+    with pytest.raises(ValueError):
+        decode_json("cj1:zstd:-:" + base64.b64encode(b"not zstd").decode("ascii"))
+
+
+def test_retired_dictionaries_still_decode(tmp_path, monkeypatch):
+    old = train_dictionary([VALUE], "deflate")
+    new = train_dictionary([VALUE, {"personal": {"full_name": "Grace Hopper"}}],
+                           "deflate")
+    (tmp_path / "old.dict").write_bytes(old)
+    (tmp_path / "new.dict").write_bytes(new)
+    monkeypatch.setattr(json_codec, "_dictionaries", {})
+    monkeypatch.setattr(json_codec, "_registry", {})
+    monkeypatch.setattr(json_codec, "_loaded_dirs", set())
+    monkeypatch.setattr(settings, "JSON_CODEC_DICTIONARY", str(tmp_path / "new.dict"))
+    monkeypatch.setattr(settings, "JSON_CODEC_DICTIONARY_DIR", str(tmp_path))
+
+    written_before = encode_json(VALUE, codec="deflate", dictionary=old)
+    written_now = encode_json(VALUE, codec="deflate")
+    assert written_now.split(":")[2] == dictionary_id(new)
+    assert decode_json(written_before) == VALUE
+    assert decode_json(written_now) == VALUE
+    loaded = set(json_codec.load_dictionaries())
+    assert loaded == {dictionary_id(old), dictionary_id(new)}
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from utils.llm_client import LLMClient, load_latency
+from utils.llm_providers import ProviderRouter, StubProvider
+
+
+def measured(router, provider, latency, samples=10):
+    for _ in range(samples):
+        router.stats[provider.label].record(latency, ok=True)
+
+
+def test_hedge_fires_after_the_percentile_latency():
+    slow = StubProvider(model="slow", latency=0.5)
+    backup = StubProvider(model="backup")
+    router = ProviderRouter([slow, backup], hedge=True, hedge_percentile=95)
+    # The primary usually answers in 50 ms; the backup is ranked second
+    measured(router, slow, 0.05)
+    measured(router, backup, 1.0)
+
+    started = time.monotonic()
+    assert "Stub evaluation" in router.complete("system", "prompt")
+    assert time.monotonic() - started < 0.4
+    assert (slow.calls, backup.calls) == (1, 1)
+
+
+def test_no_hedge_before_the_percentile_latency():
+    primary = StubProvider(model="primary", latency=0.01)
+    backup = StubProvider(model="backup")
+    router = ProviderRouter([primary, backup], hedge=True, hedge_percentile=95)
+    measured(router, primary, 0.5)
+    measured(router, backup, 1.0)
+
+    router.complete("system", "prompt")
+    assert (primary.calls, backup.calls) == (1, 0)
+
+
+def test_failover_moves_to_the_next_provider():
+    failing = StubProvider(model="failing", fail_every=1)
+    backup = StubProvider(model="backup")
+    router = ProviderRouter([failing, backup], hedge=False)
+
+    assert "Stub evaluation" in router.complete("system", "prompt")
+    assert (failing.calls, backup.calls) == (1, 1)
+    assert router.stats[failing.label].error_rate == 1.0
+    # A provider that has only failed is ranked last from then on
+    assert router.ranked() == [backup, failing]
+
+    with pytest.raises(RuntimeError, match="All LLM providers failed"):
+        ProviderRouter([failing], hedge=False).complete("system", "prompt")
+
+
+def test_latency_is_saved_and_loaded(tmp_path):
+    path = str(tmp_path / "latency.json")
+    assert load_latency(path) == {}
+
+    client = LLMClient(providers=[StubProvider(model="a"), StubProvider(model="b")])
+    measured(client.router, client.router.providers[0], 2.0, samples=3)
+    client.save_latency(path)
+    assert load_latency(path) == {"stub:a": 2.0}
+
+    # Later runs update their own providers and keep the rest
+    other = LLMClient(providers=[StubProvider(model="b")])
+    measured(other.router, other.router.providers[0], 1.0, samples=3)
+    other.save_latency(path)
+    assert load_latency(path) == {"stub:a": 2.0, "stub:b": 1.0}
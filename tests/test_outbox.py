@@ -0,0 +1,190 @@
+import time
+
+import pytest
+
+from config import settings
+from scripts.shortlist_candidates import remove_leads
+from utils import outbox as outbox_module
+from utils.airtable_client import AirtableClient
+from utils.outbox import Outbox, flushes_outbox
+
+
+class FakeClient:
+    base_id = 'appTest'
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = []
+
+    def create_records(self, table_name, records):
+        self._request('create', table_name, records)
+        return [{'id': f'rec{i}', 'fields': fields} for i, fields in enumerate(records)]
+
+    def update_records(self, table_name, updates):
+        self._request('update', table_name, updates)
+        return [{'id': record_id, 'fields': fields} for record_id, fields in updates]
+
+    def delete_records(self, table_name, record_ids):
+        self._request('delete', table_name, record_ids)
+        return [{'id': record_id, 'deleted': True} for record_id in record_ids]
+
+    def _request(self, kind, table_name, items):
+        if self.fail:
+            raise RuntimeError('422 invalid value')
+        self.requests.append((kind, table_name, items))
+
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    outboxes = []
+
+    def make(client, path=str(tmp_path / 'outbox.sqlite')):
+        outboxes.append(Outbox(client, path, interval=3600))
+        return outboxes[-1]
+
+    yield make
+    for outbox in outboxes:
+        outbox._stop.set()
+        outbox._wake.set()
+
+
+def test_updates_to_a_queued_record_are_merged(make_outbox):
+    client = FakeClient()
+    outbox = make_outbox(client)
+    outbox.update('tblA', 'rec1', {'Score': 1, 'Summary': 'old'}, key='1')
+    outbox.update('tblA', 'rec1', {'Score': 2}, key='1')
+    outbox.create('tblB', {'Applicant ID': ['rec1']}, key='1')
+    assert outbox.pending() == 2
+
+    assert outbox.drain() == {}
+    assert sorted(client.requests) == [
+        ('create', 'tblB', [{'Applicant ID': ['rec1']}]),
+        ('update', 'tblA', [('rec1', {'Score': 2, 'Summary': 'old'})]),
+    ]
+    assert outbox.pending() == 0
+
+
+def test_failed_writes_are_kept_until_retried(make_outbox, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_MAX_ATTEMPTS', 2)
+    client = FakeClient(fail=True)
+    outbox = make_outbox(client)
+    outbox.update('tblA', 'rec1', {'Score': 1}, key='7')
+
+    assert outbox.drain() == {'7': ['update in tblA failed: 422 invalid value']}
+    assert outbox.pending() == 1
+    outbox.drain()
+    assert outbox.pending() == 0
+    failed = [(entry['key'], entry['kind']) for entry in outbox.failed()]
+    assert failed == [('7', 'update')]
+
+    client.fail = False
+    assert outbox.retry_failed() == 1
+    assert outbox.drain() == {}
+    assert outbox.failed() == []
+    assert client.requests == [('update', 'tblA', [('rec1', {'Score': 1})])]
+
+
+def test_writes_left_by_a_crashed_run_are_replayed(make_outbox, tmp_path):
+    path = str(tmp_path / 'shared.sqlite')
+    crashed = make_outbox(FakeClient(), path)
+    crashed.update('tblA', 'rec1', {'Score': 1})
+    crashed._stop.set()
+
+    client = FakeClient()
+    make_outbox(client, path).drain()
+    assert client.requests == [('update', 'tblA', [('rec1', {'Score': 1})])]
+
+
+def test_abandoned_claims(make_outbox):
+    client = FakeClient()
+    outbox = make_outbox(client)
+    outbox.update('tblA', 'rec1', {'Score': 1}, key='1')
+    outbox.create('tblB', {'Name': 'lead'}, key='2')
+    stale = time.time() - settings.OUTBOX_CLAIM_TIMEOUT - 1
+    outbox._execute('UPDATE outbox SET claimed_at = ?', (stale,))
+
+    outbox.drain()
+
+    # The update is sent again; the create may already exist, so it waits for a
+    # manual retry
+    assert client.requests == [('update', 'tblA', [('rec1', {'Score': 1})])]
+    failed = [(entry['key'], entry['kind']) for entry in outbox.failed()]
+    assert failed == [('2', 'create')]
+
+
+def test_fresh_claims_are_left_to_their_owner(make_outbox):
+    client = FakeClient()
+    outbox = make_outbox(client)
+    outbox.update('tblA', 'rec1', {'Score': 1})
+    outbox._execute('UPDATE outbox SET claimed_at = ?', (time.time(),))
+
+    outbox.drain()
+    assert client.requests == []
+    assert outbox.pending() == 1
+
+
+def test_flushes_outbox_drains_after_the_outermost_stage(monkeypatch):
+    drains = []
+    monkeypatch.setattr(outbox_module, 'drain_outboxes', lambda: drains.append(True))
+
+    @flushes_outbox
+    def inner():
+        return 'inner'
+
+    @flushes_outbox
+    def outer():
+        assert inner() == 'inner'
+        assert drains == []
+        return 'outer'
+
+    assert outer() == 'outer'
+    assert drains == [True]
+
+
+def test_drain_errors_do_not_replace_the_stage_result(make_outbox, monkeypatch):
+    outbox = make_outbox(FakeClient())
+
+    def broken_drain():
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(outbox, 'drain', broken_drain)
+
+    @flushes_outbox
+    def stage():
+        return 'done'
+
+    assert stage() == 'done'
+
+
+def test_a_queued_delete_drops_pending_updates(make_outbox):
+    client = FakeClient()
+    outbox = make_outbox(client)
+    outbox.update('tblA', 'rec1', {'Score': 1}, key='1')
+    outbox.update('tblA', 'rec2', {'Score': 2}, key='2')
+    outbox.delete('tblA', 'rec1', key='1')
+
+    assert outbox.drain() == {}
+    assert client.requests == [
+        ('delete', 'tblA', ['rec1']),
+        ('update', 'tblA', [('rec2', {'Score': 2})]),
+    ]
+
+
+def test_removed_leads_go_through_the_outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_ENABLED', True)
+    deleted = []
+
+    class LeadsClient(AirtableClient):
+        def delete_records(self, table_name, record_ids):
+            deleted.append((table_name, list(record_ids)))
+            return [{'id': record_id, 'deleted': True} for record_id in record_ids]
+
+    client = LeadsClient()
+    client.outbox_file = str(tmp_path / 'outbox.sqlite')
+    remove_leads(client, ['recL1', 'recL2'], key='7')
+
+    # Nothing is deleted ahead of the lead writes already queued
+    assert deleted == []
+    assert client.outbox.pending() == 2
+    assert client.outbox.drain() == {}
+    assert deleted == [(settings.SHORTLISTED_LEADS_TABLE, ['recL1', 'recL2'])]
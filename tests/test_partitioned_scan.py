@@ -0,0 +1,80 @@
+import re
+import threading
+
+import pytest
+
+from config import settings
+from utils.airtable_client import AirtableClient, _SliceQueue
+
+RANGE = re.compile(r"\{Applicant ID\} >= (\d+), \{Applicant ID\} < (\d+)")
+
+
+class PagedClient(AirtableClient):
+    """Applicants table served in pages of page_size, with range formulas and sorting"""
+
+    def __init__(self, applicant_ids, page_size=3):
+        super().__init__()
+        self.field_ids = False
+        self.page_size = page_size
+        self.records = [{"id": f"rec{n}", "fields": {"Applicant ID": n}}
+                        for n in applicant_ids]
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def _make_request(self, method, endpoint, data=None, params=None, base_url=None):
+        params = params or {}
+        records = self.records
+        if 'sort[0][field]' in params:
+            ordered = sorted(records, key=lambda r: r['fields']['Applicant ID'],
+                             reverse=params['sort[0][direction]'] == 'desc')
+            return {'records': ordered[:1]}
+
+        match = RANGE.search(params.get('filterByFormula', ''))
+        if match:
+            low, high = map(int, match.groups())
+            if 'offset' not in params:
+                with self._lock:
+                    self.ranges.append((low, high))
+            records = [r for r in records if low <= r['fields']['Applicant ID'] < high]
+        start = int(params.get('offset', 0))
+        page = {'records': records[start:start + self.page_size]}
+        if start + self.page_size < len(records):
+            page['offset'] = str(start + self.page_size)
+        return page
+
+
+def test_slice_queue_covers_the_range_once_while_resizing():
+    slices = _SliceQueue(5, 1000, 50, target_pages=3)
+    covered = []
+    pages = iter([10, 10, 1, 1, 1, 2, 10] + [1] * 50)
+    while (bounds := slices.next()) is not None:
+        covered.append(bounds)
+        slices.observe(next(pages))
+
+    assert covered[0][0] == 5 and covered[-1][1] == 1000
+    assert all(end == start for (_, end), (start, _) in zip(covered, covered[1:]))
+    # Halved after too many pages, doubled after a single page
+    sizes = [end - start for start, end in covered]
+    assert sizes[:8] == [50, 25, 12, 24, 48, 96, 96, 48]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_partitioned_scan_returns_every_record_once(workers, monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_TARGET_PAGES", 2)
+    # Dense at first, then sparse, so ranges are resized both ways
+    applicant_ids = list(range(1, 120)) + list(range(500, 5000, 97))
+    client = PagedClient(applicant_ids)
+
+    records = client.get_records_partitioned(settings.APPLICANTS_TABLE,
+                                             fields=['Applicant ID'], workers=workers)
+
+    assert [r['fields']['Applicant ID'] for r in records] == applicant_ids
+    assert client.ranges[0][0] == 1
+    assert len({high - low for low, high in client.ranges}) > 1
+    ranges = sorted(client.ranges)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert ranges[-1][1] == applicant_ids[-1] + 1
+
+
+def test_partitioned_scan_of_an_empty_table():
+    assert PagedClient([]).get_records_partitioned(settings.APPLICANTS_TABLE) == []
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from config import settings
+from scripts.llm_evaluation import evaluate_applicants
+from utils.llm_client import LLMClient
+from utils.llm_providers import StubProvider
+from utils.planner import plan_evaluate
+from utils.snapshot import SnapshotClient
+
+
+def compressed(name, location="Canada", rate=50, availability=30):
+    return json.dumps({
+        "personal": {"full_name": name, "email": f"{name.lower()}@example.com",
+                     "location": location},
+        "experience": [{"company": "Acme", "title": "Engineer",
+                        "start": "2010-01-01"}],
+        "salary": {"preferred_rate": rate, "availability": availability,
+                   "currency": "USD"},
+    })
+
+
+APPLICANTS = [
+    {"Applicant ID": 1, "Compressed JSON": compressed("Ada")},
+    {"Applicant ID": 2, "Compressed JSON": compressed("Grace")},
+    {"Applicant ID": 3,
+     "Compressed JSON": compressed("Alan", "Atlantis", availability=5)},
+    {"Applicant ID": 4, "Compressed JSON": compressed("Edsger"),
+     "LLM Summary": "Strong", "LLM Score": 80.0},
+    # Fetched with get_applicant_data, where it is just as empty
+    {"Applicant ID": 5},
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    tables = {table_id: [] for table_id in settings.TABLES.values()}
+    tables[settings.APPLICANTS_TABLE] = [
+        {"id": f"rec{fields['Applicant ID']}", "createdTime": "x", "fields": fields}
+        for fields in APPLICANTS
+    ]
+    for table_id, records in tables.items():
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        (tmp_path / f"{table_id}.jsonl").write_text(lines)
+    manifest = {"format": "jsonl", "tables": {table_id: {} for table_id in tables}}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    return str(tmp_path)
+
+
+def stub_run(directory, **options):
+    """Metrics of a real run against the snapshot, with a stub LLM provider"""
+    client = SnapshotClient(directory)
+    reads = []
+    make_request = client._make_request
+
+    def counted(method, endpoint, *args, **kwargs):
+        if method == 'GET':
+            reads.append(endpoint)
+        return make_request(method, endpoint, *args, **kwargs)
+
+    client._make_request = counted
+    provider = StubProvider()
+    llm_client = LLMClient(providers=[provider])
+    llm_client.save_latency = lambda: None
+    metrics = evaluate_applicants(client=client, llm_client=llm_client, **options)
+    return {'reads': len(reads), 'writes': client.writes, 'llm_calls': provider.calls,
+            'deferred': metrics['deferred']}
+
+
+@pytest.mark.parametrize("options", [
+    {"cascade": False, "token_budget": 0},
+    {"cascade": True, "token_budget": 0},
+    {"cascade": False, "token_budget": 1},
+])
+def test_plan_matches_a_stub_run(snapshot, monkeypatch, options):
+    monkeypatch.setattr(settings, "SCHEMA_CHECK", False)
+    plan = plan_evaluate(SnapshotClient(snapshot), dedup=False, deadline=0, **options)
+    expected = stub_run(snapshot, dedup=False, deadline=0, **options)
+    assert {key: plan[key] for key in expected} == expected
+
+
+def test_plan_budget_defers_what_does_not_fit(snapshot, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_CHECK", False)
+    budget = LLMClient.estimate_tokens(json.loads(compressed("Ada"))) + 1
+    plan = plan_evaluate(SnapshotClient(snapshot), cascade=True, dedup=False,
+                         deadline=0, token_budget=budget)
+    assert (plan['llm_calls'], plan['deferred']) == (1, 1)
+    expected = stub_run(snapshot, cascade=True, dedup=False, deadline=0,
+                        token_budget=budget)
+    assert {key: plan[key] for key in expected} == expected
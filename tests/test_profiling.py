@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from config import settings
+from scripts.run_sharded import _init_worker
+from utils import profiling
+from utils.profiling import profile_stage, span
+from utils.rate_limiter import SharedQuota, SharedRateLimiter
+
+
+def profiled_shard():
+    with profile_stage('shard', mode='spans'):
+        with span('work'):
+            pass
+    return os.getpid()
+
+
+def test_nested_stage_is_a_span(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'PROFILE_DIR', str(tmp_path))
+    with profile_stage('outer', mode='spans'):
+        with profile_stage('inner', mode='spans'):
+            with span('work'):
+                pass
+        names = [event[0] for event in profiling._profiler.events]
+
+    assert names == ['work', 'inner']
+    assert profiling._profiler is None
+    stages = sorted(path.name.split('-')[0] for path in tmp_path.iterdir())
+    assert stages == ['outer', 'outer']
+
+
+def test_forked_workers_write_their_own_profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'PROFILE_DIR', str(tmp_path))
+    initargs = (SharedRateLimiter(100), SharedQuota(0), SharedQuota(0))
+    with profile_stage('sharded', mode='spans'):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork'),
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            worker_pid = pool.submit(profiled_shard).result()
+
+    written = sorted(path.name for path in tmp_path.iterdir())
+    assert f"shard-{worker_pid}-" in written[0]
+    stages = [name.split('-')[0] for name in written]
+    assert stages == ['shard', 'shard', 'sharded', 'sharded']
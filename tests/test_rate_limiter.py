@@ -0,0 +1,66 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.run_sharded import _init_worker
+from utils import airtable_client, scheduler
+from utils.llm_client import LLMClient, LLMQuotaExceeded
+from utils.llm_providers import StubProvider
+from utils.rate_limiter import SharedQuota, SharedRateLimiter
+
+WORKERS = 4
+
+
+def pool(limiter, quota, token_quota):
+    return ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context('fork'),
+                               initializer=_init_worker,
+                               initargs=(limiter, quota, token_quota))
+
+
+def spend_calls(attempts):
+    """Evaluations a worker gets through before the shared call budget runs out"""
+    client = LLMClient(providers=[StubProvider()])
+    made = 0
+    for _ in range(attempts):
+        try:
+            client.evaluate_applicant({})
+        except LLMQuotaExceeded:
+            break
+        made += 1
+    return made
+
+
+def reserve_tokens(attempts):
+    """Token reservations of 10 a worker's scheduler gets from the shared budget"""
+    tokens = scheduler.EvaluationScheduler(deadline=0, token_budget=0)
+    return sum(tokens.defer_reason(str(n), 10) is None for n in range(attempts))
+
+
+def acquire_slots(count):
+    slots = []
+    for _ in range(count):
+        airtable_client._rate_limiter.acquire()
+        slots.append(time.monotonic())
+    return slots
+
+
+def test_call_and_token_budgets_hold_across_workers():
+    quota, token_quota = SharedQuota(25), SharedQuota(170)
+    with pool(SharedRateLimiter(0), quota, token_quota) as executor:
+        made = list(executor.map(spend_calls, [20] * WORKERS))
+        reserved = list(executor.map(reserve_tokens, [20] * WORKERS))
+
+    assert sum(made) == quota.used == 25
+    assert sum(reserved) == 17
+    assert token_quota.used == 170
+
+
+def test_rate_limit_holds_across_workers():
+    rate, per_worker = 50, 5
+    started = time.monotonic()
+    with pool(SharedRateLimiter(rate), SharedQuota(0), SharedQuota(0)) as executor:
+        per_worker_slots = executor.map(acquire_slots, [per_worker] * WORKERS)
+        slots = [slot for worker_slots in per_worker_slots for slot in worker_slots]
+
+    # Each acquisition waits for its own slot, 1/rate after the one before
+    assert max(slots) - started >= (len(slots) - 1) / rate
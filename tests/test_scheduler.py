@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from scripts.llm_evaluation import evaluate_and_store
+from utils import scheduler as scheduler_module
+from utils.llm_client import EVALUATION_FAILED, LLMClient
+from utils.llm_providers import StubProvider
+from utils.scheduler import DEADLINE_REACHED, EvaluationScheduler, parse_priority
+
+
+def applicant(record_id, created, location="Canada", availability=30, **fields):
+    compressed_json = {
+        "personal": {"location": location},
+        "experience": [{"start": "2010-01-01"}],
+        "salary": {"preferred_rate": 50, "availability": availability},
+    }
+    fields = {"Applicant ID": record_id, "Compressed JSON": json.dumps(compressed_json),
+              **fields}
+    return {"id": record_id, "createdTime": created, "fields": fields}
+
+
+class LeadsClient:
+    def __init__(self, shortlisted):
+        self.shortlisted = shortlisted
+
+    def get_records(self, table_id, fields=None):
+        return [{"id": "recL", "fields": {"Applicant ID": list(self.shortlisted)}}]
+
+
+def test_priority_order():
+    applicants = [
+        applicant("a", "2024-01-01", location="Atlantis"),
+        applicant("b", "2024-03-01", availability=5),
+        applicant("c", "2024-02-01"),
+        applicant("d", "2024-04-01"),
+        applicant("e", "2024-05-01", location="Atlantis"),
+    ]
+
+    def order(*names):
+        scheduler = EvaluationScheduler(names, 0, 0)
+        return [a["id"] for a in scheduler.order(applicants, LeadsClient({"e"}))]
+
+    assert order() == ["a", "b", "c", "d", "e"]
+    assert order("recency") == ["e", "d", "b", "c", "a"]
+    # Ties on the rule score keep falling through to the next priority
+    assert order("rule_score", "recency") == ["d", "c", "e", "b", "a"]
+    assert order("shortlisted", "rule_score", "recency") == ["e", "d", "c", "b", "a"]
+    with pytest.raises(ValueError, match="Unknown priority"):
+        parse_priority("rule_score,fastest")
+
+
+def test_deadline_cutoff(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(scheduler_module.time, "monotonic", lambda: now[0])
+    scheduler = EvaluationScheduler(deadline=60, token_budget=0)
+
+    assert scheduler.defer_reason("a", 100, expected_latency=30) is None
+    # A call that would still be running at the deadline is not started
+    assert scheduler.defer_reason("b", 100, expected_latency=61) == DEADLINE_REACHED
+    now[0] += 60
+    assert scheduler.expired
+    scheduler.defer_all([applicant("c", ""), applicant("d", "", **{"LLM Score": 70.0})],
+                        DEADLINE_REACHED)
+    assert scheduler.deferred == [("b", DEADLINE_REACHED), ("c", DEADLINE_REACHED)]
+
+
+def test_token_reservation_and_refund():
+    scheduler = EvaluationScheduler(deadline=0, token_budget=100)
+    assert scheduler.defer_reason("a", 60) is None
+    assert scheduler.defer_reason("b", 60) == "token budget of 100 reached"
+    scheduler.release(60)
+    assert scheduler.tokens_used == 0
+    assert scheduler.defer_reason("b", 60) is None
+    assert scheduler.tokens_used == 60
+
+
+def test_failed_evaluation_refunds_its_tokens():
+    class Client:
+        def queue_update(self, *args, **kwargs):
+            raise AssertionError("a failed evaluation must not be stored")
+
+    llm_client = LLMClient(providers=[StubProvider(fail_every=1)])
+    scheduler = EvaluationScheduler(deadline=0, token_budget=10_000)
+    payload, reason = evaluate_and_store(Client(), llm_client, scheduler, "recA", "1",
+                                         {})
+
+    assert (payload, reason) == (None, EVALUATION_FAILED)
+    assert scheduler.tokens_used == 0
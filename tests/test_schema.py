@@ -0,0 +1,106 @@
+import os
+import time
+
+import pytest
+
+from config import settings
+from utils import schema as schema_module
+from utils.airtable_client import AirtableClient
+from utils.schema import BaseSchema, SchemaError, validate_schema
+
+APPLICANTS = settings.APPLICANTS_TABLE
+
+TABLES = [{
+    "id": APPLICANTS,
+    "name": "Applicants",
+    "fields": [
+        {"id": "fldAppId", "name": "Applicant ID"},
+        {"id": "fldJson", "name": "Compressed JSON"},
+        {"id": "fldScore", "name": "LLM Score"},
+    ],
+}]
+
+
+class MetaClient(AirtableClient):
+    """Serves the base metadata and one Applicants record keyed by field ID"""
+
+    def __init__(self, tables=TABLES):
+        super().__init__()
+        self.tables = tables
+        self.requests = []
+
+    def _make_request(self, method, endpoint, data=None, params=None, base_url=None):
+        self.requests.append((endpoint, params))
+        if endpoint == 'tables':
+            return {'tables': self.tables}
+        fields = {"fldAppId": 7, "fldJson": "{}", "fldScore": 80.0}
+        if not (params or {}).get('returnFieldsByFieldId'):
+            fields = {"Applicant ID": 7, "Compressed JSON": "{}", "LLM Score": 80.0}
+        return {'records': [{"id": "recA", "fields": fields}]}
+
+    @property
+    def meta_requests(self):
+        return sum(endpoint == 'tables' for endpoint, _ in self.requests)
+
+
+@pytest.fixture(autouse=True)
+def schema_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(schema_module, "_validated", set())
+    return tmp_path / settings.SCHEMA_CACHE_FILE
+
+
+def test_missing_fields_are_reported():
+    schema = BaseSchema("appX", TABLES)
+    required = {APPLICANTS: ("Applicant ID", "LLM Summary"), "tblGone": ("Email",)}
+
+    missing = schema.missing_fields(required)
+    assert missing == ["Applicants.LLM Summary", "table tblGone"]
+    with pytest.raises(SchemaError, match="Applicants.LLM Summary, table tblGone"):
+        validate_schema(MetaClient(), required)
+    # A base with every field passes, and is checked once per process
+    client = MetaClient()
+    validate_schema(client, {APPLICANTS: ("Applicant ID", "LLM Score")})
+    validate_schema(client, {APPLICANTS: ("LLM Summary",)})
+
+
+def test_schema_cache_expires_after_ttl(schema_cache):
+    client = MetaClient()
+    BaseSchema.load(client, cache_file=str(schema_cache), ttl=60)
+    BaseSchema.load(client, cache_file=str(schema_cache), ttl=60)
+    assert client.meta_requests == 1
+
+    stale = time.time() - 61
+    os.utime(schema_cache, (stale, stale))
+    BaseSchema.load(client, cache_file=str(schema_cache), ttl=60)
+    assert client.meta_requests == 2
+
+    # A cache written for another base is never used
+    other = MetaClient()
+    other.base_id = "appOther"
+    BaseSchema.load(other, cache_file=str(schema_cache), ttl=60)
+    assert other.meta_requests == 1
+
+
+def test_field_ids_are_mapped_back_to_names(monkeypatch):
+    monkeypatch.setattr(settings, "FIELD_IDS", True)
+    client = MetaClient()
+
+    records = client.get_records(APPLICANTS, fields=["Applicant ID", "LLM Score"])
+
+    _, params = client.requests[-1]
+    assert params["returnFieldsByFieldId"] == "true"
+    assert params["fields[]"] == ["fldAppId", "fldScore"]
+    assert records[0]["fields"] == {"Applicant ID": 7, "Compressed JSON": "{}",
+                                    "LLM Score": 80.0}
+
+
+def test_field_names_are_used_without_a_schema(monkeypatch):
+    monkeypatch.setattr(settings, "FIELD_IDS", True)
+    client = MetaClient(tables=[])
+
+    records = client.get_records(APPLICANTS, fields=["Applicant ID"])
+
+    _, params = client.requests[-1]
+    assert "returnFieldsByFieldId" not in params
+    assert records[0]["fields"]["Applicant ID"] == 7
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from config import settings
+from utils.snapshot import SnapshotClient
+
+APPLICANTS = settings.APPLICANTS_TABLE
+WORK = settings.WORK_EXPERIENCE_TABLE
+
+
+@pytest.fixture
+def client(tmp_path):
+    tables = {table_id: [] for table_id in settings.TABLES.values()}
+    tables[APPLICANTS] = [
+        {"id": "recA", "fields": {"Applicant ID": 7, "Status": "new"}},
+    ]
+    tables[WORK] = [
+        {"id": "recW", "fields": {"Applicant ID": ["recA"], "Company": "Acme"}},
+    ]
+    for table_id, records in tables.items():
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        (tmp_path / f"{table_id}.jsonl").write_text(lines)
+    manifest = {"format": "jsonl", "tables": {table_id: {} for table_id in tables}}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    return SnapshotClient(str(tmp_path), str(tmp_path / "writes.jsonl"))
+
+
+def test_matches_equals_formulas(client):
+    applicant = client.tables[APPLICANTS]["recA"]
+    work = client.tables[WORK]["recW"]
+
+    assert client._matches(applicant, None)
+    assert client._matches(applicant, "{Applicant ID} = '7'")
+    assert not client._matches(applicant, "{Applicant ID} = '8'")
+    assert not client._matches(applicant, "{Missing} = '7'")
+    # Linked records match by record ID or by the applicant's Applicant ID
+    assert client._matches(work, "{Applicant ID} = 'recA'")
+    assert client._matches(work, "{Applicant ID} = '7'")
+    with pytest.raises(ValueError, match="cannot evaluate"):
+        client._matches(applicant, "AND({Status} = 'new', {Applicant ID} = '7')")
+
+
+def test_writes_are_visible_to_later_reads(client, tmp_path):
+    created = client.create_record(WORK, {"Applicant ID": ["recA"],
+                                          "Company": "Initech"})
+    formula = "{Applicant ID} = '7'"
+    companies = {r["fields"]["Company"] for r in client.get_records(WORK, formula)}
+    assert companies == {"Acme", "Initech"}
+
+    client.update_record(APPLICANTS, "recA", {"Status": None, "LLM Score": 50.0})
+    # A null clears the field, so it is left out like Airtable does
+    assert client.get_record(APPLICANTS, "recA")["fields"] == {
+        "Applicant ID": 7, "LLM Score": 50.0}
+
+    client.delete_records(WORK, ["recW", created["id"]])
+    assert client.get_records(WORK, formula) == []
+
+    ops = [json.loads(line)["op"] for line in open(tmp_path / "writes.jsonl")]
+    assert ops == ["create", "update", "delete", "delete"]
+    assert client.writes == 4
+
+
+def test_reads_return_projected_copies(client):
+    record = client.get_records(APPLICANTS, fields=["Applicant ID", "Missing"])[0]
+    assert record["fields"] == {"Applicant ID": 7}
+    record["fields"]["Applicant ID"] = 8
+    assert client.tables[APPLICANTS]["recA"]["fields"]["Applicant ID"] == 7
@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from config import settings
+from scripts.webhook_consumer import WebhookProcessor
+from utils.webhooks import (
+    ChildLinks,
+    LocalPayloadSource,
+    changed_records,
+    is_api_change,
+    linked_record_ids,
+    verify_signature,
+)
+
+WORK = settings.WORK_EXPERIENCE_TABLE
+SALARY = settings.SALARY_PREFERENCES_TABLE
+APPLICANTS = settings.APPLICANTS_TABLE
+
+
+def link(*record_ids):
+    links = [{'id': record_id, 'name': '1'} for record_id in record_ids]
+    return {'cellValuesByFieldId': {'fldApplicant': links}}
+
+
+def payload(table_id, source='client', **changes):
+    return {'actionMetadata': {'source': source},
+            'changedTablesById': {table_id: changes}}
+
+
+class FakeClient:
+    """Child records by ID, each linked to one applicant; counts the requests made"""
+
+    def __init__(self, records):
+        self.records = records
+        self.requests = 0
+
+    def get_records(self, table_id, fields=None):
+        self.requests += 1
+        return [{'id': record_id, 'fields': {'Applicant ID': [applicant]}}
+                for record_id, (table, applicant) in self.records.items()
+                if table == table_id]
+
+    def get_record(self, table_id, record_id):
+        self.requests += 1
+        applicant_rec_id = self.records[record_id][1]
+        return {'id': record_id, 'fields': {'Applicant ID': [applicant_rec_id]}}
+
+
+def test_changed_records_marks_destroyed_records():
+    changes = changed_records(payload(
+        WORK,
+        createdRecordsById={'recNew': link('recA')},
+        changedRecordsById={'recOld': {'current': link('recB')}},
+        destroyedRecordIds=['recGone'],
+    ))
+    assert changes[WORK] == {'recNew': link('recA'),
+                             'recOld': {'current': link('recB')},
+                             'recGone': {'destroyed': True}}
+
+
+def test_linked_record_ids_includes_previous_link():
+    change = {'current': link('recNew'), 'previous': link('recOld')}
+    assert linked_record_ids(change) == ['recNew', 'recOld']
+    assert linked_record_ids(change, include_previous=False) == ['recNew']
+    assert linked_record_ids(
+        {'current': {'cellValuesByFieldId': {'fldTitle': 'Engineer'}}}) == []
+
+
+def test_is_api_change():
+    assert is_api_change(payload(WORK, source='publicApi'))
+    assert not is_api_change(payload(WORK))
+
+
+def test_verify_signature():
+    secret = base64.b64encode(b'secret').decode('ascii')
+    body = b'{"webhook": {"id": "ach1"}}'
+    mac = 'hmac-sha256=' + hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+
+    assert verify_signature(body, mac, secret)
+    assert not verify_signature(body + b' ', mac, secret)
+    assert not verify_signature(body, None, secret)
+    assert verify_signature(body, None, '')
+
+
+@pytest.mark.parametrize('content', [
+    lambda payloads: json.dumps(payloads),
+    lambda payloads: json.dumps({'payloads': payloads}),
+    lambda payloads: '\n'.join(json.dumps(p) for p in payloads),
+])
+def test_local_payload_source_formats(tmp_path, content):
+    payloads = [payload(WORK), payload(SALARY)]
+    path = tmp_path / 'payloads.json'
+    path.write_text(content(payloads))
+    assert LocalPayloadSource(str(path)).fetch() == payloads
+
+
+def test_child_links_persist(tmp_path):
+    path = str(tmp_path / 'links.json')
+    links = ChildLinks(path)
+    links.remember('recW1', ['recA'])
+    links.remember('recW2', [])
+    links.save()
+
+    reloaded = ChildLinks(path)
+    assert len(reloaded) == 1
+    assert reloaded.forget('recW1') == ['recA']
+    assert reloaded.get('recW1') == []
+
+
+def test_processor_maps_created_changed_and_destroyed_records(tmp_path):
+    client = FakeClient(
+        {'recW1': (WORK, 'recA'), 'recW2': (WORK, 'recB'), 'recS1': (SALARY, 'recC')})
+    path = tmp_path / 'payloads.jsonl'
+    title_only = {'current': {'cellValuesByFieldId': {'fldTitle': 'CTO'}}}
+    path.write_text('\n'.join(json.dumps(p) for p in [
+        payload(WORK, createdRecordsById={'recW3': link('recD')}),
+        # Only the title changed, so the payload carries no link
+        payload(WORK, changedRecordsById={'recW2': title_only}),
+        payload(SALARY, destroyedRecordIds=['recS1']),
+        payload(WORK, source='publicApi', destroyedRecordIds=['recW1']),
+        payload(APPLICANTS, changedRecordsById={'recA': {'current': {}}}),
+    ]))
+    processor = WebhookProcessor(client=client, links=ChildLinks(None), dry_run=True)
+
+    payloads = LocalPayloadSource(str(path)).fetch()
+    assert processor.affected_applicants(payloads) == ['recB', 'recC', 'recD']
+    # One scan per child table seeds the links; nothing else needs a lookup
+    assert client.requests == 3
+    assert processor.links.get('recW3') == ['recD']
+    assert processor.links.get('recS1') == []
+
+
+def test_processor_looks_up_records_it_cannot_map():
+    client = FakeClient({'recW1': (WORK, 'recA')})
+    links = ChildLinks(None)
+    links.remember('recOther', ['recZ'])
+    processor = WebhookProcessor(client=client, links=links, dry_run=True)
+
+    unlinked = {'current': {'cellValuesByFieldId': {}}}
+    changes = [payload(WORK, changedRecordsById={'recW1': unlinked})]
+    assert processor.affected_applicants(changes) == ['recA']
+    assert client.requests == 1
+
+    assert processor.affected_applicants(
+        [payload(WORK, destroyedRecordIds=['recUnknown'])]) == []
+
+
+def test_processor_scans_leads_once_per_batch(monkeypatch):
+    import scripts.shortlist_candidates as shortlist
+
+    client = FakeClient({'recW1': (WORK, 'recA'), 'recW2': (WORK, 'recB'),
+                         'recL1': (settings.SHORTLISTED_LEADS_TABLE, 'recA')})
+    client.get_applicant_id = lambda record_id: record_id.upper()
+    client.get_record = lambda table_id, record_id: {'id': record_id, 'fields': {}}
+    seen = []
+    monkeypatch.setattr(
+        shortlist, 'shortlist_applicant',
+        lambda client, applicant, leads=None: seen.append((applicant['id'], leads)))
+    processor = WebhookProcessor(client=client, stages=['shortlist'],
+                                 links=ChildLinks(None))
+
+    changed = {'recW1': {'current': {}}, 'recW2': {'current': {}}}
+    changes = [payload(WORK, changedRecordsById=changed)]
+    assert processor.process(changes) == 2
+    # One scan per child table seeds the links, then one of Shortlisted Leads
+    assert client.requests == 4
+    assert seen == [('recA', {'recA': ['recL1']}), ('recB', {'recA': ['recL1']})]
@@ -1,11 +1,55 @@
 import os
-import json
+import math
 import requests
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from requests.exceptions import RequestException
 
 from config import settings
+from utils.json_codec import encode_json
+from utils.profiling import span
+from utils.rate_limiter import RateLimiter
+
+# Airtable allows 5 requests per second per base; shared by every client in the process
+_rate_limiter = RateLimiter(settings.AIRTABLE_RATE_LIMIT)
+
+# Most records one create/update/delete request may carry
+AIRTABLE_BATCH_SIZE = 10
+
+
+def set_rate_limiter(limiter):
+    """Replace the process-wide limiter, e.g. with a SharedRateLimiter in workers"""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+class _SliceQueue:
+    """Hands out [start, end) ranges, resizing them from observed page counts"""
+
+    def __init__(self, start: int, stop: int, size: int, target_pages: int):
+        self.next_start = start
+        self.stop = stop
+        self.size = max(1, size)
+        self.target_pages = target_pages
+        self._lock = threading.Lock()
+
+    def next(self) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            if self.next_start >= self.stop:
+                return None
+            start = self.next_start
+            self.next_start = min(self.stop, start + self.size)
+            return start, self.next_start
+
+    def observe(self, pages: int):
+        with self._lock:
+            if pages > self.target_pages:
+                self.size = max(1, self.size // 2)
+            elif pages <= 1:
+                self.size *= 2
+
 
 class AirtableClient:
     def __init__(self):
@@ -16,57 +60,330 @@ class AirtableClient:
             'Content-Type': 'application/json'
         }
         self.base_url = f'https://api.airtable.com/v0/{self.base_id}'
+        self.bases_url = f'https://api.airtable.com/v0/bases/{self.base_id}'
+
+        # Applicant ID <-> Applicants record ID map, dropped wholesale after
+        # ID_CACHE_TTL
+        self._record_ids: Dict[str, str] = {}
+        self._applicant_ids: Dict[str, str] = {}
+        self._id_cache_started = time.monotonic()
+
+        # With FIELD_IDS, reads ask for field IDs, mapped back to names via the schema
+        self.field_ids = settings.FIELD_IDS
+        self._schema = None
 
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, params: Optional[Dict] = None):
-        url = f'{self.base_url}/{endpoint}'
+        # Queued writes (see queue_create), opened on first use
+        self.outbox_file = settings.OUTBOX_FILE
+        self._outbox = None
+
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      params: Optional[Dict] = None, base_url: Optional[str] = None):
+        url = f'{base_url or self.base_url}/{endpoint}'
         
         for attempt in range(settings.MAX_RETRIES):
             try:
-                response = requests.request(
-                    method=method,
-                    url=url,
-                    headers=self.headers,
-                    json=data,
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                return response.json()
+                with span('rate_limit'):
+                    _rate_limiter.acquire()
+                with span('fetch' if method == 'GET' else 'write'):
+                    response = requests.request(
+                        method=method,
+                        url=url,
+                        headers=self.headers,
+                        json=data,
+                        params=params,
+                        timeout=30
+                    )
+                    response.raise_for_status()
+                    return response.json()
             except RequestException as e:
                 if attempt == settings.MAX_RETRIES - 1:
                     raise e
                 time.sleep(min(settings.RETRY_BACKOFF ** attempt, 60))  # capped backoff
     
-    def get_records(self, table_name: str, filter_formula: Optional[str] = None) -> List[Dict]:
+    def _field_schema(self):
+        if self._schema is None:
+            from utils.schema import get_schema
+            self._schema = get_schema(self) or False
+        return self._schema or None
+
+    def _by_field_id(self, table_name: str, params: Dict) -> Dict:
+        """Request params asking for field IDs, with any projection translated to IDs"""
+        schema = self._field_schema() if self.field_ids else None
+        if schema is None or table_name not in schema.tables:
+            return dict(params)
+        params = dict(params, returnFieldsByFieldId='true')
+        if 'fields[]' in params:
+            params['fields[]'] = [schema.field_id(table_name, name)
+                                  for name in params['fields[]']]
+        return params
+
+    def _by_field_name(self, table_name: str, record: Dict) -> Dict:
+        schema = self._field_schema() if self.field_ids else None
+        if schema is not None and table_name in schema.tables and 'fields' in record:
+            record['fields'] = {schema.field_name(table_name, k): v
+                                for k, v in record['fields'].items()}
+        return record
+
+    def _fetch_pages(self, table_name: str, params: Dict) -> Tuple[List[Dict], int]:
+        """Follow the offset cursor to the end; returns records and page count"""
         records = []
-        params = {}
-        
-        if filter_formula:
-            params['filterByFormula'] = filter_formula
-            
+        pages = 0
+        params = self._by_field_id(table_name, params)
+
         while True:
             response = self._make_request('GET', table_name, params=params)
-            records.extend(response.get('records', []))
+            records.extend(self._by_field_name(table_name, record)
+                           for record in response.get('records', []))
+            pages += 1
             
             if 'offset' in response:
                 params['offset'] = response['offset']
             else:
                 break
+
+        return records, pages
+
+    def get_records(self, table_name: str, filter_formula: Optional[str] = None,
+                    fields: Optional[List[str]] = None) -> List[Dict]:
+        params = {}
+        
+        if filter_formula:
+            params['filterByFormula'] = filter_formula
+        if fields:
+            params['fields[]'] = fields
+            
+        records, _ = self._fetch_pages(table_name, params)
+
+        if table_name == settings.APPLICANTS_TABLE:
+            self._remember_applicants(records)
                 
         return records
 
+    def _field_bound(self, table_name: str, field: str, direction: str,
+                     filter_formula: Optional[str] = None) -> Optional[int]:
+        params = {
+            'sort[0][field]': field,
+            'sort[0][direction]': direction,
+            'maxRecords': 1,
+            'fields[]': [field],
+        }
+        if filter_formula:
+            params['filterByFormula'] = filter_formula
+        response = self._make_request('GET', table_name, params=params)
+        records = response.get('records', [])
+        if not records or field not in records[0]['fields']:
+            return None
+        return int(records[0]['fields'][field])
+
+    def get_records_partitioned(self, table_name: str,
+                                filter_formula: Optional[str] = None,
+                                fields: Optional[List[str]] = None,
+                                partition_field: str = 'Applicant ID',
+                                workers: int = settings.SCAN_WORKERS) -> List[Dict]:
+        """
+        Read a table as disjoint ranges of a numeric (autonumber) field, paging
+        the ranges in parallel under the shared rate limit.
+
+        Ranges start at about four per worker and are halved or doubled as
+        they come back with too many or too few pages, so each stays a few
+        pages long whatever the ID density. Results are returned in field order.
+        """
+        low = self._field_bound(table_name, partition_field, 'asc', filter_formula)
+        high = self._field_bound(table_name, partition_field, 'desc', filter_formula)
+        if low is None or high is None:
+            return self.get_records(table_name, filter_formula, fields)
+
+        slices = _SliceQueue(low, high + 1, math.ceil((high - low + 1) / (workers * 4)),
+                             settings.SCAN_TARGET_PAGES)
+
+        def scan() -> List[Tuple[int, List[Dict]]]:
+            chunks = []
+            while True:
+                bounds = slices.next()
+                if bounds is None:
+                    return chunks
+                field = f"{{{partition_field}}}"
+                formula = f"AND({field} >= {bounds[0]}, {field} < {bounds[1]})"
+                if filter_formula:
+                    formula = f"AND({filter_formula}, {formula})"
+                params: Dict[str, Any] = {'filterByFormula': formula}
+                if fields:
+                    params['fields[]'] = fields
+                records, pages = self._fetch_pages(table_name, params)
+                slices.observe(pages)
+                chunks.append((bounds[0], records))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan) for _ in range(workers)]
+            chunks = [chunk for future in futures for chunk in future.result()]
+
+        records = [record for _, part in sorted(chunks, key=lambda c: c[0])
+                   for record in part]
+        if table_name == settings.APPLICANTS_TABLE:
+            self._remember_applicants(records)
+        return records
+
+    def get_all_applicants(self, fields: Optional[List[str]] = None) -> List[Dict]:
+        """Full Applicants scan, partitioned when PARTITIONED_SCAN is on"""
+        if settings.PARTITIONED_SCAN:
+            return self.get_records_partitioned(settings.APPLICANTS_TABLE,
+                                                fields=fields)
+        return self.get_records(settings.APPLICANTS_TABLE, fields=fields)
+
     def get_record(self, table_name: str, record_id: str) -> Dict:
-        return self._make_request('GET', f'{table_name}/{record_id}')
+        params = self._by_field_id(table_name, {})
+        record = self._make_request('GET', f'{table_name}/{record_id}',
+                                    params=params or None)
+        record = self._by_field_name(table_name, record)
+        if table_name == settings.APPLICANTS_TABLE:
+            self._remember_applicants([record])
+        return record
 
     def create_record(self, table_name: str, data: Dict) -> Dict:
-        return self._make_request('POST', table_name, data={'fields': data})
+        record = self._make_request('POST', table_name, data={'fields': data})
+        if table_name == settings.APPLICANTS_TABLE:
+            self._remember_applicants([record])
+        return record
 
     def update_record(self, table_name: str, record_id: str, data: Dict) -> Dict:
         return self._make_request('PATCH', f'{table_name}/{record_id}', data={'fields': data})
 
     def delete_record(self, table_name: str, record_id: str) -> Dict:
+        if table_name == settings.APPLICANTS_TABLE:
+            self._forget_applicant(record_id)
         return self._make_request('DELETE', f'{table_name}/{record_id}')
+
+    def create_records(self, table_name: str, records: List[Dict]) -> List[Dict]:
+        """Create up to AIRTABLE_BATCH_SIZE records in one request"""
+        data = {'records': [{'fields': fields} for fields in records]}
+        created = self._make_request('POST', table_name, data=data)['records']
+        if table_name == settings.APPLICANTS_TABLE:
+            self._remember_applicants(created)
+        return created
+
+    def update_records(self, table_name: str,
+                       updates: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Update up to AIRTABLE_BATCH_SIZE (record ID, fields) pairs in one request"""
+        data = {'records': [{'id': record_id, 'fields': fields}
+                            for record_id, fields in updates]}
+        return self._make_request('PATCH', table_name, data=data)['records']
+
+    def delete_records(self, table_name: str, record_ids: List[str]) -> List[Dict]:
+        """Delete up to AIRTABLE_BATCH_SIZE records in one request"""
+        if table_name == settings.APPLICANTS_TABLE:
+            for record_id in record_ids:
+                self._forget_applicant(record_id)
+        return self._make_request('DELETE', table_name,
+                                  params={'records[]': list(record_ids)})['records']
+
+    @property
+    def outbox(self):
+        if self._outbox is None:
+            from utils.outbox import Outbox
+            self._outbox = Outbox(self, self.outbox_file)
+        return self._outbox
+
+    def queue_create(self, table_name: str, data: Dict, key: str = ''):
+        """Create a record through the outbox, or right away if OUTBOX_ENABLED is off"""
+        if not settings.OUTBOX_ENABLED:
+            self.create_record(table_name, data)
+            return
+        self.outbox.create(table_name, data, key)
+
+    def queue_update(self, table_name: str, record_id: str, data: Dict, key: str = ''):
+        """Update a record through the outbox, or right away if OUTBOX_ENABLED is off"""
+        if not settings.OUTBOX_ENABLED:
+            self.update_record(table_name, record_id, data)
+            return
+        self.outbox.update(table_name, record_id, data, key)
+
+    def queue_delete(self, table_name: str, record_ids: List[str], key: str = ''):
+        """
+        Delete records through the outbox, or right away in batches if
+        OUTBOX_ENABLED is off
+        """
+        if not settings.OUTBOX_ENABLED:
+            for i in range(0, len(record_ids), AIRTABLE_BATCH_SIZE):
+                self.delete_records(table_name, record_ids[i:i + AIRTABLE_BATCH_SIZE])
+            return
+        for record_id in record_ids:
+            self.outbox.delete(table_name, record_id, key)
+
+    def _reset_id_cache(self):
+        self._record_ids.clear()
+        self._applicant_ids.clear()
+        self._id_cache_started = time.monotonic()
+
+    def _expire_id_cache(self):
+        if time.monotonic() - self._id_cache_started > settings.ID_CACHE_TTL:
+            self._reset_id_cache()
+
+    def _remember_applicants(self, records: List[Dict]):
+        """Cache the ID pairs of Applicants records; expiry is checked once per fill"""
+        self._expire_id_cache()
+        for record in records:
+            applicant_id = record.get('fields', {}).get('Applicant ID')
+            if applicant_id is None or 'id' not in record:
+                continue
+            self._record_ids[str(applicant_id)] = record['id']
+            self._applicant_ids[record['id']] = str(applicant_id)
+
+    def _forget_applicant(self, record_id: str):
+        applicant_id = self._applicant_ids.pop(record_id, None)
+        if applicant_id is not None:
+            self._record_ids.pop(applicant_id, None)
+
+    def warm_id_cache(self):
+        """Load every Applicant ID <-> record ID pair with one projected scan"""
+        self._reset_id_cache()
+        self.get_all_applicants(fields=['Applicant ID'])
+
+    def get_applicant_record_id(self, applicant_id: str) -> Optional[str]:
+        """Resolve an Applicant ID (autonumber) to its Applicants record ID"""
+        self._expire_id_cache()
+        applicant_id = str(applicant_id)
+        if applicant_id not in self._record_ids:
+            self.get_records(
+                settings.APPLICANTS_TABLE,
+                filter_formula=f"{{Applicant ID}} = '{applicant_id}'",
+                fields=['Applicant ID']
+            )
+        return self._record_ids.get(applicant_id)
+
+    def get_applicant_id(self, record_id: str) -> Optional[str]:
+        """Resolve an Applicants record ID to its Applicant ID (autonumber)"""
+        self._expire_id_cache()
+        if record_id not in self._applicant_ids:
+            self.get_record(settings.APPLICANTS_TABLE, record_id)
+        return self._applicant_ids.get(record_id)
+
+    def get_applicant_record(self, applicant_id: str) -> Optional[Dict]:
+        """Fetch the full Applicants record for an Applicant ID"""
+        self._expire_id_cache()
+        record_id = self._record_ids.get(str(applicant_id))
+        if record_id:
+            return self.get_record(settings.APPLICANTS_TABLE, record_id)
+
+        # Unknown ID: one formula query both finds the record and caches its ID
+        records = self.get_records(
+            settings.APPLICANTS_TABLE,
+            filter_formula=f"{{Applicant ID}} = '{applicant_id}'"
+        )
+        return records[0] if records else None
     
+    def list_webhook_payloads(self, webhook_id: str,
+                              cursor: Optional[int] = None) -> Dict:
+        """Fetch one page of change payloads for a webhook, starting at cursor"""
+        params = {'cursor': cursor} if cursor is not None else None
+        return self._make_request('GET', f'webhooks/{webhook_id}/payloads',
+                                  params=params, base_url=self.bases_url)
+
+    def create_webhook(self, notification_url: str, specification: Dict) -> Dict:
+        """Create a webhook on the base; the reply holds its ID and MAC secret"""
+        data = {'notificationUrl': notification_url, 'specification': specification}
+        return self._make_request('POST', 'webhooks', data=data,
+                                  base_url=self.bases_url)
+
     def find_record_by_field(self, table_name: str, field_name: str, field_value: str) -> Optional[Dict]:
         """Find the first record in a table where field_name == field_value"""
         formula = f"{{{field_name}}} = '{field_value}'"
@@ -75,14 +392,11 @@ class AirtableClient:
 
     def get_applicant_data(self, applicant_id: str) -> Dict[str, Any]:
         # Applicant record
-        applicant_records = self.get_records(
-            settings.APPLICANTS_TABLE, 
-            filter_formula=f"{{Applicant ID}} = '{applicant_id}'"
-        )
-        if not applicant_records:
+        applicant_record = self.get_applicant_record(applicant_id)
+        if not applicant_record:
             raise ValueError(f"Applicant with ID {applicant_id} not found")
             
-        applicant_data = applicant_records[0]['fields']
+        applicant_data = applicant_record['fields']
         
         # Linked tables
         personal_details = {}
@@ -115,15 +429,13 @@ class AirtableClient:
         }
 
     def update_applicant_json(self, applicant_id: str, compressed_json: Dict):
-        applicant_records = self.get_records(
-            settings.APPLICANTS_TABLE,
-            filter_formula=f"{{Applicant ID}} = '{applicant_id}'"
-        )
+        record_id = self.get_applicant_record_id(applicant_id)
         
-        if applicant_records:
-            record_id = applicant_records[0]['id']
-            self.update_record(
+        if record_id:
+            self.queue_update(
                 settings.APPLICANTS_TABLE,
                 record_id,
-                {'Compressed JSON': json.dumps(compressed_json)}  # store as JSON string
+                # JSON text, or encoded per JSON_CODEC
+                {'Compressed JSON': encode_json(compressed_json)},
+                key=str(applicant_id)
             )
@@ -0,0 +1,115 @@
+# batch_writer.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from utils.airtable_client import AIRTABLE_BATCH_SIZE, AirtableClient
+
+logger = logging.getLogger(__name__)
+
+# (kind, table, record ID, fields, key); key attributes the result, e.g. to an
+# Applicant ID
+_Op = Tuple[str, str, Optional[str], Optional[Dict[str, Any]], str]
+
+
+class BatchWriter:
+    """
+    Queues creates, updates and deletes and sends them as Airtable batch
+    requests (AIRTABLE_BATCH_SIZE records each) from a thread pool, under the
+    client's rate limit.
+
+    Every operation carries a key, and errors are reported by key. Deletes
+    are sent before everything else, and a key's creates are skipped if any
+    of its deletes failed, so replacing a key's records never leaves both
+    the old and the new ones. The client already retries each request, so
+    a batch that still fails is reported against every key in it.
+    """
+
+    def __init__(self, client: AirtableClient, workers: int = settings.WRITE_WORKERS):
+        self.client = client
+        self.workers = workers
+        self._ops: List[_Op] = []
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def create(self, table_name: str, fields: Dict[str, Any], key: str):
+        self._ops.append(('create', table_name, None, fields, key))
+
+    def update(self, table_name: str, record_id: str, fields: Dict[str, Any], key: str):
+        self._ops.append(('update', table_name, record_id, fields, key))
+
+    def delete(self, table_name: str, record_id: str, key: str):
+        self._ops.append(('delete', table_name, record_id, None, key))
+
+    def _send(self, kind: str, table_name: str, ops: List[_Op]):
+        if kind == 'create':
+            self.client.create_records(table_name,
+                                       [fields for _, _, _, fields, _ in ops])
+        elif kind == 'update':
+            updates = [(record_id, fields) for _, _, record_id, fields, _ in ops]
+            self.client.update_records(table_name, updates)
+        else:
+            self.client.delete_records(table_name,
+                                       [record_id for _, _, record_id, _, _ in ops])
+
+    def _write_batch(self, kind: str, table_name: str,
+                     ops: List[_Op]) -> List[Tuple[str, str]]:
+        try:
+            self._send(kind, table_name, ops)
+            return []
+        except Exception as e:
+            logger.debug(f"Batch {kind} of {len(ops)} records in {table_name} "
+                         f"failed: {e}")
+            return [(key, f"{kind} in {table_name} failed: {e}")
+                    for key in dict.fromkeys(op[4] for op in ops)]
+
+    @staticmethod
+    def _batched(ops: List[_Op]) -> List[Tuple[str, str, List[_Op]]]:
+        grouped: Dict[Tuple[str, str], List[_Op]] = {}
+        for op in ops:
+            grouped.setdefault((op[0], op[1]), []).append(op)
+        return [
+            (kind, table_name, ops[i:i + AIRTABLE_BATCH_SIZE])
+            for (kind, table_name), ops in grouped.items()
+            for i in range(0, len(ops), AIRTABLE_BATCH_SIZE)
+        ]
+
+    def _phases(self) -> Tuple[List[_Op], List[_Op]]:
+        deletes = [op for op in self._ops if op[0] == 'delete']
+        return deletes, [op for op in self._ops if op[0] != 'delete']
+
+    def batches(self) -> List[Tuple[str, str, List[_Op]]]:
+        """The (kind, table, ops) requests flush would send, deletes first"""
+        deletes, writes = self._phases()
+        return self._batched(deletes) + self._batched(writes)
+
+    def clear(self):
+        self._ops = []
+
+    def _write_all(self, pool: ThreadPoolExecutor, ops: List[_Op],
+                   errors: Dict[str, List[str]]):
+        for batch_errors in pool.map(lambda batch: self._write_batch(*batch),
+                                     self._batched(ops)):
+            for key, message in batch_errors:
+                errors.setdefault(key, []).append(message)
+
+    def flush(self) -> Dict[str, List[str]]:
+        """Send everything queued; returns error messages by key"""
+        deletes, writes = self._phases()
+        self.clear()
+        errors: Dict[str, List[str]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            self._write_all(pool, deletes, errors)
+            blocked = set(errors)
+            for kind, table_name, _, _, key in writes:
+                message = (f"create in {table_name} skipped: "
+                           "the records it replaces were not deleted")
+                if kind == 'create' and key in blocked and message not in errors[key]:
+                    errors[key].append(message)
+            allowed = [op for op in writes
+                       if not (op[0] == 'create' and op[4] in blocked)]
+            self._write_all(pool, allowed, errors)
+        return errors
@@ -0,0 +1,84 @@
+# cascade.py
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from utils.criteria import evaluate_criteria, failed_criteria, is_borderline
+
+logger = logging.getLogger(__name__)
+
+# LLM Summary of an applicant the cascade kept from the LLM; no score is stored
+SKIP_PREFIX = "Not sent to LLM"
+
+
+def skip_marker(compressed_json_str: str) -> str:
+    """Skip summary prefix naming the Compressed JSON the decision was made on"""
+    digest = hashlib.sha256(compressed_json_str.encode('utf-8')).hexdigest()[:12]
+    return f"{SKIP_PREFIX} [{digest}]"
+
+
+def is_evaluated(fields: Dict[str, Any]) -> bool:
+    """The applicant has an LLM score; skips stored by older runs as 0 do not count"""
+    summary = str(fields.get('LLM Summary') or '')
+    return fields.get('LLM Score') is not None and not summary.startswith(SKIP_PREFIX)
+
+
+def is_screened_out(fields: Dict[str, Any]) -> bool:
+    """The cascade skipped the applicant and its Compressed JSON is unchanged since"""
+    summary = str(fields.get('LLM Summary') or '')
+    return summary.startswith(skip_marker(fields.get('Compressed JSON') or ''))
+
+
+class EvaluationCascade:
+    """
+    Cheap pre-filter in front of the main LLM evaluation.
+
+    Stage 1 applies the deterministic shortlist rules; clear rejections stop
+    there, borderline ones continue. Stage 2, if a screening model is
+    configured, asks a cheaper model for a score and stops anything below
+    the minimum. Whatever is left is sent to the main model.
+    """
+
+    def __init__(self, screen_model: str = settings.CASCADE_SCREEN_MODEL,
+                 min_screen_score: float = settings.CASCADE_SCREEN_MIN_SCORE,
+                 margin: float = settings.CASCADE_BORDERLINE_MARGIN):
+        self.screen_client = None
+        if screen_model:
+            from utils.llm_client import LLMClient
+            self.screen_client = LLMClient(model=screen_model)
+        self.min_screen_score = min_screen_score
+        self.margin = margin
+        self.skipped: List[Tuple[str, str]] = []
+
+    def skip_reason(self, applicant_id: str,
+                    compressed_json: Dict[str, Any]) -> Optional[str]:
+        """Return why an applicant should not reach the main LLM, or None to send it"""
+        reason = self._check_rules(compressed_json)
+        if reason is None and self.screen_client is not None:
+            reason = self._check_screen(compressed_json)
+
+        if reason is not None:
+            logger.debug(f"Cascade skipped applicant {applicant_id}: {reason}")
+            self.skipped.append((applicant_id, reason))
+        return reason
+
+    def _check_rules(self, compressed_json: Dict[str, Any]) -> Optional[str]:
+        evaluation = evaluate_criteria(compressed_json)
+        failed = failed_criteria(evaluation)
+        if failed and not is_borderline(evaluation, self.margin):
+            return f"Fails rules: {', '.join(failed)}"
+        return None
+
+    def _check_screen(self, compressed_json: Dict[str, Any]) -> Optional[str]:
+        from utils.llm_client import EVALUATION_FAILED
+        screening = self.screen_client.evaluate_applicant(compressed_json)
+        # A failed screening call is no evidence against the applicant
+        if screening.get("summary") == EVALUATION_FAILED:
+            return None
+        score = float(screening.get("score", 0))
+        if score < self.min_screen_score:
+            return (f"Screening score {score:g} < {self.min_screen_score:g} "
+                    f"({self.screen_client.model})")
+        return None
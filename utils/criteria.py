@@ -0,0 +1,62 @@
+# criteria.py
+
+from typing import Any, Dict, List
+
+from config import settings
+from utils.derived import ELIGIBLE_COUNTRIES, get_derived
+from utils.profiling import timed
+
+CRITERIA = ("meets_experience", "meets_compensation", "eligible_location",
+            "meets_availability")
+
+
+@timed('evaluate_rules')
+def evaluate_criteria(compressed_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply the deterministic shortlist criteria to a compressed JSON object,
+    using its precomputed derived section (see utils.derived).
+    """
+    derived = get_derived(compressed_json)
+    years_experience = derived["total_years"]
+
+    salary_info = compressed_json.get("salary", {})
+    # Rates in a currency without a configured exchange rate are taken as USD
+    preferred_rate = derived["rate_usd"]
+    if preferred_rate is None:
+        preferred_rate = salary_info.get("preferred_rate") or 0
+    availability = salary_info.get("availability") or 0
+
+    return {
+        "total_experience": years_experience,
+        "preferred_rate": preferred_rate,
+        "availability": availability,
+        "tier_1": derived["tier_1"],
+        "meets_experience": years_experience >= settings.MIN_EXPERIENCE,
+        "meets_compensation": preferred_rate <= settings.MAX_HOURLY_RATE,
+        "eligible_location": derived["location"] in ELIGIBLE_COUNTRIES,
+        "meets_availability": availability >= settings.MIN_AVAILABILITY,
+    }
+
+
+def failed_criteria(evaluation: Dict[str, Any]) -> List[str]:
+    """Names of the criteria an evaluation does not meet"""
+    return [name for name in CRITERIA if not evaluation[name]]
+
+
+def is_borderline(evaluation: Dict[str, Any],
+                  margin: float = settings.CASCADE_BORDERLINE_MARGIN) -> bool:
+    """
+    True if exactly one numeric criterion fails, and only by less than margin
+    (a fraction of its threshold). Location failures are never borderline.
+    """
+    failed = failed_criteria(evaluation)
+    if len(failed) != 1:
+        return False
+
+    if failed[0] == "meets_experience":
+        return evaluation["total_experience"] >= settings.MIN_EXPERIENCE * (1 - margin)
+    if failed[0] == "meets_compensation":
+        return evaluation["preferred_rate"] <= settings.MAX_HOURLY_RATE * (1 + margin)
+    if failed[0] == "meets_availability":
+        return evaluation["availability"] >= settings.MIN_AVAILABILITY * (1 - margin)
+    return False
@@ -0,0 +1,218 @@
+# dedup.py
+
+import hashlib
+import json
+import logging
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+import numpy as np
+
+from config import settings
+from utils.cascade import is_evaluated
+from utils.json_codec import decode_json
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def canonical_hash(compressed_json: Dict[str, Any]) -> str:
+    """Hash of the compressed JSON with case, whitespace and key order normalized"""
+    # derived values depend on the day they were computed, not on the application
+    content = {key: value for key, value in compressed_json.items() if key != "derived"}
+    canonical = json.dumps(_normalize(content), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def shingles(compressed_json: Dict[str, Any]) -> Set[str]:
+    """
+    Features used for near-duplicate matching: name/email character
+    trigrams (robust to typos) plus company and title tokens.
+    """
+    personal = compressed_json.get("personal", {})
+    features: Set[str] = set()
+
+    for field in ("full_name", "email"):
+        text = " ".join(_TOKEN_RE.findall((personal.get(field) or "").lower()))
+        features.update(f"{field}:{text[i:i + 3]}"
+                        for i in range(max(len(text) - 2, 0)))
+
+    for exp in compressed_json.get("experience", []):
+        for field in ("company", "title"):
+            tokens = _TOKEN_RE.findall((exp.get(field) or "").lower())
+            features.update(f"{field}:{token}" for token in tokens)
+
+    return features
+
+
+class MinHasher:
+    """
+    MinHash signatures with LSH banding, so candidate pairs come from shared
+    buckets instead of comparing every pair of applicants.
+    """
+
+    def __init__(self, num_perm: int = settings.DEDUP_NUM_PERM,
+                 bands: int = settings.DEDUP_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        crcs = [zlib.crc32(f.encode("utf-8")) for f in features]
+        hashes = np.array(crcs, dtype=np.uint64) % _MERSENNE_PRIME
+        # (shingles x permutations) table of a*x+b mod p, min over shingles
+        return ((np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME).min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            bytes([band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+
+    def find(self, key: Hashable) -> Hashable:
+        self.parent.setdefault(key, key)
+        while self.parent[key] != key:
+            self.parent[key] = self.parent[self.parent[key]]
+            key = self.parent[key]
+        return key
+
+    def union(self, a: Hashable, b: Hashable):
+        self.parent[self.find(a)] = self.find(b)
+
+
+def _exact_representatives(applicants: Dict[Hashable, Dict[str, Any]],
+                           groups: _UnionFind) -> List[Hashable]:
+    """Union applicants sharing a canonical hash; one representative key per hash"""
+    representatives: Dict[str, Hashable] = {}
+    for key, compressed_json in applicants.items():
+        digest = canonical_hash(compressed_json)
+        if digest in representatives:
+            groups.union(key, representatives[digest])
+        else:
+            representatives[digest] = key
+            groups.find(key)
+    return list(representatives.values())
+
+
+def _lsh_buckets(signatures: Dict[Hashable, np.ndarray],
+                 hasher: Any) -> List[List[Hashable]]:
+    """Keys sharing at least one LSH band, per bucket"""
+    buckets: Dict[bytes, List[Hashable]] = defaultdict(list)
+    for key, signature in signatures.items():
+        for band_key in hasher.band_keys(signature):
+            buckets[band_key].append(key)
+    return [members for members in buckets.values() if len(members) > 1]
+
+
+def _merge_similar(buckets: List[List[Hashable]],
+                   signatures: Dict[Hashable, np.ndarray],
+                   groups: _UnionFind, threshold: float):
+    """Union bucket members whose estimated Jaccard similarity reaches threshold"""
+    for members in buckets:
+        for i, first in enumerate(members):
+            for other in members[i + 1:]:
+                if groups.find(first) == groups.find(other):
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    groups.union(first, other)
+
+
+def group_duplicates(applicants: Dict[Hashable, Dict[str, Any]],
+                     threshold: float = settings.DEDUP_THRESHOLD,
+                     hasher: Any = None) -> List[List[Hashable]]:
+    """
+    Group applicants (key -> compressed JSON) that are exact or likely duplicates.
+
+    Exact duplicates share a canonical hash. One representative per hash is
+    then MinHashed; pairs sharing an LSH bucket are merged when their
+    estimated Jaccard similarity reaches threshold. Only groups with more
+    than one member are returned.
+    """
+    hasher = hasher or MinHasher()
+    groups = _UnionFind()
+
+    signatures = {}
+    for key in _exact_representatives(applicants, groups):
+        features = shingles(applicants[key])
+        # Records with nothing to compare on would all share one bucket
+        if features:
+            signatures[key] = hasher.signature(features)
+    _merge_similar(_lsh_buckets(signatures, hasher), signatures, groups, threshold)
+
+    grouped: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    for key in applicants:
+        grouped[groups.find(key)].append(key)
+
+    duplicates = [members for members in grouped.values() if len(members) > 1]
+    logger.debug(f"Found {len(duplicates)} duplicate groups "
+                 f"among {len(applicants)} applicants")
+    return duplicates
+
+
+class DuplicateIndex:
+    """
+    Duplicate groups over a list of Applicants records, and the LLM
+    evaluation each group can share.
+    """
+
+    EVALUATION_FIELDS = ('LLM Summary', 'LLM Score', 'LLM Follow-Ups')
+
+    def __init__(self, applicants: List[Dict[str, Any]]):
+        parsed = {}
+        for applicant in applicants:
+            try:
+                parsed[applicant['id']] = decode_json(
+                    applicant['fields']['Compressed JSON'])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        self.group_of: Dict[str, int] = {}
+        for index, members in enumerate(group_duplicates(parsed)):
+            for record_id in members:
+                self.group_of[record_id] = index
+        self.groups = len(set(self.group_of.values()))
+
+        # Seed groups with LLM evaluations that already exist in the base; a
+        # cascade skip is no evaluation, and each duplicate is screened itself
+        self.results: Dict[int, Dict[str, Any]] = {}
+        for applicant in applicants:
+            fields = applicant.get('fields', {})
+            if applicant['id'] in self.group_of and is_evaluated(fields):
+                self.store(applicant['id'],
+                           {f: fields.get(f) for f in self.EVALUATION_FIELDS},
+                           fields.get('Applicant ID'))
+
+    def reusable(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Evaluation already produced for a duplicate of this record, if any"""
+        group = self.group_of.get(record_id)
+        return self.results.get(group) if group is not None else None
+
+    def store(self, record_id: str, payload: Dict[str, Any], applicant_id: Any):
+        group = self.group_of.get(record_id)
+        if group is not None and group not in self.results:
+            self.results[group] = {'payload': payload, 'source': applicant_id}
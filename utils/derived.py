@@ -0,0 +1,172 @@
+# derived.py
+
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import settings
+
+# Bump when a derived value changes meaning; older sections are recomputed
+DERIVED_VERSION = 2
+
+# Spellings that name the same country; anything else is kept as written
+_COUNTRY_ALIASES = {
+    "us": "United States",
+    "usa": "United States",
+    "united states": "United States",
+    "united states of america": "United States",
+    "uk": "United Kingdom",
+    "united kingdom": "United Kingdom",
+    "great britain": "United Kingdom",
+}
+
+
+# Configured spellings of the eligible locations, by lowercase name
+_CONFIGURED_LOCATIONS = {loc.strip().lower(): loc.strip()
+                         for loc in settings.ELIGIBLE_LOCATIONS}
+
+
+def canonical_location(name: str) -> str:
+    """
+    One spelling per country whatever the case: an alias target, the
+    configured spelling, or the text as written
+    """
+    key = name.strip().lower()
+    return _COUNTRY_ALIASES.get(key) or _CONFIGURED_LOCATIONS.get(key) or name.strip()
+
+
+_KNOWN_LOCATIONS = sorted(
+    set(_COUNTRY_ALIASES) | {loc.lower() for loc in settings.ELIGIBLE_LOCATIONS},
+    key=len, reverse=True)
+# Whole words only, so "US" does not match "Australia"
+_LOCATION_RE = re.compile(
+    r"\b(" + "|".join(re.escape(loc) for loc in _KNOWN_LOCATIONS) + r")\b",
+    re.IGNORECASE)
+
+ELIGIBLE_COUNTRIES = {canonical_location(loc) for loc in settings.ELIGIBLE_LOCATIONS}
+
+
+def normalize_location(location: Optional[str]) -> Optional[str]:
+    """
+    Country named in a free-text location, canonically spelled; the trimmed
+    text if none is recognised
+    """
+    if not location or not location.strip():
+        return None
+    match = _LOCATION_RE.search(location)
+    if match:
+        return canonical_location(match.group(1))
+    return location.strip()
+
+
+def _currency(salary: Dict[str, Any]) -> str:
+    currency = salary.get("currency") or "USD"
+    if isinstance(currency, list):  # multiple-select fields come back as lists
+        currency = currency[0] if currency else "USD"
+    return str(currency).strip().upper()
+
+
+def _to_days(values: Sequence[Optional[str]]) -> np.ndarray:
+    """ISO dates ('YYYY-MM-DD' or 'YYYY-MM') as day numbers; NaT if missing or bad"""
+    try:
+        return np.array([v or "NaT" for v in values], dtype="datetime64[D]")
+    except ValueError:
+        parsed = []
+        for v in values:
+            try:
+                parsed.append(np.datetime64(v or "NaT", "D"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT"))
+        return np.array(parsed, dtype="datetime64[D]")
+
+
+def total_years(owners: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                count: int) -> np.ndarray:
+    """
+    Years covered by each owner's jobs, with overlapping ranges merged.
+
+    owners holds the applicant index of every job. Jobs are sorted by
+    (owner, start) and shifted so that each owner's days lie far above the
+    previous owner's; a running maximum of end dates then never crosses
+    owners, and each job only adds the days past the furthest end so far.
+    """
+    if not len(owners):
+        return np.zeros(count)
+    span = int((ends.max() - starts.min()).astype(int)) + 1
+    offset = owners.astype(np.int64) * span
+    start = starts.astype(np.int64) + offset
+    end = ends.astype(np.int64) + offset
+
+    order = np.lexsort((start, owners))
+    start, end, owners = start[order], end[order], owners[order]
+
+    reached = np.maximum.accumulate(end)
+    previous = np.concatenate(([np.iinfo(np.int64).min], reached[:-1]))
+    covered = np.maximum(end - np.maximum(start, previous), 0)
+
+    days = np.zeros(count)
+    np.add.at(days, owners, covered)
+    return days / 365.25
+
+
+def derive_features(compressed_jsons: Sequence[Dict[str, Any]],
+                    today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Derived section for each compressed JSON, computed in one pass over all
+    jobs: merged years of experience, tier-1 employer, country and rate in USD.
+    Jobs without an end date run until today; jobs without a start are ignored.
+    """
+    count = len(compressed_jsons)
+    jobs = [(i, exp) for i, cj in enumerate(compressed_jsons)
+            for exp in cj.get("experience") or []]
+    owners = np.array([i for i, _ in jobs], dtype=np.int64)
+
+    starts = _to_days([exp.get("start") for _, exp in jobs])
+    ends = _to_days([exp.get("end") for _, exp in jobs])
+    ends = np.where(np.isnat(ends), np.datetime64(today or date.today(), "D"), ends)
+    dated = ~np.isnat(starts) & (ends >= starts)
+    years = total_years(owners[dated], starts[dated], ends[dated], count)
+
+    tier_1 = np.zeros(count, dtype=bool)
+    companies = np.array([(exp.get("company") or "").strip().lower()
+                          for _, exp in jobs], dtype=object)
+    if len(jobs):
+        tier_1_names = [c.strip().lower() for c in settings.TIER_1_COMPANIES]
+        tier_1[owners[np.isin(companies, tier_1_names)]] = True
+
+    salaries = [cj.get("salary") or {} for cj in compressed_jsons]
+    rates = np.array([s.get("preferred_rate") if s.get("preferred_rate") is not None
+                      else np.nan for s in salaries], dtype=float)
+    factors = np.array([settings.USD_EXCHANGE_RATES.get(_currency(s), np.nan)
+                        for s in salaries], dtype=float)
+    rates_usd = np.round(rates * factors, 2)
+
+    return [
+        {
+            "version": DERIVED_VERSION,
+            "total_years": round(float(years[i]), 2),
+            "tier_1": bool(tier_1[i]),
+            "location": normalize_location((cj.get("personal") or {}).get("location")),
+            "rate_usd": None if np.isnan(rates_usd[i]) else float(rates_usd[i]),
+        }
+        for i, cj in enumerate(compressed_jsons)
+    ]
+
+
+def add_derived(compressed_jsons: Sequence[Dict[str, Any]]) -> int:
+    """Fill in missing or outdated derived sections in place; returns how many"""
+    stale = [cj for cj in compressed_jsons
+             if (cj.get("derived") or {}).get("version") != DERIVED_VERSION]
+    for cj, derived in zip(stale, derive_features(stale)):
+        cj["derived"] = derived
+    return len(stale)
+
+
+def get_derived(compressed_json: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored derived section, or one computed now for JSON stored before it"""
+    derived = compressed_json.get("derived") or {}
+    if derived.get("version") == DERIVED_VERSION:
+        return derived
+    return derive_features([compressed_json])[0]
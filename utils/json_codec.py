@@ -0,0 +1,166 @@
+# json_codec.py
+
+import base64
+import glob
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from utils.profiling import timed
+
+CODECS = ('json', 'deflate', 'zstd')
+
+# Encoded values look like "cj1:<codec>:<dictionary id or ->:<base64>"; plain
+# JSON starts with "{"
+_MAGIC = 'cj1'
+_NO_DICTIONARY = '-'
+
+# Deflate can only refer back 32 KiB, so a longer dictionary is wasted
+_DEFLATE_DICT_SIZE = 32 * 1024
+
+_dictionaries: Dict[str, bytes] = {}
+# Every dictionary read so far by dictionary_id, so values written with an
+# earlier one still decode after JSON_CODEC_DICTIONARY moves on
+_registry: Dict[str, bytes] = {}
+_loaded_dirs: Set[str] = set()
+
+
+def dictionary_id(dictionary: bytes) -> str:
+    return f"{zlib.crc32(dictionary):08x}"
+
+
+def load_dictionary(path: Optional[str] = None) -> Optional[bytes]:
+    """Read the shared dictionary (JSON_CODEC_DICTIONARY) once; None if unset"""
+    path = path if path is not None else settings.JSON_CODEC_DICTIONARY
+    if not path:
+        return None
+    if path not in _dictionaries:
+        with open(path, 'rb') as f:
+            _dictionaries[path] = f.read()
+        _registry[dictionary_id(_dictionaries[path])] = _dictionaries[path]
+    return _dictionaries[path]
+
+
+def load_dictionaries(directory: Optional[str] = None) -> Dict[str, bytes]:
+    """Read every *.dict in JSON_CODEC_DICTIONARY_DIR once; dictionaries by ID"""
+    if directory is None:
+        directory = settings.JSON_CODEC_DICTIONARY_DIR
+    if directory and directory not in _loaded_dirs:
+        for path in sorted(glob.glob(os.path.join(directory, '*.dict'))):
+            load_dictionary(path)
+        _loaded_dirs.add(directory)
+    return _registry
+
+
+def find_dictionary(dict_name: str) -> Optional[bytes]:
+    """The current or any retired dictionary with this ID; None if none is known"""
+    load_dictionary()
+    return load_dictionaries().get(dict_name)
+
+
+def _zstd():
+    # Optional dependency, only needed for the zstd codec
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The zstd codec needs the zstandard package: "
+                          "pip install zstandard") from None
+    return zstandard
+
+
+def is_encoded(text: str) -> bool:
+    return text.startswith(_MAGIC + ':')
+
+
+@timed('encode')
+def encode_json(value: Dict[str, Any], codec: str = settings.JSON_CODEC,
+                dictionary: Optional[bytes] = None) -> str:
+    """
+    Serialize value for the Compressed JSON field: plain JSON, or deflate/zstd
+    bytes in base64 behind a version header. The shared dictionary, if any,
+    is named in the header so readers can check they hold the same one.
+    """
+    if codec not in CODECS:
+        raise ValueError(
+            f"Unknown JSON codec {codec}, expected one of {', '.join(CODECS)}")
+    text = json.dumps(value, separators=(',', ':') if codec != 'json' else None)
+    if codec == 'json':
+        return text
+
+    dictionary = dictionary if dictionary is not None else load_dictionary()
+    raw = text.encode('utf-8')
+    if codec == 'deflate':
+        if dictionary:
+            compressor = zlib.compressobj(settings.JSON_CODEC_LEVEL, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(settings.JSON_CODEC_LEVEL)
+        packed = compressor.compress(raw) + compressor.flush()
+    else:
+        zstandard = _zstd()
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        packed = zstandard.ZstdCompressor(level=settings.JSON_CODEC_LEVEL,
+                                          dict_data=dict_data).compress(raw)
+
+    dict_name = dictionary_id(dictionary) if dictionary else _NO_DICTIONARY
+    return f"{_MAGIC}:{codec}:{dict_name}:{base64.b64encode(packed).decode('ascii')}"
+
+
+@timed('decode')
+def decode_json(text: str, dictionary: Optional[bytes] = None) -> Dict[str, Any]:
+    """Parse a Compressed JSON value in any supported format; ValueError if corrupt"""
+    if not is_encoded(text):
+        return json.loads(text)
+
+    parts = text.split(':', 3)
+    if len(parts) != 4:
+        raise ValueError(f"Malformed Compressed JSON header {text[:40]!r}")
+    _, codec, dict_name, payload = parts
+    if dict_name != _NO_DICTIONARY:
+        if dictionary is None or dictionary_id(dictionary) != dict_name:
+            dictionary = find_dictionary(dict_name)
+        if dictionary is None:
+            raise ValueError(f"Compressed JSON needs dictionary {dict_name}; "
+                             f"add it to JSON_CODEC_DICTIONARY_DIR")
+    else:
+        dictionary = None
+
+    # Corrupt base64 raises binascii.Error, already a ValueError; the decompressors'
+    # own errors are turned into one so callers catch a single type
+    packed = base64.b64decode(payload)
+    if codec == 'deflate':
+        if dictionary:
+            decompressor = zlib.decompressobj(zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj()
+        try:
+            raw = decompressor.decompress(packed) + decompressor.flush()
+        except zlib.error as e:
+            raise ValueError(f"Corrupt deflate Compressed JSON: {e}") from e
+    elif codec == 'zstd':
+        zstandard = _zstd()
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        try:
+            raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(packed)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt zstd Compressed JSON: {e}") from e
+    else:
+        raise ValueError(f"Unknown JSON codec {codec}")
+    return json.loads(raw)
+
+
+def train_dictionary(samples: List[Dict[str, Any]], codec: str,
+                     size: int = 16 * 1024) -> bytes:
+    """
+    Build a shared dictionary from sample records. zstd trains one; for
+    deflate the samples themselves are the dictionary, common key names and
+    values included, ending with the most recent ones within its window.
+    """
+    encoded = [json.dumps(sample, separators=(',', ':')).encode('utf-8')
+               for sample in samples]
+    if codec == 'zstd':
+        return _zstd().train_dictionary(size, encoded).as_bytes()
+    if codec == 'deflate':
+        return b''.join(encoded)[-min(size, _DEFLATE_DICT_SIZE):]
+    raise ValueError(f"No dictionary for codec {codec}")
@@ -1,59 +1,129 @@
 # llm_client.py
 
-import os
 import logging
 import json
-from openai import OpenAI
+import os
+from typing import Dict, Optional, Sequence
+
+from config import settings
+from utils.llm_providers import LLMProvider, ProviderRouter, build_provider
+from utils.profiling import span, timed
+from utils.rate_limiter import SharedQuota
 
 logger = logging.getLogger(__name__)
 
+# Optional budget of evaluate_applicant calls (see SharedQuota), shared across processes
+_call_quota = None
+# Set when the quota came from set_call_quota (a process pool's), which runs keep
+_call_quota_shared = False
 
-class LLMClient:
-    """
-    Wrapper around OpenAI GPT-4o for evaluating applicants.
-    """
+# Summary of the reply returned when no attempt gave a usable evaluation
+EVALUATION_FAILED = "Evaluation failed"
 
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = "gpt-4o"
-        logger.debug(f"Initializing LLMClient with OpenAI model: {self.model}")
+# Allowance for the summary, score and follow-ups in an evaluation reply
+REPLY_TOKENS = 300
 
-    def evaluate_applicant(self, applicant: dict) -> dict:
-        """
-        Send applicant data to GPT-4o and return structured evaluation.
-        """
 
-        logger.debug(f"Starting evaluation for applicant: {applicant.get('id', 'unknown')}")
-        logger.debug(f"Applicant data: {applicant}")
+class LLMQuotaExceeded(Exception):
+    """Raised when the LLM call budget for this run is spent"""
+
+
+def set_call_quota(quota):
+    global _call_quota, _call_quota_shared
+    _call_quota, _call_quota_shared = quota, True
+
+
+def start_call_quota():
+    """Start a fresh LLM_MAX_CALLS budget for a run, unless a pool's quota is set"""
+    global _call_quota
+    if not _call_quota_shared:
+        _call_quota = None
+        if settings.LLM_MAX_CALLS:
+            _call_quota = SharedQuota(settings.LLM_MAX_CALLS)
+
+
+def load_latency(path: str = settings.LLM_LATENCY_FILE) -> Dict[str, float]:
+    """Median latency per provider label saved by earlier runs"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class LLMClient:
+    """
+    Evaluates applicants through one or more LLM providers (see llm_providers).
+    """
 
-        # Build prompt
-        prompt = f"""
+    def __init__(self, model: Optional[str] = None,
+                 providers: Optional[Sequence[LLMProvider]] = None):
+        if providers is None:
+            specs = [model] if model else [spec for spec in settings.LLM_PROVIDERS
+                                           if spec] or ["openai"]
+            providers = [build_provider(spec) for spec in specs]
+        self.router = ProviderRouter(providers)
+        if _call_quota is None:
+            start_call_quota()
+        self.model = ", ".join(provider.label for provider in self.router.providers)
+        logger.debug(f"Initializing LLMClient with providers: {self.model}")
+
+    @staticmethod
+    @timed('build_prompt')
+    def build_prompt(applicant: dict) -> str:
+        return f"""
 You are a recruiter AI. Evaluate the following applicant:
 
 {json.dumps(applicant, indent=2)}
 
+The "derived" values are precomputed, use them as given: total_years (overlapping jobs
+merged), tier_1 (worked at a tier-1 company), location (country) and rate_usd.
+
 Return ONLY a JSON object with the following fields:
 - summary: A 2-3 sentence summary of the applicant
 - score: A number from 0 to 100 evaluating applicant quality
 - follow_ups: Suggested follow-up questions
 """
+
+    @classmethod
+    def estimate_tokens(cls, applicant: dict) -> int:
+        """Rough token cost of one evaluation: ~4 characters per token plus the reply"""
+        return len(cls.build_prompt(applicant)) // 4 + REPLY_TOKENS
+
+    def save_latency(self, path: str = settings.LLM_LATENCY_FILE):
+        """Keep each provider's median latency for run estimates (see utils.planner)"""
+        measured = {
+            label: stats.percentile(50) for label, stats in self.router.stats.items()
+            if stats.percentile(50) is not None
+        }
+        if not path or not measured:
+            return
+        latencies = load_latency(path)
+        latencies.update(measured)
+        with open(path, 'w') as f:
+            json.dump(latencies, f, indent=2)
+
+    def evaluate_applicant(self, applicant: dict) -> dict:
+        """
+        Send applicant data to the LLM and return structured evaluation.
+        """
+
+        quota = _call_quota
+        if quota is not None and not quota.take():
+            raise LLMQuotaExceeded(f"LLM call budget of {quota.limit} reached")
+
+        logger.debug(f"Starting evaluation for applicant: {applicant.get('id', 'unknown')}")
+        logger.debug(f"Applicant data: {applicant}")
+
+        prompt = self.build_prompt(applicant)
         logger.debug(f"Built prompt ({len(prompt)} chars): {prompt[:200]}...")
 
         # Query LLM with retries
         for attempt in range(3):
             try:
-                logger.debug(f"Attempt {attempt+1}/3 - Sending to OpenAI...")
-
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful recruiter AI."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.2,
-                )
-
-                reply = response.choices[0].message.content.strip()
+                logger.debug(f"Attempt {attempt+1}/3 - Sending to {self.model}...")
+
+                reply = self.router.complete("You are a helpful recruiter AI.",
+                                             prompt).strip()
                 logger.debug(f"Raw LLM reply: {reply}")
 
                 # Clean Markdown fences if present
@@ -64,7 +134,8 @@ Return ONLY a JSON object with the following fields:
 
                 # Try parsing JSON
                 try:
-                    parsed = json.loads(reply)
+                    with span('parse_reply'):
+                        parsed = json.loads(reply)
                     logger.debug(f"Parsed JSON: {parsed}")
 
                     return {
@@ -74,21 +145,18 @@ Return ONLY a JSON object with the following fields:
                     }
 
                 except Exception as e:
+                    # An unreadable reply is no evaluation, so it is asked again
                     logger.error(f"Failed to parse LLM reply as JSON: {e}")
-                    logger.debug(f"Returning fallback with raw reply.")
-                    return {
-                        "summary": reply,
-                        "score": 0.0,
-                        "follow_ups": "",
-                    }
 
             except Exception as e:
                 logger.error(f"Error on attempt {attempt+1}: {e}")
 
-        # If all attempts fail
+        # If all attempts fail; a call with no usable reply is not charged to the budget
         logger.error("All attempts failed, returning fallback response")
+        if quota is not None:
+            quota.release()
         return {
-            "summary": "Evaluation failed",
+            "summary": EVALUATION_FAILED,
             "score": 0.0,
             "follow_ups": "",
         }
@@ -0,0 +1,299 @@
+# llm_providers.py
+
+import abc
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Optional, Sequence
+
+from config import settings
+from utils.profiling import span
+
+logger = logging.getLogger(__name__)
+
+# Hedged calls in flight across all routers, losers still finishing included
+HEDGE_WORKERS = 8
+
+# Shared by every router, so clients built per run do not each leave a pool behind
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS,
+                                                 thread_name_prefix='llm-hedge')
+        return _hedge_executor
+
+
+class LLMProvider(abc.ABC):
+    """
+    One chat-completion backend. Subclasses implement complete().
+    """
+
+    name = "base"
+    default_model = ""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or self.default_model
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+    @abc.abstractmethod
+    def complete(self, system: str, prompt: str) -> str:
+        """Return the reply text for one system + user prompt"""
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    default_model = "gpt-4o"
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__(model)
+        from openai import OpenAI
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    def complete(self, system: str, prompt: str) -> str:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.2,
+        )
+        return response.choices[0].message.content
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+    default_model = "claude-3-5-sonnet-latest"
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__(model)
+        from anthropic import Anthropic
+        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+
+    def complete(self, system: str, prompt: str) -> str:
+        response = self.client.messages.create(
+            model=self.model,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=1024,
+            temperature=0.2,
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+    default_model = "gemini-1.5-pro"
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__(model)
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self._genai = genai
+
+    def complete(self, system: str, prompt: str) -> str:
+        model = self._genai.GenerativeModel(self.model, system_instruction=system)
+        response = model.generate_content(prompt,
+                                          generation_config={"temperature": 0.2})
+        return response.text
+
+
+class StubProvider(LLMProvider):
+    """
+    Offline provider for tests and dry runs. Returns a fixed evaluation after
+    an optional delay, and can be told to fail every n-th call.
+    """
+
+    name = "stub"
+    default_model = "stub"
+
+    def __init__(self, model: Optional[str] = None, latency: float = 0.0,
+                 fail_every: int = 0, score: float = 50.0):
+        super().__init__(model)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.score = score
+        self.calls = 0
+
+    def complete(self, system: str, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError(f"Stub provider failure on call {self.calls}")
+        return json.dumps({
+            "summary": "Stub evaluation",
+            "score": self.score,
+            "follow_ups": ["Stub follow-up question?"],
+        })
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (OpenAIProvider, AnthropicProvider, GeminiProvider, StubProvider)
+}
+
+
+def build_provider(spec: str) -> LLMProvider:
+    """
+    Build a provider from "name", "name:model" or a bare OpenAI model name
+    (e.g. "gpt-4o-mini").
+    """
+    spec = spec.strip()
+    name, _, model = spec.partition(":")
+    if name not in PROVIDERS:
+        name, model = "openai", spec
+    return PROVIDERS[name](model or None)
+
+
+class ProviderStats:
+    """Rolling latency and error record for one provider"""
+
+    def __init__(self, window: int = settings.LLM_STATS_WINDOW):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latencies.append(latency)
+            self.outcomes.append(ok)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+
+class ProviderRouter:
+    """
+    Sends each completion to the provider with the best recent latency and
+    error rate, failing over to the next one on error.
+
+    With hedging on, if the chosen provider has not answered by its own
+    LLM_HEDGE_PERCENTILE latency, the same request goes to the runner-up and
+    the first successful reply wins. The SDK calls are blocking, so the
+    losing request cannot be interrupted; it is left to finish in the
+    background and its result is discarded.
+    """
+
+    def __init__(self, providers: Sequence[LLMProvider],
+                 hedge: bool = settings.LLM_HEDGE,
+                 hedge_percentile: float = settings.LLM_HEDGE_PERCENTILE):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = list(providers)
+        self.stats: Dict[str, ProviderStats] = {p.label: ProviderStats()
+                                                for p in self.providers}
+        self.hedge = hedge and len(self.providers) > 1
+        self.hedge_percentile = hedge_percentile
+
+    def ranked(self) -> List[LLMProvider]:
+        """Providers ordered best first; unmeasured ones are tried first"""
+        def cost(provider: LLMProvider) -> float:
+            stats = self.stats[provider.label]
+            if not stats.samples:
+                return 0.0
+            p95 = stats.percentile(95)
+            if p95 is None:
+                return float("inf")  # has only ever failed
+            # Expected time until a success if failures are retried elsewhere
+            return p95 / max(1.0 - stats.error_rate, 0.05)
+
+        return sorted(self.providers, key=cost)
+
+    def expected_latency(self) -> Optional[float]:
+        """p95 latency of the provider that would be tried first, if measured"""
+        return self.stats[self.ranked()[0].label].percentile(95)
+
+    def _timed_call(self, provider: LLMProvider, system: str, prompt: str) -> str:
+        started = time.monotonic()
+        try:
+            with span('llm_call'):
+                reply = provider.complete(system, prompt)
+        except Exception:
+            self.stats[provider.label].record(time.monotonic() - started, ok=False)
+            raise
+        self.stats[provider.label].record(time.monotonic() - started, ok=True)
+        return reply
+
+    def complete(self, system: str, prompt: str) -> str:
+        ranked = self.ranked()
+        if self.hedge:
+            return self._hedged(ranked, system, prompt)
+
+        last_error: Optional[Exception] = None
+        for provider in ranked:
+            try:
+                return self._timed_call(provider, system, prompt)
+            except Exception as e:
+                logger.error(f"Provider {provider.label} failed: {e}")
+                last_error = e
+        raise RuntimeError(f"All LLM providers failed: {last_error}")
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        stats = self.stats[provider.label]
+        delay = stats.percentile(self.hedge_percentile)
+        if delay is None or stats.samples < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DELAY
+        return delay
+
+    def _hedged(self, ranked: List[LLMProvider], system: str, prompt: str) -> str:
+        executor = _hedge_pool()
+        primary = executor.submit(self._timed_call, ranked[0], system, prompt)
+        pending = {primary: ranked[0]}
+        backups = ranked[1:]
+        timeout: Optional[float] = self._hedge_delay(ranked[0])
+        last_error: Optional[Exception] = None
+
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    reply = future.result()
+                except Exception as e:
+                    logger.error(f"Provider {provider.label} failed: {e}")
+                    last_error = e
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                return reply
+
+            # Primary is slow (timed out) or everything in flight failed
+            if backups and (not done or not pending):
+                backup = backups.pop(0)
+                logger.debug(f"Hedging request to {backup.label}")
+                hedged = executor.submit(self._timed_call, backup, system, prompt)
+                pending[hedged] = backup
+            if not backups:
+                timeout = None
+
+        raise RuntimeError(f"All LLM providers failed: {last_error}")
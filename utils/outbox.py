@@ -0,0 +1,310 @@
+# outbox.py
+
+import atexit
+import functools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from utils.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+# Entries claimed per flush round
+FLUSH_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    base_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    record_id TEXT,
+    fields TEXT NOT NULL,
+    key TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_try REAL NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_record ON outbox (base_id, table_name, record_id);
+"""
+
+# Outboxes of this process, drained when the outermost stage returns and at exit
+_open = weakref.WeakSet()
+# Stages open per thread, so concurrent stages each drain when they return
+_stages = threading.local()
+
+
+class Outbox:
+    """
+    Durable queue of Airtable creates, updates and deletes in a SQLite file
+    (OUTBOX_FILE). Stages append instead of writing, and a background thread
+    sends the entries as batch requests under the client's rate limit.
+
+    Updates to a record that is still queued are merged into one PATCH, the
+    later value winning per field, and a queued delete drops them. Sent
+    entries are removed from the queue; failed ones stay
+    and are retried with backoff up to OUTBOX_MAX_ATTEMPTS times. An entry is
+    claimed before it is sent, and a claim older than OUTBOX_CLAIM_TIMEOUT
+    counts as abandoned, so writes left by a crashed run (or a dead pool
+    worker sharing the file) are picked up by the next one. Abandoned updates
+    and deletes are replayed (a delete that already went through then fails
+    as not found); abandoned creates may already exist, so they are parked
+    with the failed entries instead.
+    """
+
+    ABANDONED_CREATE = (
+        'claimed by a run that stopped before recording the result, so the record may '
+        'already exist; check, then requeue with `python -m scripts outbox --retry`')
+
+    def __init__(self, client, path: str = settings.OUTBOX_FILE,
+                 interval: float = settings.OUTBOX_FLUSH_INTERVAL):
+        self.client = client
+        self.path = path
+        self.interval = interval
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.errors: Dict[str, List[str]] = {}
+        _open.add(self)
+
+        leftover = self.pending()
+        if leftover:
+            logger.info(f"Replaying {leftover} unflushed Airtable writes from {path}")
+            self._start()
+
+    def _execute(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    @contextmanager
+    def _write(self):
+        """One write transaction under SQLite's write lock, so others see it whole"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def create(self, table_name: str, fields: Dict[str, Any], key: str = ''):
+        self._execute(
+            'INSERT INTO outbox (base_id, kind, table_name, fields, key)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (self.client.base_id, 'create', table_name, json.dumps(fields), key),
+        )
+        self._start()
+
+    def update(self, table_name: str, record_id: str, fields: Dict[str, Any],
+               key: str = ''):
+        """Queue an update, folding in the record's queued updates not yet sent"""
+        match = (self.client.base_id, table_name, record_id)
+        where = ("base_id = ? AND kind = 'update' AND table_name = ? AND record_id = ? "
+                 "AND claimed_at IS NULL")
+        with self._write() as db:
+            merged: Dict[str, Any] = {}
+            queued_rows = db.execute(
+                f'SELECT fields FROM outbox WHERE {where} ORDER BY seq', match)
+            for (queued,) in queued_rows:
+                merged.update(json.loads(queued))
+            merged.update(fields)
+            db.execute(f'DELETE FROM outbox WHERE {where}', match)
+            db.execute(
+                'INSERT INTO outbox (base_id, kind, table_name, record_id, fields, key)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (self.client.base_id, 'update', table_name, record_id,
+                 json.dumps(merged), key),
+            )
+        self._start()
+
+    def delete(self, table_name: str, record_id: str, key: str = ''):
+        """Queue a delete, dropping the record's queued updates not yet being sent"""
+        match = (self.client.base_id, table_name, record_id)
+        with self._write() as db:
+            db.execute("DELETE FROM outbox WHERE base_id = ? AND kind = 'update' AND "
+                       "table_name = ? AND record_id = ? AND claimed_at IS NULL", match)
+            db.execute(
+                'INSERT INTO outbox (base_id, kind, table_name, record_id, fields, key)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (self.client.base_id, 'delete', table_name, record_id, '{}', key),
+            )
+        self._start()
+
+    def pending(self) -> int:
+        """Entries waiting to be sent, failed ones included"""
+        return self._execute(
+            'SELECT COUNT(*) FROM outbox WHERE base_id = ? AND attempts < ?',
+            (self.client.base_id, settings.OUTBOX_MAX_ATTEMPTS))[0][0]
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """Entries that used up OUTBOX_MAX_ATTEMPTS; they stay until retried"""
+        rows = self._execute(
+            'SELECT seq, kind, table_name, record_id, key, last_error FROM outbox '
+            'WHERE base_id = ? AND attempts >= ? ORDER BY seq',
+            (self.client.base_id, settings.OUTBOX_MAX_ATTEMPTS),
+        )
+        columns = ('seq', 'kind', 'table', 'record_id', 'key', 'error')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def retry_failed(self) -> int:
+        with self._write() as db:
+            return db.execute(
+                'UPDATE outbox SET attempts = 0, next_try = 0 '
+                'WHERE base_id = ? AND attempts >= ?',
+                (self.client.base_id, settings.OUTBOX_MAX_ATTEMPTS)).rowcount
+
+    def _claim(self, after: int, force: bool) -> List[tuple]:
+        now = time.time()
+        eligible = ('seq > ? AND base_id = ? AND attempts < ? '
+                    'AND (claimed_at IS NULL OR claimed_at < ?)'
+                    + ('' if force else ' AND next_try <= ?'))
+        params = [after, self.client.base_id, settings.OUTBOX_MAX_ATTEMPTS,
+                  now - settings.OUTBOX_CLAIM_TIMEOUT]
+        if not force:
+            params.append(now)
+        with self._write() as db:
+            db.execute(
+                "UPDATE outbox SET attempts = ?, claimed_at = NULL, last_error = ? "
+                "WHERE base_id = ? AND kind = 'create' AND claimed_at < ?",
+                (settings.OUTBOX_MAX_ATTEMPTS, self.ABANDONED_CREATE,
+                 self.client.base_id, params[3]),
+            )
+            rows = db.execute(
+                'SELECT seq, kind, table_name, record_id, fields, key, attempts '
+                f'FROM outbox WHERE {eligible} ORDER BY seq LIMIT ?',
+                params + [FLUSH_LIMIT]).fetchall()
+            db.executemany('UPDATE outbox SET claimed_at = ? WHERE seq = ?',
+                           [(now, row[0]) for row in rows])
+        return rows
+
+    def _send(self, rows: List[tuple]):
+        writer = BatchWriter(self.client)
+        for seq, kind, table_name, record_id, fields, _, _ in rows:
+            if kind == 'create':
+                writer.create(table_name, json.loads(fields), str(seq))
+            elif kind == 'delete':
+                writer.delete(table_name, record_id, str(seq))
+            else:
+                writer.update(table_name, record_id, json.loads(fields), str(seq))
+        errors = writer.flush()
+
+        now = time.time()
+        sent, failed = [], []
+        for seq, _, _, _, _, key, attempts in rows:
+            messages = errors.get(str(seq))
+            if messages is None:
+                sent.append((seq,))
+                continue
+            backoff = min(settings.RETRY_BACKOFF ** (attempts + 1), 300)
+            failed.append(('; '.join(messages), now + backoff, seq))
+            self.errors.setdefault(key, []).extend(messages)
+        with self._write() as db:
+            db.executemany('DELETE FROM outbox WHERE seq = ?', sent)
+            db.executemany(
+                'UPDATE outbox SET attempts = attempts + 1, last_error = ?, '
+                'next_try = ?, claimed_at = NULL WHERE seq = ?', failed)
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Send every entry that is due (with force, also those backing off);
+        returns the number claimed. Each entry is tried at most once per call.
+        """
+        claimed = after = 0
+        with self._flush_lock:
+            while True:
+                # Entries are claimed in order, so anything at or below `after`
+                # was tried in this call
+                rows = self._claim(after, force)
+                if not rows:
+                    return claimed
+                after = rows[-1][0]
+                claimed += len(rows)
+                self._send(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                # drain() sends what is left, so a failed entry is not tried
+                # twice in a row
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Outbox flush failed, will retry: {e}")
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='airtable-outbox',
+                                            daemon=True)
+            self._thread.start()
+        elif self.pending() >= FLUSH_LIMIT:
+            self._wake.set()
+
+    def drain(self) -> Dict[str, List[str]]:
+        """
+        Stop the background thread and send everything still queued. Returns
+        the errors seen since the last drain by key; failed entries are kept
+        for the next run.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush(force=True)
+        errors, self.errors = self.errors, {}
+        return errors
+
+
+def drain_outboxes():
+    """Drain every outbox of this process, logging writes that did not go through"""
+    for outbox in list(_open):
+        try:
+            errors = outbox.drain()
+        except Exception as e:
+            logger.error(f"Could not drain outbox {outbox.path}, "
+                         f"writes kept for the next run: {e}")
+            continue
+        for key, messages in errors.items():
+            logger.warning(f"Write for {key or 'unknown'} failed, kept in "
+                           f"{outbox.path} for retry: {messages[-1]}")
+
+
+def flushes_outbox(func):
+    """
+    Stage decorator: when the outermost stage of a thread returns, its queued
+    writes have been sent, so the next stage (e.g. shortlist after compress)
+    reads them. Drain errors are logged (drain_outboxes) rather than raised,
+    so they never replace the stage's result or exception.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _stages.depth = getattr(_stages, 'depth', 0) + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _stages.depth -= 1
+            if _stages.depth == 0:
+                drain_outboxes()
+    return wrapper
+
+
+atexit.register(drain_outboxes)
@@ -0,0 +1,350 @@
+# planner.py
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from config import settings
+from utils.airtable_client import AirtableClient
+from utils.cascade import is_evaluated, is_screened_out
+from utils.criteria import evaluate_criteria, failed_criteria, is_borderline
+from utils.json_codec import decode_json
+from utils.llm_client import LLMClient, load_latency
+from utils.schema import STAGE_FIELDS
+
+# Reads behind one get_applicant_data call: the Applicants record and three
+# child-table queries
+READS_PER_APPLICANT = 4
+
+
+class RequestCounter:
+    """
+    Counts the requests a client makes while planning. Writes are refused,
+    so a plan can never change the base.
+    """
+
+    def __init__(self, client: AirtableClient):
+        self.client = client
+        self.reads = 0
+        self._make_request = client._make_request
+        # Set when counters nest, so the outer one keeps counting after the inner exits
+        self._wrapped = vars(client).get('_make_request')
+
+    def __enter__(self) -> 'RequestCounter':
+        def counted(method: str, endpoint: str, *args, **kwargs):
+            if method != 'GET':
+                raise RuntimeError(f"Planning must not write ({method} {endpoint})")
+            self.reads += 1
+            return self._make_request(method, endpoint, *args, **kwargs)
+
+        self.client._make_request = counted
+        return self
+
+    def __exit__(self, *exc):
+        if self._wrapped is not None:
+            self.client._make_request = self._wrapped
+        else:
+            del self.client._make_request
+
+
+def llm_latency() -> float:
+    """
+    Median latency of the fastest provider seen in earlier runs, else
+    LLM_LATENCY_ESTIMATE
+    """
+    return min(load_latency().values(), default=settings.LLM_LATENCY_ESTIMATE)
+
+
+def estimate_seconds(reads: int, writes: int, llm_calls: int = 0, workers: int = 1,
+                     concurrent_writes: bool = False) -> float:
+    """
+    Wall time for a run: Airtable requests at the slower of the rate limit and
+    their latency (spread over workers), plus LLM calls, which run one at a
+    time per worker.
+    """
+    rate = settings.AIRTABLE_RATE_LIMIT or float('inf')
+    per_request = max(1 / rate, settings.AIRTABLE_LATENCY_ESTIMATE / workers)
+    write_seconds = writes / rate if concurrent_writes else writes * per_request
+    return reads * per_request + write_seconds + llm_calls * llm_latency() / workers
+
+
+def new_plan(stage: str, **counts) -> Dict[str, Any]:
+    plan = {
+        'stage': stage, 'applicants': 0, 'reads': 0, 'writes': 0, 'llm_calls': 0,
+        'llm_tokens': 0, 'deferred': 0, 'seconds': 0.0
+    }
+    plan.update(counts)
+    return plan
+
+
+def print_plan(plan: Dict[str, Any]):
+    print(f"\nPlan for {plan['stage']} (nothing was written):")
+    print(f"  Applicants:      {plan['applicants']}")
+    print(f"  Airtable reads:  {plan['reads']}")
+    print(f"  Airtable writes: {plan['writes']}")
+    if plan['llm_calls'] or plan['stage'] == 'evaluate':
+        tokens = f"{plan['llm_tokens']:,}"
+        print(f"  LLM calls:       {plan['llm_calls']} (~{tokens} tokens)")
+    if plan['deferred']:
+        print(f"  Deferred:        {plan['deferred']}")
+    for note in plan.get('notes', []):
+        print(f"  Note: {note}")
+    minutes, seconds = divmod(round(plan['seconds']), 60)
+    print(f"  Estimated time:  {minutes}m {seconds:02d}s")
+
+
+def _decoded(applicant: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        return decode_json(applicant['fields'].get('Compressed JSON') or '')
+    except ValueError:
+        return None
+
+
+def _shortlist_writes(applicant: Dict[str, Any], leads: Dict[str, List[str]]) -> int:
+    """
+    A create or update if the applicant qualifies, else a delete of any
+    existing lead
+    """
+    compressed_json = _decoded(applicant)
+    if compressed_json is None:
+        return 0
+    if not failed_criteria(evaluate_criteria(compressed_json)):
+        return 1 + (len(leads.get(applicant['id'], [])) > 1)
+    return int(bool(leads.get(applicant['id'])))
+
+
+def plan_shortlist(client: AirtableClient) -> Dict[str, Any]:
+    """
+    Projected scans of applicants and leads; one write per applicant whose
+    lead changes
+    """
+    from scripts.shortlist_candidates import shortlisted_leads
+
+    with RequestCounter(client) as counter:
+        applicants = client.get_all_applicants(fields=list(STAGE_FIELDS['shortlist']))
+        leads = shortlisted_leads(client)
+
+    writes = sum(_shortlist_writes(applicant, leads) for applicant in applicants)
+    return new_plan('shortlist', applicants=len(applicants), reads=counter.reads,
+                    writes=writes, seconds=estimate_seconds(counter.reads, writes))
+
+
+def _plan_applicant(plan: Dict[str, Any], applicant: Dict[str, Any], duplicates: Any,
+                    cascade: bool, screening: bool) -> Optional[Dict[str, Any]]:
+    """
+    Count what evaluate_one spends on an applicant before the main LLM call:
+    the skip, duplicate reuse, data fetch, cascade skip or screening call.
+    Returns the compressed JSON if the applicant goes on to the main LLM.
+    """
+    fields = applicant['fields']
+    if not fields.get('Applicant ID'):
+        return None
+    if is_evaluated(fields) or is_screened_out(fields):
+        return None
+    if duplicates is not None and duplicates.reusable(applicant['id']):
+        plan['writes'] += 1
+        return None
+
+    if 'Compressed JSON' in fields:
+        compressed_json = _decoded(applicant)
+    else:
+        # Fetched with the applicant's data, where it is just as empty
+        plan['reads'] += READS_PER_APPLICANT
+        compressed_json = {}
+    if compressed_json is None or not cascade:
+        return compressed_json
+
+    evaluation = evaluate_criteria(compressed_json)
+    if failed_criteria(evaluation) and not is_borderline(evaluation):
+        plan['writes'] += 1
+        return None
+    if screening:
+        plan['llm_calls'] += 1
+        plan['llm_tokens'] += LLMClient.estimate_tokens(compressed_json)
+    return compressed_json
+
+
+def _plan_llm_call(plan: Dict[str, Any], compressed_json: Dict[str, Any],
+                   deadline: float, token_budget: int, workers: int) -> bool:
+    """Count the main LLM call and its write, or a deferral if it does not fit"""
+    cost = LLMClient.estimate_tokens(compressed_json)
+    over_budget = token_budget and plan['llm_tokens'] + cost > token_budget
+    seconds = estimate_seconds(plan['reads'], plan['writes'], plan['llm_calls'] + 1,
+                               workers)
+    late = deadline and seconds > deadline
+    max_calls = settings.LLM_MAX_CALLS
+    out_of_calls = max_calls and plan['llm_calls'] >= max_calls
+    if over_budget or late or out_of_calls:
+        plan['deferred'] += 1
+        return False
+
+    plan['llm_calls'] += 1
+    plan['llm_tokens'] += cost
+    plan['writes'] += 1
+    return True
+
+
+def plan_evaluate(client: AirtableClient, cascade: bool = settings.CASCADE_ENABLED,
+                  dedup: bool = settings.DEDUP_ENABLED,
+                  priority: Sequence[str] = settings.EVALUATION_PRIORITY,
+                  deadline: float = settings.EVALUATION_DEADLINE,
+                  token_budget: int = settings.LLM_TOKEN_BUDGET,
+                  workers: int = 1) -> Dict[str, Any]:
+    """
+    Walk the applicants the way evaluate_applicants would: same scan, order,
+    already-evaluated skips, duplicate reuse and cascade rules. The deadline
+    and token budget are applied to the running estimates.
+    """
+    from utils.scheduler import EvaluationScheduler
+
+    with RequestCounter(client) as counter:
+        applicants = client.get_all_applicants(fields=list(STAGE_FIELDS['evaluate']))
+        # Only the order is used, so the scheduler gets no deadline or budget
+        applicants = EvaluationScheduler(priority, 0, 0).order(applicants, client)
+    plan = new_plan('evaluate', applicants=len(applicants), reads=counter.reads,
+                    notes=[])
+
+    duplicates = None
+    if dedup:
+        from utils.dedup import DuplicateIndex
+        duplicates = DuplicateIndex(applicants)
+    screening = cascade and bool(settings.CASCADE_SCREEN_MODEL)
+    if screening:
+        plan['notes'].append("screening model results are unknown, so every applicant "
+                             "that passes the rules counts as sent")
+
+    for applicant in applicants:
+        compressed_json = _plan_applicant(plan, applicant, duplicates, cascade,
+                                          screening)
+        if compressed_json is None:
+            continue
+        sent = _plan_llm_call(plan, compressed_json, deadline, token_budget, workers)
+        if sent and duplicates is not None:
+            duplicates.store(applicant['id'], {}, applicant['fields']['Applicant ID'])
+
+    plan['seconds'] = estimate_seconds(plan['reads'], plan['writes'], plan['llm_calls'],
+                                       workers)
+    return plan
+
+
+def plan_compress(client: AirtableClient,
+                  applicant_ids: Sequence[str]) -> Dict[str, Any]:
+    """
+    Resolve the IDs with one projected scan; each known applicant costs its
+    reads and one write
+    """
+    with RequestCounter(client) as counter:
+        applicants = client.get_all_applicants(fields=['Applicant ID'])
+    known = {str(a['fields'].get('Applicant ID')) for a in applicants}
+
+    found = [applicant_id for applicant_id in applicant_ids
+             if str(applicant_id) in known]
+    missing = len(applicant_ids) - len(found)
+    notes = [f"{missing} IDs not found"] if missing else []
+    reads = len(found) * READS_PER_APPLICANT
+    seconds = estimate_seconds(reads, len(found)) + estimate_seconds(counter.reads, 0)
+    return new_plan('compress', applicants=len(found), reads=reads, writes=len(found),
+                    notes=notes, seconds=seconds)
+
+
+def plan_backfill_derived(client: AirtableClient) -> Dict[str, Any]:
+    from utils.derived import DERIVED_VERSION
+
+    with RequestCounter(client) as counter:
+        applicants = client.get_all_applicants(
+            fields=['Applicant ID', 'Compressed JSON'])
+    stale = 0
+    for applicant in applicants:
+        compressed_json = _decoded(applicant)
+        if compressed_json is None:
+            continue
+        if (compressed_json.get('derived') or {}).get('version') != DERIVED_VERSION:
+            stale += 1
+    return new_plan('backfill derived', applicants=len(applicants), reads=counter.reads,
+                    writes=stale, seconds=estimate_seconds(counter.reads, stale))
+
+
+def plan_decompress_bulk(client: AirtableClient, source: str,
+                         workers: int = settings.WRITE_WORKERS) -> Dict[str, Any]:
+    """
+    Run the bulk restore with planning on: same scans, batches counted
+    instead of sent
+    """
+    from scripts.decompress_json import decompress_bulk
+
+    with RequestCounter(client) as counter:
+        result = decompress_bulk(source, client, workers, plan=True)
+    errors = len(result['errors'])
+    notes = [f"{errors} payloads would fail before writing"] if errors else []
+    seconds = estimate_seconds(counter.reads, result['requests'], workers=workers,
+                               concurrent_writes=True)
+    return new_plan('bulk decompress', applicants=result['applicants'],
+                    reads=counter.reads, writes=result['requests'], notes=notes,
+                    seconds=seconds)
+
+
+def plan_decompress(client: AirtableClient, applicant_id: str,
+                    compressed_json: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reads as decompress_json does them; writes from the existing and
+    restored child records
+    """
+    with RequestCounter(client) as counter:
+        applicant_rec_id = client.get_applicant_record_id(applicant_id)
+        if not applicant_rec_id:
+            raise ValueError(f"Applicant with Applicant ID={applicant_id} not found")
+        formula = f"{{Applicant ID}} = '{applicant_rec_id}'"
+        existing_experience = client.get_records(settings.WORK_EXPERIENCE_TABLE,
+                                                 filter_formula=formula,
+                                                 fields=['Applicant ID'])
+    # personal and salary queries, then one upsert each, plus a delete per old
+    # job and a create per new one
+    reads = counter.reads + 2
+    writes = 2 + len(existing_experience) + len(compressed_json.get('experience', []))
+    return new_plan('decompress', applicants=1, reads=reads, writes=writes,
+                    seconds=estimate_seconds(reads, writes))
+
+
+def plan_shortlist_single(client: AirtableClient, applicant_id: str) -> Dict[str, Any]:
+    from scripts.shortlist_candidates import shortlisted_leads
+
+    with RequestCounter(client) as counter:
+        applicant = client.get_applicant_record(applicant_id)
+        if not applicant:
+            raise ValueError(f"Applicant ID {applicant_id} not found")
+        writes = _shortlist_writes(applicant, shortlisted_leads(client))
+    return new_plan('shortlist', applicants=1, reads=counter.reads, writes=writes,
+                    seconds=estimate_seconds(counter.reads, writes))
+
+
+def plan_evaluate_single(client: AirtableClient, applicant_id: str) -> Dict[str, Any]:
+    """evaluate_single_applicant: the applicant's data, one LLM call and one write"""
+    with RequestCounter(client) as counter:
+        applicant = client.get_applicant_record(applicant_id)
+    if not applicant:
+        raise ValueError(f"Applicant ID {applicant_id} not found")
+    compressed_json = _decoded(applicant) or {}
+    reads = max(counter.reads, 1) + READS_PER_APPLICANT - 1
+    return new_plan('evaluate', applicants=1, reads=reads, writes=1, llm_calls=1,
+                    llm_tokens=LLMClient.estimate_tokens(compressed_json),
+                    seconds=estimate_seconds(reads, 1, 1))
+
+
+def combine_plans(stage: str, plans: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum of several plans, e.g. one per applicant ID"""
+    combined = new_plan(stage, notes=[])
+    for plan in plans:
+        for key in ('applicants', 'reads', 'writes', 'llm_calls', 'llm_tokens',
+                    'deferred', 'seconds'):
+            combined[key] += plan[key]
+        combined['notes'].extend(plan.get('notes', []))
+    return combined
+
+
+def plan_sharded(stage: str, client: AirtableClient, workers: int,
+                 **options) -> Dict[str, Any]:
+    """
+    Sharded runs do the same work; LLM calls and request latency are spread
+    over the workers
+    """
+    if stage == 'shortlist':
+        return plan_shortlist(client)
+    return plan_evaluate(client, workers=workers, **options)
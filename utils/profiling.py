@@ -0,0 +1,235 @@
+# profiling.py
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+PROFILE_MODES = ('spans', 'cprofile', 'sample')
+
+# Active profiler of this process; None keeps span() down to one check
+_profiler = None
+
+_NO_SPAN = nullcontext()
+
+
+class Sampler:
+    """
+    Sampling profiler: a daemon thread records every other thread's Python
+    stack each interval. The counts are collapsed stacks, so a function's
+    share of samples is its share of wall time, waits on HTTP included.
+    """
+
+    def __init__(self, interval: float = settings.PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler',
+                                        daemon=True)
+
+    @staticmethod
+    def _stack(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.counts[self._stack(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class Profiler:
+    """
+    Times named spans with perf_counter (monotonic). Each thread keeps its
+    own stack of open spans, so nested spans give collapsed stacks of self
+    time and every span becomes a complete event in a Chrome trace. Stacks
+    of pool threads are rooted at the stage like those of the stage's own.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = time.perf_counter()
+        self._stage_thread = threading.get_ident()
+        # (name, thread ID, start, duration)
+        self.events: List[Tuple[str, int, float, float]] = []
+        # Microseconds of self time per collapsed span stack
+        self.self_time: Dict[str, float] = defaultdict(float)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        stack = self._local.__dict__.setdefault('stack', [])
+        # [name, time spent in child spans]
+        entry = [name, 0.0]
+        stack.append(entry)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            names = [open_name for open_name, _ in stack]
+            if threading.get_ident() != self._stage_thread:
+                names.insert(0, self.stage)
+            path = ';'.join(names)
+            stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+            with self._lock:
+                self.events.append((name, threading.get_ident(), started, elapsed))
+                self.self_time[path] += (elapsed - entry[1]) * 1e6
+
+    def summary(self) -> List[Tuple[str, int, float]]:
+        """(span, calls, total seconds) per span name, slowest first"""
+        totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        for name, _, _, elapsed in self.events:
+            totals[name][0] += 1
+            totals[name][1] += elapsed
+        return sorted(
+            ((name, int(calls), seconds) for name, (calls, seconds) in totals.items()),
+            key=lambda row: row[2], reverse=True)
+
+    def write_collapsed(self, path: str):
+        with open(path, 'w') as f:
+            for stack, micros in sorted(self.self_time.items()):
+                if round(micros):
+                    f.write(f"{stack} {round(micros)}\n")
+
+    def write_trace(self, path: str):
+        """Chrome trace event format, for chrome://tracing or Perfetto"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                   'args': {'name': self.stage}}]
+        events.extend({
+            'name': name, 'cat': self.stage, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+            'ts': round((started - self.started) * 1e6), 'dur': round(elapsed * 1e6),
+        } for name, thread_id, started, elapsed in self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def span(name: str):
+    """Time a block as a named span when profiling is on; otherwise a no-op"""
+    if _profiler is None:
+        return _NO_SPAN
+    return _profiler.span(name)
+
+
+def timed(name: str):
+    """Decorator form of span for whole functions"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _write_samples(counts: Dict[str, int], path: str):
+    with open(path, 'w') as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def reset_profiler():
+    """
+    Drop a profiler inherited from the parent process. A forked worker must
+    call this, or its stages only add spans to a copy that is never written.
+    """
+    global _profiler
+    _profiler = None
+
+
+def _start_profilers(mode: str):
+    """Start the deterministic profiler or the Sampler a mode adds to spans"""
+    deterministic = sampler = None
+    if mode == 'cprofile':
+        import cProfile
+        deterministic = cProfile.Profile()
+        deterministic.enable()
+    elif mode == 'sample':
+        sampler = Sampler()
+        sampler.start()
+    return deterministic, sampler
+
+
+def _write_profile(stage: str, profiler: Profiler, deterministic, sampler):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR,
+                        f"{stage}-{os.getpid()}-{int(time.time())}")
+    outputs = [f"{base}.spans.folded", f"{base}.trace.json"]
+    profiler.write_collapsed(outputs[0])
+    profiler.write_trace(outputs[1])
+    if deterministic is not None:
+        outputs.append(f"{base}.prof")
+        deterministic.dump_stats(outputs[-1])
+    if sampler is not None:
+        outputs.append(f"{base}.samples.folded")
+        _write_samples(sampler.counts, outputs[-1])
+
+    print(f"\nProfile of {stage}:")
+    for name, calls, seconds in profiler.summary():
+        print(f"  {name:<15} {calls:>7} calls {seconds:>10.3f}s")
+    for output in outputs:
+        print(f"  Wrote {output}")
+
+
+@contextmanager
+def profile_stage(stage: str, mode: Optional[str] = None):
+    """
+    Profile a stage when PROFILE is set (spans, cprofile or sample). Spans
+    are always recorded; cprofile also runs the deterministic profiler on
+    the calling thread and sample runs the Sampler. Output goes to
+    PROFILE_DIR as <stage>-<pid>-<time>.spans.folded and .trace.json, plus
+    .prof or .samples.folded. Inside an already profiled stage this is just
+    another span, so only the outermost stage writes files.
+    """
+    global _profiler
+    mode = mode if mode is not None else settings.PROFILE
+    if _profiler is not None:
+        with _profiler.span(stage):
+            yield
+        return
+    if not mode:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode}, "
+                         f"expected one of {', '.join(PROFILE_MODES)}")
+
+    profiler = _profiler = Profiler(stage)
+    deterministic, sampler = _start_profilers(mode)
+    try:
+        with profiler.span(stage):
+            yield
+    finally:
+        if deterministic is not None:
+            deterministic.disable()
+        if sampler is not None:
+            sampler.stop()
+        _profiler = None
+        _write_profile(stage, profiler, deterministic, sampler)
@@ -0,0 +1,85 @@
+# rate_limiter.py
+
+import multiprocessing
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` acquisitions per second on
+    average, with short bursts of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """
+    Rate limiter whose state lives in shared memory, so one limit holds
+    across a process pool. Pass it to workers at start-up (e.g. through a
+    pool initializer); each acquisition reserves the next free slot.
+    """
+
+    def __init__(self, rate: float, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.rate = rate
+        self._next_slot = ctx.Value('d', 0.0)
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._next_slot.get_lock():
+            # CLOCK_MONOTONIC is system-wide, so slots compare across processes
+            now = time.monotonic()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + 1 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SharedQuota:
+    """Call budget shared across processes; a limit of 0 means unlimited"""
+
+    def __init__(self, limit: int, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.limit = limit
+        self._used = ctx.Value('l', 0)
+
+    def take(self, n: int = 1) -> bool:
+        """Reserve n calls; False once the budget is spent"""
+        with self._used.get_lock():
+            if self.limit and self._used.value + n > self.limit:
+                return False
+            self._used.value += n
+            return True
+
+    def release(self, n: int = 1):
+        """Give back n reserved calls that were not spent"""
+        with self._used.get_lock():
+            self._used.value = max(self._used.value - n, 0)
+
+    @property
+    def used(self) -> int:
+        return self._used.value
@@ -0,0 +1,154 @@
+# scheduler.py
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from config import settings
+from utils.cascade import is_evaluated
+from utils.criteria import CRITERIA, evaluate_criteria
+from utils.json_codec import decode_json
+from utils.rate_limiter import SharedQuota
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_REACHED = 'deadline reached'
+
+# Token budget shared by a process pool (see SharedQuota); when unset, each
+# scheduler, i.e. each run, has its own
+_token_quota = None
+
+
+def set_token_quota(quota):
+    global _token_quota
+    _token_quota = quota
+
+
+def _compressed(applicant: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        return decode_json(applicant['fields'].get('Compressed JSON') or '')
+    except ValueError:
+        return None
+
+
+def rule_score(applicant: Dict[str, Any], context: Dict[str, Any]) -> float:
+    """Shortlist criteria met, with experience as tie-breaker; -1 without usable JSON"""
+    compressed_json = _compressed(applicant)
+    if compressed_json is None:
+        return -1
+    evaluation = evaluate_criteria(compressed_json)
+    met = sum(1 for name in CRITERIA if evaluation[name])
+    return met + min(evaluation['total_experience'], 10) / 100
+
+
+def recency(applicant: Dict[str, Any], context: Dict[str, Any]) -> str:
+    # ISO 8601 timestamps sort chronologically as strings
+    return applicant.get('createdTime') or ''
+
+
+def shortlisted(applicant: Dict[str, Any], context: Dict[str, Any]) -> bool:
+    return applicant['id'] in context['shortlisted']
+
+
+# Higher values are evaluated first
+PRIORITIES: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {
+    'rule_score': rule_score,
+    'recency': recency,
+    'shortlisted': shortlisted,
+}
+
+
+def parse_priority(value: str) -> List[str]:
+    """Comma-separated priority names, e.g. from the command line"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in PRIORITIES]
+    if unknown:
+        raise ValueError(f"Unknown priority {', '.join(unknown)}, "
+                         f"expected one of {', '.join(PRIORITIES)}")
+    return names
+
+
+class EvaluationScheduler:
+    """
+    Decides the order of LLM evaluations and whether each may still start.
+
+    Applicants are sorted by the given priorities (compared in turn, best
+    first). An evaluation is only admitted while it can finish before the
+    deadline, judged by the router's p95 latency, and while its estimated
+    tokens fit the budget. Everything refused is recorded in `deferred`.
+    """
+
+    def __init__(self, priority: Sequence[str] = settings.EVALUATION_PRIORITY,
+                 deadline: float = settings.EVALUATION_DEADLINE,
+                 token_budget: int = settings.LLM_TOKEN_BUDGET):
+        self.priority = parse_priority(','.join(priority))
+        self.deadline = time.monotonic() + deadline if deadline else None
+        self.token_quota = _token_quota
+        if self.token_quota is None and token_budget:
+            self.token_quota = SharedQuota(token_budget)
+        self.deferred: List[Tuple[str, str]] = []
+
+    def order(self, applicants: List[Dict[str, Any]],
+              client=None) -> List[Dict[str, Any]]:
+        """Applicants sorted best first; the sort is stable, so ties keep their order"""
+        if not self.priority:
+            return applicants
+        shortlisted = set()
+        if 'shortlisted' in self.priority:
+            shortlisted = self._shortlisted_ids(client)
+        context = {'shortlisted': shortlisted}
+        return sorted(
+            applicants,
+            key=lambda applicant: tuple(PRIORITIES[name](applicant, context)
+                                        for name in self.priority),
+            reverse=True,
+        )
+
+    @staticmethod
+    def _shortlisted_ids(client) -> Set[str]:
+        """Applicants record IDs that already have a Shortlisted Leads record"""
+        leads = client.get_records(settings.SHORTLISTED_LEADS_TABLE,
+                                   fields=['Applicant ID'])
+        return {record_id for lead in leads
+                for record_id in lead['fields'].get('Applicant ID', [])}
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def defer_reason(self, applicant_id: str, tokens: int,
+                     expected_latency: Optional[float] = None) -> Optional[str]:
+        """
+        Reserve tokens for one evaluation, or return (and record) why it has
+        to wait: it would overrun the deadline or the token budget.
+        """
+        reason = None
+        finish = time.monotonic() + (expected_latency or 0)
+        if self.deadline is not None and finish > self.deadline:
+            reason = DEADLINE_REACHED
+        elif self.token_quota is not None and not self.token_quota.take(tokens):
+            reason = f"token budget of {self.token_quota.limit} reached"
+
+        if reason is not None:
+            self.defer(applicant_id, reason)
+        return reason
+
+    def release(self, tokens: int):
+        """Give back the tokens reserved for an evaluation that failed"""
+        if self.token_quota is not None:
+            self.token_quota.release(tokens)
+
+    def defer(self, applicant_id: str, reason: str):
+        logger.debug(f"Deferred applicant {applicant_id}: {reason}")
+        self.deferred.append((applicant_id, reason))
+
+    def defer_all(self, applicants: List[Dict[str, Any]], reason: str):
+        """Defer every applicant still waiting for an evaluation"""
+        for applicant in applicants:
+            fields = applicant['fields']
+            if fields.get('Applicant ID') and not is_evaluated(fields):
+                self.defer(fields['Applicant ID'], reason)
+
+    @property
+    def tokens_used(self) -> int:
+        return self.token_quota.used if self.token_quota is not None else 0
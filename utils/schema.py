@@ -0,0 +1,133 @@
+# schema.py
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from requests.exceptions import RequestException
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+META_URL = 'https://api.airtable.com/v0/meta/bases'
+
+# Every field the pipeline reads or writes, by table
+PIPELINE_FIELDS: Dict[str, Sequence[str]] = {
+    settings.APPLICANTS_TABLE: ('Applicant ID', 'Compressed JSON', 'LLM Summary',
+                                'LLM Score', 'LLM Follow-Ups'),
+    settings.PERSONAL_DETAILS_TABLE: ('Applicant ID', 'Full Name', 'Email', 'Location',
+                                      'LinkedIn'),
+    settings.WORK_EXPERIENCE_TABLE: ('Applicant ID', 'Company', 'Title', 'Start', 'End',
+                                     'Technologies'),
+    settings.SALARY_PREFERENCES_TABLE: ('Applicant ID', 'Preferred Rate',
+                                        'Minimum Rate', 'Currency', 'Availability'),
+    settings.SHORTLISTED_LEADS_TABLE: ('Applicant ID', 'Compressed JSON',
+                                       'Score Reason'),
+}
+
+# Applicants fields each full-table stage reads; scans request only these
+STAGE_FIELDS: Dict[str, Sequence[str]] = {
+    'shortlist': ('Applicant ID', 'Compressed JSON'),
+    'evaluate': PIPELINE_FIELDS[settings.APPLICANTS_TABLE],
+}
+
+# Bases already validated in this process
+_validated = set()
+
+
+class SchemaError(ValueError):
+    """Raised when the base lacks tables or fields the pipeline uses"""
+
+
+class BaseSchema:
+    """Tables and fields of one base, from the Airtable metadata API"""
+
+    def __init__(self, base_id: str, tables: List[Dict[str, Any]]):
+        self.base_id = base_id
+        self.tables = {table['id']: table for table in tables}
+        self._ids = {
+            table['id']: {field['name']: field['id']
+                          for field in table.get('fields', [])}
+            for table in tables
+        }
+        self._names = {table_id: {v: k for k, v in ids.items()}
+                       for table_id, ids in self._ids.items()}
+
+    @classmethod
+    def fetch(cls, client) -> 'BaseSchema':
+        response = client._make_request('GET', 'tables',
+                                        base_url=f'{META_URL}/{client.base_id}')
+        return cls(client.base_id, response.get('tables', []))
+
+    @classmethod
+    def load(cls, client, cache_file: str = settings.SCHEMA_CACHE_FILE,
+             ttl: float = settings.SCHEMA_CACHE_TTL,
+             refresh: bool = False) -> 'BaseSchema':
+        """The cached schema if it is for this base and younger than ttl, else fresh"""
+        fresh = (os.path.exists(cache_file)
+                 and time.time() - os.path.getmtime(cache_file) < ttl)
+        if not refresh and fresh:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get('base_id') == client.base_id:
+                return cls(client.base_id, cached['tables'])
+
+        schema = cls.fetch(client)
+        with open(cache_file, 'w') as f:
+            tables = list(schema.tables.values())
+            json.dump({'base_id': schema.base_id, 'tables': tables}, f)
+        return schema
+
+    def field_id(self, table_id: str, name: str) -> str:
+        return self._ids[table_id][name]
+
+    def field_name(self, table_id: str, field_id: str) -> str:
+        return self._names[table_id].get(field_id, field_id)
+
+    def missing_fields(
+            self, required: Dict[str, Sequence[str]] = PIPELINE_FIELDS) -> List[str]:
+        """Descriptions of every required table or field the base does not have"""
+        missing = []
+        for table_id, names in required.items():
+            if table_id not in self._ids:
+                missing.append(f"table {table_id}")
+                continue
+            table_name = self.tables[table_id].get('name', table_id)
+            missing.extend(f"{table_name}.{name}" for name in names
+                           if name not in self._ids[table_id])
+        return missing
+
+
+def validate_schema(client, required: Dict[str, Sequence[str]] = PIPELINE_FIELDS,
+                    refresh: bool = False):
+    """
+    Check once per process that the base has every field the pipeline uses,
+    so a renamed field stops the run before any request is spent on it.
+    If the metadata cannot be read (e.g. the token lacks schema.bases:read)
+    the check is skipped with a warning.
+    """
+    if not settings.SCHEMA_CHECK or (client.base_id in _validated and not refresh):
+        return
+    try:
+        schema = BaseSchema.load(client, refresh=refresh)
+    except (RequestException, ValueError) as e:
+        logger.warning(f"Skipping schema check, base metadata unavailable: {e}")
+        _validated.add(client.base_id)
+        return
+
+    missing = schema.missing_fields(required)
+    if missing:
+        raise SchemaError(f"Base {client.base_id} is missing {', '.join(missing)}")
+    _validated.add(client.base_id)
+
+
+def get_schema(client) -> Optional[BaseSchema]:
+    """Cached schema for field-ID addressing; None if it cannot be read"""
+    try:
+        return BaseSchema.load(client)
+    except (RequestException, ValueError) as e:
+        logger.warning(f"Base metadata unavailable, addressing fields by name: {e}")
+        return None
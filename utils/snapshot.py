@@ -0,0 +1,251 @@
+# snapshot.py
+
+import copy
+import json
+import logging
+import mmap
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from utils.airtable_client import AirtableClient
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'arrow', 'parquet')
+MANIFEST = 'manifest.json'
+
+# The only formula shape the pipeline issues: {Field} = 'value'
+_EQUALS_FORMULA = re.compile(r"^\{(?P<field>[^}]+)\}\s*=\s*'(?P<value>.*)'$")
+
+
+def _table_path(directory: str, table_id: str, fmt: str) -> str:
+    return os.path.join(directory, f'{table_id}.{fmt}')
+
+
+def _write_table(path: str, records: List[Dict[str, Any]], fmt: str):
+    if fmt == 'jsonl':
+        with open(path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        return
+
+    # Columnar formats need pyarrow; only imported when asked for.
+    # Airtable fields are heterogeneous per table, so they are kept as a
+    # JSON column next to the id/createdTime columns.
+    import pyarrow as pa
+    table = pa.table({
+        'id': [r['id'] for r in records],
+        'createdTime': [r.get('createdTime') for r in records],
+        'fields': [json.dumps(r.get('fields', {})) for r in records],
+    })
+    if fmt == 'arrow':
+        with pa.OSFile(path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+
+
+def _read_table(path: str, fmt: str) -> List[Dict[str, Any]]:
+    if fmt == 'jsonl':
+        if os.path.getsize(path) == 0:
+            return []
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return [json.loads(line) for line in iter(mapped.readline, b'')
+                        if line.strip()]
+
+    import pyarrow as pa
+    if fmt == 'arrow':
+        # The batches point into the mapped file, but to_pydict below still
+        # copies every value
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, memory_map=True)
+
+    columns = table.to_pydict()
+    rows = zip(columns['id'], columns['createdTime'], columns['fields'])
+    return [
+        {'id': record_id, 'createdTime': created, 'fields': json.loads(fields)}
+        for record_id, created, fields in rows
+    ]
+
+
+def export_snapshot(client: AirtableClient, directory: str,
+                    fmt: str = 'jsonl') -> Dict[str, Any]:
+    """Dump every configured table to directory; returns the manifest"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {fmt}, "
+                         f"expected one of {', '.join(FORMATS)}")
+    os.makedirs(directory, exist_ok=True)
+
+    manifest: Dict[str, Any] = {
+        'base_id': client.base_id,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'format': fmt,
+        'tables': {},
+    }
+    for name, table_id in settings.TABLES.items():
+        records = client.get_records(table_id)
+        _write_table(_table_path(directory, table_id, fmt), records, fmt)
+        manifest['tables'][table_id] = {'name': name, 'records': len(records)}
+        logger.debug(f"Exported {len(records)} records from {name}")
+
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_snapshot(directory: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Load a snapshot directory into {table_id: records}"""
+    with open(os.path.join(directory, MANIFEST), 'r') as f:
+        manifest = json.load(f)
+    return {
+        table_id: _read_table(_table_path(directory, table_id, manifest['format']),
+                              manifest['format'])
+        for table_id in manifest['tables']
+    }
+
+
+class SnapshotClient(AirtableClient):
+    """
+    AirtableClient that serves reads from a snapshot and captures writes.
+
+    Only _make_request is replaced, so every higher-level helper (ID cache,
+    get_applicant_data, ...) behaves as it does against the live base.
+    Reads honour the fields[] projection and return copies, so callers can
+    change what they get without changing the snapshot. Writes are applied
+    to the in-memory tables, so later reads see them, and appended to
+    output_file as JSON lines instead of being sent to Airtable. Requests
+    the snapshot cannot answer raise ValueError.
+    """
+
+    def __init__(self, directory: str, output_file: Optional[str] = None):
+        super().__init__()
+        self.tables = {
+            table_id: {record['id']: record for record in records}
+            for table_id, records in load_snapshot(directory).items()
+        }
+        self.output_file = output_file
+        self.writes = 0
+        # Snapshot records are keyed by field name
+        self.field_ids = False
+        # Replayed writes must never reach a durable outbox shared with live runs
+        self.outbox_file = ':memory:'
+
+    def _capture(self, op: str, table_id: str, record_id: str,
+                 fields: Optional[Dict] = None):
+        self.writes += 1
+        if not self.output_file:
+            return
+        with open(self.output_file, 'a') as f:
+            write = {'op': op, 'table': table_id, 'id': record_id, 'fields': fields}
+            f.write(json.dumps(write) + '\n')
+
+    def _applicant_number(self, record_id: str) -> Optional[str]:
+        record = self.tables.get(settings.APPLICANTS_TABLE, {}).get(record_id)
+        return str(record['fields'].get('Applicant ID')) if record else None
+
+    def _matches(self, record: Dict[str, Any], formula: Optional[str]) -> bool:
+        if not formula:
+            return True
+        match = _EQUALS_FORMULA.match(formula.strip())
+        if not match:
+            raise ValueError(f"Snapshot replay cannot evaluate formula: {formula}")
+
+        value = record['fields'].get(match.group('field'))
+        expected = match.group('value')
+        if isinstance(value, list):
+            # Linked records compare by record ID or by the applicant's Applicant ID
+            return any(expected in (str(v), self._applicant_number(v)) for v in value)
+        return value is not None and str(value) == expected
+
+    @staticmethod
+    def _copy(record: Dict[str, Any],
+              fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """A copy of record with only the projected fields, as Airtable returns it"""
+        names = record['fields']
+        if fields is not None:
+            names = [name for name in fields if name in record['fields']]
+        return dict(record, fields={name: copy.deepcopy(record['fields'][name])
+                                    for name in names})
+
+    def get_records_partitioned(self, table_name: str,
+                                filter_formula: Optional[str] = None,
+                                fields: Optional[List[str]] = None,
+                                **kwargs) -> List[Dict]:
+        # Range formulas are not evaluated locally, and there is no latency to hide
+        return self.get_records(table_name, filter_formula, fields)
+
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
+                      params: Optional[Dict] = None, base_url: Optional[str] = None):
+        if base_url is not None:
+            raise ValueError(f"Snapshot replay does not support {base_url}/{endpoint}")
+
+        table_id, _, record_id = endpoint.partition('/')
+        table = self.tables.setdefault(table_id, {})
+        if method == 'GET' and record_id:
+            if record_id not in table:
+                raise ValueError(f"Record {record_id} not in snapshot table {table_id}")
+            return self._copy(table[record_id])
+        if method == 'GET':
+            return {'records': self._select(table, params or {})}
+        return self._write(method, table_id, record_id, data or {}, params or {})
+
+    def _select(self, table: Dict[str, Dict[str, Any]],
+                params: Dict) -> List[Dict[str, Any]]:
+        """Copies of the records matching filterByFormula, projected to fields[]"""
+        formula = params.get('filterByFormula')
+        projection = params.get('fields[]')
+        return [self._copy(r, projection) for r in table.values()
+                if self._matches(r, formula)]
+
+    def _write(self, method: str, table_id: str, record_id: str, data: Dict,
+               params: Dict):
+        """Apply a single or batch create, update or delete to the in-memory table"""
+        if method == 'POST' and 'records' in data:
+            return {'records': [self._create(table_id, item['fields'])
+                                for item in data['records']]}
+        if method == 'POST':
+            return self._create(table_id, data.get('fields', {}))
+        if method == 'PATCH' and not record_id:
+            return {'records': [self._update(table_id, item['id'], item['fields'])
+                                for item in data['records']]}
+        if method == 'PATCH':
+            return self._update(table_id, record_id, data.get('fields', {}))
+        if method == 'DELETE' and not record_id:
+            return {'records': [self._delete(table_id, rid)
+                                for rid in params.get('records[]', [])]}
+        if method == 'DELETE':
+            return self._delete(table_id, record_id)
+        raise ValueError(f"Snapshot replay does not support {method}")
+
+    def _create(self, table_id: str, fields: Dict) -> Dict[str, Any]:
+        record = {
+            'id': f'recSnap{uuid.uuid4().hex[:10]}',
+            'createdTime': datetime.now(timezone.utc).isoformat(),
+            'fields': copy.deepcopy(fields),
+        }
+        self.tables[table_id][record['id']] = record
+        self._capture('create', table_id, record['id'], fields)
+        return self._copy(record)
+
+    def _update(self, table_id: str, record_id: str, fields: Dict) -> Dict[str, Any]:
+        record = self.tables[table_id][record_id]
+        record['fields'].update(copy.deepcopy(fields))
+        # A null clears the field, and Airtable leaves empty fields out of records
+        for name in [name for name, value in fields.items() if value is None]:
+            del record['fields'][name]
+        self._capture('update', table_id, record_id, fields)
+        return self._copy(record)
+
+    def _delete(self, table_id: str, record_id: str) -> Dict[str, Any]:
+        self.tables[table_id].pop(record_id, None)
+        self._capture('delete', table_id, record_id)
+        return {'id': record_id, 'deleted': True}
@@ -0,0 +1,198 @@
+# webhooks.py
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tables whose edits change an applicant's compressed JSON
+CHILD_TABLES = (
+    settings.PERSONAL_DETAILS_TABLE,
+    settings.WORK_EXPERIENCE_TABLE,
+    settings.SALARY_PREFERENCES_TABLE,
+)
+
+
+# Webhook specification the consumer relies on: cell values (so child records
+# map to applicants without lookups) and previous values (so a re-linked
+# record also updates the applicant it left)
+WEBHOOK_SPECIFICATION = {
+    'options': {
+        'filters': {'dataTypes': ['tableData']},
+        'includes': {'includeCellValuesInFieldIds': 'all',
+                     'includePreviousCellValues': True},
+    }
+}
+
+
+def changed_records(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Flatten one webhook payload into {table_id: {record_id: change}}.
+
+    Created and changed records are included. Destroyed records only carry
+    an ID, so their change is {'destroyed': True}; see ChildLinks.
+    """
+    changes: Dict[str, Dict[str, Any]] = {}
+    for table_id, table_changes in payload.get('changedTablesById', {}).items():
+        records = changes.setdefault(table_id, {})
+        records.update(table_changes.get('createdRecordsById', {}))
+        records.update(table_changes.get('changedRecordsById', {}))
+        for record_id in table_changes.get('destroyedRecordIds', []):
+            records[record_id] = {'destroyed': True}
+    return changes
+
+
+def linked_record_ids(change: Dict[str, Any],
+                      include_previous: bool = True) -> List[str]:
+    """
+    Return record IDs referenced by linked-record cells in a change.
+
+    Child tables have a single link field (Applicant ID), so any linked
+    value found in the payload points at the owning applicant. Cell values
+    are only present when the webhook includes them in its payloads.
+    """
+    ids = []
+    # A re-linked record affects both its previous and its current applicant
+    states = [change.get('current', change)]
+    if include_previous:
+        states.append(change.get('previous', {}))
+    for state in states:
+        for value in state.get('cellValuesByFieldId', {}).values():
+            if isinstance(value, list):
+                ids.extend(v['id'] for v in value if isinstance(v, dict) and 'id' in v)
+    return ids
+
+
+def is_api_change(payload: Dict[str, Any]) -> bool:
+    """True if the payload was caused by a Web API write (e.g. our own scripts)"""
+    return payload.get('actionMetadata', {}).get('source') == 'publicApi'
+
+
+def verify_signature(body: bytes, mac_header: Optional[str],
+                     secret: str = settings.WEBHOOK_MAC_SECRET) -> bool:
+    """Check the X-Airtable-Content-MAC header of a notification ping"""
+    if not secret:
+        return True
+    if not mac_header:
+        return False
+    digest = hmac.new(base64.b64decode(secret), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(mac_header, f'hmac-sha256={digest}')
+
+
+class ChildLinks:
+    """
+    Child record ID -> linked Applicants record IDs, kept in WEBHOOK_LINKS_FILE.
+
+    A destroyed record's payload carries only its ID, and the record can no
+    longer be read, so its applicant is looked up here. The map is seeded
+    with one projected scan per child table and kept current from payloads.
+    """
+
+    def __init__(self, path: Optional[str] = settings.WEBHOOK_LINKS_FILE):
+        self.path = path
+        self.links: Dict[str, List[str]] = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.links = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def seed(self, client, tables: Iterable[str] = CHILD_TABLES):
+        for table_id in tables:
+            for record in client.get_records(table_id, fields=['Applicant ID']):
+                self.remember(record['id'],
+                              record.get('fields', {}).get('Applicant ID', []))
+
+    def get(self, record_id: str) -> List[str]:
+        return self.links.get(record_id, [])
+
+    def remember(self, record_id: str, applicant_rec_ids: List[str]):
+        if applicant_rec_ids:
+            self.links[record_id] = list(applicant_rec_ids)
+
+    def forget(self, record_id: str) -> List[str]:
+        return self.links.pop(record_id, [])
+
+    def save(self):
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.links, f)
+
+
+class AirtablePayloadSource:
+    """
+    Reads webhook payloads from Airtable, starting at a cursor persisted on disk.
+    """
+
+    def __init__(self, client, webhook_id: str = settings.WEBHOOK_ID,
+                 cursor_file: str = settings.WEBHOOK_CURSOR_FILE):
+        if not webhook_id:
+            raise ValueError("WEBHOOK_ID is not set")
+        self.client = client
+        self.webhook_id = webhook_id
+        self.cursor_file = cursor_file
+        self.cursor = self._load_cursor()
+        self._pending_cursor = self.cursor
+
+    def _load_cursor(self) -> Optional[int]:
+        if not os.path.exists(self.cursor_file):
+            return None
+        with open(self.cursor_file, 'r') as f:
+            content = f.read().strip()
+        return int(content) if content else None
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        """Return all payloads after the committed cursor"""
+        payloads: List[Dict[str, Any]] = []
+        cursor = self.cursor
+        while True:
+            response = self.client.list_webhook_payloads(self.webhook_id, cursor)
+            payloads.extend(response.get('payloads', []))
+            cursor = response.get('cursor', cursor)
+            if not response.get('mightHaveMore'):
+                break
+        self._pending_cursor = cursor
+        logger.debug(f"Fetched {len(payloads)} payloads, next cursor {cursor}")
+        return payloads
+
+    def commit(self):
+        """Persist the cursor once the fetched payloads have been processed"""
+        if self._pending_cursor is None:
+            return
+        with open(self.cursor_file, 'w') as f:
+            f.write(str(self._pending_cursor))
+        self.cursor = self._pending_cursor
+
+
+class LocalPayloadSource:
+    """
+    Offline stand-in for AirtablePayloadSource that reads payloads from a file.
+
+    Accepts a JSON list, an Airtable-style {"payloads": [...]} response, or
+    JSONL with one payload per line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def fetch(self) -> List[Dict[str, Any]]:
+        with open(self.path, 'r') as f:
+            content = f.read()
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            return [json.loads(line) for line in content.splitlines() if line.strip()]
+        if isinstance(data, dict):
+            return data.get('payloads', [data])
+        return data
+
+    def commit(self):
+        pass